@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""Load test of tools/list and tools/call with local stand-ins.
+
+Everything the tools talk to runs locally:
+
+- an aiohttp echo server is the target of the HTTP tools (``/echo`` returns
+  the request as JSON, ``/bytes/N`` returns N bytes, ``/status/N`` answers
+  with that status);
+- ``scripts/fake_burpsuite.py`` is put on PATH as ``burpsuite`` and
+  ``burpsuite-community``, and no Burp extension is listening, so the Burp
+  tools take their CLI fallback;
+- history, stored responses and the fake Burp state live in a temporary
+  directory.
+
+The server is started over stdio and over SSE.  For each scenario the
+script keeps ``--concurrency`` calls in flight (one stdio session shared by
+all workers, one SSE session per worker) until ``--calls`` have completed,
+and reports p50/p95/p99 latency, throughput, errors, and the server's
+resident memory at the end of the scenario and at its peak.  ``--json``
+writes the same numbers for comparison between revisions.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 8 --calls 200
+    python benchmarks/load_test.py --transports sse --scenarios send_http1_request,burp_scan
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import asdict, dataclass, field
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_BURPSUITE = os.path.join(ROOT, 'scripts', 'fake_burpsuite.py')
+TRANSPORTS = ('stdio', 'sse')
+RSS_INTERVAL = 0.02
+
+
+def scenarios(echo_url):
+    """Scenario name -> (tool or None for tools/list, arguments for call i)"""
+    return {
+        'tools/list': (None, None),
+        'generate_random_string': ('generate_random_string', lambda i: {'length': 32}),
+        'base64_encode': ('base64_encode', lambda i: {'content': f'payload {i} ' * 32}),
+        'batch_transform': ('batch_transform', lambda i: {
+            'inputs': [f'a=b&c={i}&d=<{n}>' for n in range(20)],
+            'transforms': ['url_encode', 'base64_encode'],
+        }),
+        'send_http1_request': ('send_http1_request', lambda i: {
+            'method': 'POST', 'url': f'{echo_url}/echo?i={i}', 'body': 'x' * 512,
+        }),
+        'send_http2_request': ('send_http2_request', lambda i: {
+            'url': f'{echo_url}/bytes/65536', 'output_mode': 'compact',
+        }),
+        'run_security_tool': ('run_security_tool', lambda i: {'tool': 'echo', 'arguments': [f'scan {i}']}),
+        'burp_health_check': ('burp_health_check', lambda i: {}),
+        'output_project_options': ('output_project_options', lambda i: {}),
+        'get_proxy_http_history': ('get_proxy_http_history', lambda i: {'count': 20, 'offset': (i * 20) % 180}),
+        'search_proxy_http_history': ('search_proxy_http_history', lambda i: {
+            'regex': f'token=[0-9a-f]*{i % 16:x}', 'limit': 10,
+        }),
+        'burp_scan': ('burp_scan', lambda i: {'target': f'{echo_url}/echo', 'scan_type': 'passive'}),
+    }
+
+
+# Child processes
+
+def serve_echo(port):
+    from aiohttp import web
+
+    async def echo(request):
+        return web.json_response({
+            'method': request.method,
+            'path': request.path,
+            'query': dict(request.query),
+            'headers': dict(request.headers),
+            'body': (await request.read()).decode('utf-8', 'replace'),
+        })
+
+    async def payload(request):
+        size = int(request.match_info['size'])
+        return web.Response(body=bytes(range(256)) * (size // 256) + bytes(size % 256), content_type='application/octet-stream')
+
+    async def status(request):
+        return web.Response(status=int(request.match_info['code']), text='status')
+
+    app = web.Application()
+    app.router.add_route('*', '/echo', echo)
+    app.router.add_get('/bytes/{size:\\d+}', payload)
+    app.router.add_route('*', '/status/{code:\\d+}', status)
+    web.run_app(app, host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def serve(transport, port, work_dir, pid_file):
+    """Run the server on one transport with local state (child process)"""
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    import mcp_server_fastmcp as server
+
+    config = server.server_config
+    for name in server.TRANSPORTS:
+        config[name]['enabled'] = name == transport
+    if transport == 'sse':
+        config['sse'].update(host='127.0.0.1', port=port)
+    # Nothing listens on the Burp port, so Burp tools fall back to the fake CLI
+    config['burp'].update(host='127.0.0.1', port=free_port(), connect_timeout=0.5)
+    config['history']['db_path'] = os.path.join(work_dir, 'history.sqlite3')
+    config['responses'].update(enabled=True, dir=os.path.join(work_dir, 'responses'))
+    # The echo server is local; per-origin pacing would measure the limiter, not the tools
+    config['http_rate_limit']['enabled'] = False
+    config['security_tools']['allowlist'] = ['echo']
+    config['logging']['level'] = 'WARNING'
+    server.get_logger().setLevel(logging.WARNING)
+    logging.getLogger('mcp').setLevel(logging.WARNING)
+
+    with open(pid_file, 'w') as f:
+        f.write(str(os.getpid()))
+    asyncio.run(server.TransportRunner(server.mcp, config, resources=server.shared_resources).run())
+
+
+# Driver
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def install_fake_burpsuite(bin_dir):
+    for name in ('burpsuite', 'burpsuite-community'):
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as f:
+            # -I -S: the fake only needs the standard library, skip site setup
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" -I -S "{FAKE_BURPSUITE}" "$@"\n')
+        os.chmod(path, 0o755)
+
+
+def wait_for(url, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'{url} did not come up')
+
+
+def read_rss(pid):
+    """Resident set size of pid in bytes, None once it has exited"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+@dataclass
+class ScenarioResult:
+    transport: str
+    scenario: str
+    calls: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    mean_ms: float = 0.0
+    throughput: float = 0.0
+    rss_mb: float = None
+    rss_peak_mb: float = None
+    first_error: str = None
+    latencies: list = field(default_factory=list, repr=False)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class RssSampler:
+    """Tracks the peak RSS of the server process while a scenario runs"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak = 0
+        self._task = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, read_rss(self.pid) or 0)
+            await asyncio.sleep(RSS_INTERVAL)
+
+    def __enter__(self):
+        self.peak = read_rss(self.pid) or 0
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+class LoadTest:
+    def __init__(self, args, work_dir, env):
+        self.args = args
+        self.work_dir = work_dir
+        self.env = env
+
+    @contextlib.asynccontextmanager
+    async def sessions(self, transport):
+        """Yields (sessions, server pid); stdio gets one session, SSE one per worker"""
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.sse import sse_client
+        from mcp.client.stdio import stdio_client
+
+        pid_file = os.path.join(self.work_dir, f'{transport}.pid')
+        port = free_port()
+        command = [__file__, '--serve', transport, '--port', str(port), '--work-dir', self.work_dir, '--pid-file', pid_file]
+        async with contextlib.AsyncExitStack() as stack:
+            if transport == 'stdio':
+                streams = await stack.enter_async_context(stdio_client(
+                    StdioServerParameters(command=sys.executable, args=command, env=self.env),
+                    errlog=open(os.devnull, 'w'),
+                ))
+                clients = [streams]
+            else:
+                process = subprocess.Popen([sys.executable, *command], env=self.env, stderr=subprocess.DEVNULL)
+                stack.callback(lambda: (process.terminate(), process.wait(timeout=15)))
+                await asyncio.to_thread(wait_for, f'http://127.0.0.1:{port}/health')
+                clients = [
+                    await stack.enter_async_context(sse_client(f'http://127.0.0.1:{port}/sse'))
+                    for _ in range(self.args.concurrency)
+                ]
+            sessions = []
+            for streams in clients:
+                session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+                await session.initialize()
+                sessions.append(session)
+            with open(pid_file) as f:
+                pid = int(f.read())
+            yield sessions, pid
+
+    async def run_scenario(self, transport, sessions, pid, name, tool, arguments):
+        result = ScenarioResult(transport, name)
+        counter = iter(range(self.args.calls))
+
+        async def call(session, index):
+            if tool is None:
+                await session.list_tools()
+                return
+            response = await session.call_tool(tool, arguments(index))
+            text = response.content[0].text if response.content and hasattr(response.content[0], 'text') else ''
+            if response.isError or text.startswith('Error:'):
+                raise RuntimeError(text or 'error')
+
+        async def worker(session):
+            for index in counter:
+                started = time.perf_counter()
+                try:
+                    await call(session, index)
+                except Exception as e:
+                    result.errors += 1
+                    result.first_error = result.first_error or str(e)[:200]
+                result.latencies.append(time.perf_counter() - started)
+
+        for index in range(self.args.warmup):
+            with contextlib.suppress(Exception):
+                await call(sessions[0], index)
+
+        workers = [sessions[n % len(sessions)] for n in range(self.args.concurrency)]
+        with RssSampler(pid) as sampler:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(session) for session in workers))
+            result.elapsed = time.perf_counter() - started
+        rss = read_rss(pid)
+
+        latencies = result.latencies
+        result.calls = len(latencies)
+        if latencies:
+            result.p50_ms = percentile(latencies, 0.5) * 1000
+            result.p95_ms = percentile(latencies, 0.95) * 1000
+            result.p99_ms = percentile(latencies, 0.99) * 1000
+            result.mean_ms = statistics.mean(latencies) * 1000
+            result.throughput = result.calls / result.elapsed
+        result.rss_mb = rss / 2 ** 20 if rss else None
+        result.rss_peak_mb = sampler.peak / 2 ** 20 if sampler.peak else None
+        return result
+
+    async def run_transport(self, transport, selected):
+        results = []
+        async with self.sessions(transport) as (sessions, pid):
+            baseline = read_rss(pid)
+            print(f'\n{transport}: {self.args.concurrency} in flight x {self.args.calls} calls, server pid {pid}, '
+                  f'RSS after start {baseline / 2 ** 20:.1f} MB')
+            print(f'  {"scenario":<26}{"calls":>6}{"err":>5}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"calls/s":>9}{"RSS MB":>8}{"peak":>7}')
+            for name, (tool, arguments) in selected.items():
+                result = await self.run_scenario(transport, sessions, pid, name, tool, arguments)
+                results.append(result)
+                print(
+                    f'  {name:<26}{result.calls:>6}{result.errors:>5}{result.p50_ms:>9.2f}{result.p95_ms:>9.2f}'
+                    f'{result.p99_ms:>9.2f}{result.throughput:>9.1f}{result.rss_mb or 0:>8.1f}{result.rss_peak_mb or 0:>7.1f}'
+                )
+                if result.first_error:
+                    print(f'  {"":<26}first error: {result.first_error}')
+        return results
+
+
+async def main_async(args):
+    work_dir = tempfile.mkdtemp(prefix='kali-mcp-load-')
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.makedirs(bin_dir)
+    install_fake_burpsuite(bin_dir)
+    env = {
+        **os.environ,
+        'PATH': bin_dir + os.pathsep + os.environ.get('PATH', ''),
+        'FAKE_BURP_STATE': os.path.join(work_dir, 'burp'),
+        'FAKE_BURP_DELAY': str(args.burp_delay),
+    }
+
+    echo_port = free_port()
+    echo = subprocess.Popen([sys.executable, __file__, '--echo', '--port', str(echo_port)], stderr=subprocess.DEVNULL)
+    try:
+        echo_url = f'http://127.0.0.1:{echo_port}'
+        await asyncio.to_thread(wait_for, f'{echo_url}/status/200')
+        available = scenarios(echo_url)
+        names = args.scenarios.split(',') if args.scenarios else list(available)
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise SystemExit(f'Unknown scenarios: {", ".join(unknown)} (available: {", ".join(available)})')
+        selected = {name: available[name] for name in names}
+
+        results = []
+        for transport in args.transports.split(','):
+            results += await LoadTest(args, work_dir, env).run_transport(transport, selected)
+    finally:
+        echo.terminate()
+        echo.wait(timeout=10)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{k: v for k, v in asdict(result).items() if k != 'latencies'} for result in results], f, indent=2)
+    if any(result.errors for result in results) and args.fail_on_error:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the MCP server against local stand-ins')
+    parser.add_argument('--transports', default=','.join(TRANSPORTS))
+    parser.add_argument('--scenarios', default=None, help='Comma separated scenario names (default: all)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Calls kept in flight')
+    parser.add_argument('--calls', type=int, default=200, help='Calls per scenario')
+    parser.add_argument('--warmup', type=int, default=3, help='Unmeasured calls before each scenario')
+    parser.add_argument('--burp-delay', type=float, default=0, help='Seconds the fake burpsuite sleeps per run')
+    parser.add_argument('--json', default=None, help='Also write the results to this file')
+    parser.add_argument('--fail-on-error', action='store_true', help='Exit 1 if any call failed')
+    parser.add_argument('--serve', choices=TRANSPORTS, help=argparse.SUPPRESS)
+    parser.add_argument('--echo', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--pid-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.echo:
+        serve_echo(args.port)
+    elif args.serve:
+        serve(args.serve, args.port, args.work_dir, args.pid_file)
+    else:
+        asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
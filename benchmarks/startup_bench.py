@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Cold start to first tools/list latency over stdio.
+
+Starts the server with only the stdio transport, performs the MCP
+initialize handshake, sends tools/list and measures the time from spawning
+the process to receiving the tool list.  Repeats the run and reports the
+min, median and max.  With --budget the script exits non-zero when the
+median exceeds the budget, so it can guard against startup regressions.
+
+Usage:
+    python benchmarks/startup_bench.py --runs 5 --budget 2.0
+"""
+
+import argparse
+import json
+import os
+import selectors
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'src', 'mcp_server_fastmcp.py')
+
+
+def read_response(process, request_id, deadline):
+    """Read stdout lines until the JSON-RPC response with request_id arrives"""
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not selector.select(remaining):
+            raise TimeoutError(f'No response to request {request_id}')
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError('Server exited before responding')
+        message = json.loads(line)
+        if message.get('id') == request_id:
+            return message
+
+
+def send(process, message):
+    process.stdin.write(json.dumps(message) + '\n')
+    process.stdin.flush()
+
+
+def measure(timeout):
+    """Seconds from spawn to initialize response and to tools/list response"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, SERVER, '--transport', 'stdio'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1,
+    )
+    deadline = time.monotonic() + timeout
+    try:
+        send(process, {
+            'jsonrpc': '2.0', 'id': 1, 'method': 'initialize',
+            'params': {
+                'protocolVersion': '2025-06-18',
+                'capabilities': {},
+                'clientInfo': {'name': 'startup-bench', 'version': '1'},
+            },
+        })
+        read_response(process, 1, deadline)
+        initialized = time.perf_counter() - started
+        send(process, {'jsonrpc': '2.0', 'method': 'notifications/initialized'})
+        send(process, {'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'})
+        tools = read_response(process, 2, deadline)['result']['tools']
+        listed = time.perf_counter() - started
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return initialized, listed, len(tools)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold start to first tools/list over stdio')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--budget', type=float, default=None, help='Fail if the median exceeds this many seconds')
+    args = parser.parse_args()
+
+    results = []
+    for run in range(args.runs):
+        initialized, listed, tools = measure(args.timeout)
+        results.append(listed)
+        print(f'run {run + 1}: initialize={initialized * 1000:7.1f}ms tools/list={listed * 1000:7.1f}ms ({tools} tools)')
+
+    median = statistics.median(results)
+    print(f'cold start to tools/list: min={min(results) * 1000:.1f}ms median={median * 1000:.1f}ms max={max(results) * 1000:.1f}ms')
+    if args.budget is not None and median > args.budget:
+        print(f'FAIL: median {median:.3f}s exceeds budget {args.budget:.3f}s')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
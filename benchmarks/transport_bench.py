@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Concurrent client benchmark for each MCP transport.
+
+Starts the server with its SSE, streamable HTTP and WebSocket transports on
+local ports, then for every transport opens N client sessions at once and
+has each make M sequential tool calls.  stdio serves a single client, so
+there the N workers share one session and keep N calls in flight.  Reports
+latency percentiles and throughput per transport.
+
+Usage:
+    python benchmarks/transport_bench.py --clients 20 --calls 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import urllib.request
+import warnings
+from contextlib import asynccontextmanager
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'src', 'mcp_server_fastmcp.py')
+NETWORK_TRANSPORTS = ('sse', 'http', 'websocket')
+
+
+def serve(base_port):
+    """Run the server with the network transports on base_port.. (child process)"""
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    import mcp_server_fastmcp as server
+
+    server.server_config['stdio']['enabled'] = False
+    server.get_logger().setLevel(logging.WARNING)
+    logging.getLogger('mcp').setLevel(logging.WARNING)
+    for offset, name in enumerate(NETWORK_TRANSPORTS):
+        server.server_config[name].update(enabled=True, host='127.0.0.1', port=base_port + offset)
+    asyncio.run(server.TransportRunner(server.mcp, server.server_config).run())
+
+
+def wait_until_healthy(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server did not become healthy on port {port}')
+
+
+@asynccontextmanager
+async def open_session(transport, port):
+    from mcp import ClientSession, StdioServerParameters
+
+    if transport == 'sse':
+        from mcp.client.sse import sse_client
+        client = sse_client(f'http://127.0.0.1:{port}/sse')
+    elif transport == 'http':
+        from mcp.client.streamable_http import streamable_http_client
+        client = streamable_http_client(f'http://127.0.0.1:{port}/mcp')
+    elif transport == 'websocket':
+        from mcp.client.websocket import websocket_client
+        client = websocket_client(f'ws://127.0.0.1:{port}/')
+    else:
+        from mcp.client.stdio import stdio_client
+        client = stdio_client(StdioServerParameters(
+            command=sys.executable, args=[SERVER, '--transport', 'stdio'], env={**os.environ}
+        ), errlog=open(os.devnull, 'w'))
+
+    async with client as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            yield session
+
+
+async def call_loop(session, calls, tool, arguments, latencies, errors):
+    for _ in range(calls):
+        started = time.perf_counter()
+        try:
+            result = await session.call_tool(tool, arguments)
+            if result.isError:
+                errors.append(result.content[0].text if result.content else 'error')
+        except Exception as e:
+            errors.append(repr(e))
+        latencies.append(time.perf_counter() - started)
+
+
+async def bench_transport(transport, port, clients, calls, tool, arguments):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    if transport == 'stdio':
+        async with open_session('stdio', None) as session:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                call_loop(session, calls, tool, arguments, latencies, errors) for _ in range(clients)
+            ))
+    else:
+        async def client():
+            async with open_session(transport, port) as session:
+                await call_loop(session, calls, tool, arguments, latencies, errors)
+        await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(transport, latencies, errors, elapsed):
+    if not latencies:
+        print(f'{transport:<10} no calls completed')
+        return
+    print(
+        f'{transport:<10} calls={len(latencies):<6} errors={len(errors):<4} '
+        f'p50={percentile(latencies, 0.5) * 1000:7.2f}ms p95={percentile(latencies, 0.95) * 1000:7.2f}ms '
+        f'p99={percentile(latencies, 0.99) * 1000:7.2f}ms mean={statistics.mean(latencies) * 1000:7.2f}ms '
+        f'throughput={len(latencies) / elapsed:8.1f}/s'
+    )
+    if errors:
+        print(f'{"":<10} first error: {errors[0][:200]}')
+
+
+async def main_async(args):
+    import subprocess
+
+    transports = args.transports.split(',')
+    server = None
+    if any(name in NETWORK_TRANSPORTS for name in transports):
+        server = subprocess.Popen([sys.executable, __file__, '--serve', '--base-port', str(args.base_port)])
+    try:
+        if server is not None:
+            for offset, name in enumerate(NETWORK_TRANSPORTS):
+                if name in transports:
+                    await asyncio.to_thread(wait_until_healthy, args.base_port + offset)
+
+        print(f'{args.clients} clients x {args.calls} calls of {args.tool}')
+        for name in transports:
+            port = args.base_port + NETWORK_TRANSPORTS.index(name) if name in NETWORK_TRANSPORTS else None
+            report(name, *await bench_transport(name, port, args.clients, args.calls, args.tool, {'length': 32}))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=15)
+
+
+def main():
+    # The WebSocket transport is deprecated in the MCP SDK but still served
+    warnings.filterwarnings('ignore', message='The WebSocket', category=DeprecationWarning)
+    parser = argparse.ArgumentParser(description='Benchmark concurrent clients per MCP transport')
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--tool', default='generate_random_string')
+    parser.add_argument('--transports', default='stdio,sse,http,websocket')
+    parser.add_argument('--base-port', type=int, default=19977)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.base_port)
+    else:
+        asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Stand-in for the ``burpsuite`` command line used by the tools.
+
+Understands the flags the server passes when it falls back to the CLI
+(history and issue listing, option import/export, repeater, intruder,
+intercept, task engine, editor contents) and the ``--headless`` scan
+invocation of ``burp_scan``.  Options, intercept and editor state persist
+in ``$FAKE_BURP_STATE`` between invocations; ``$FAKE_BURP_DELAY`` adds a
+fixed delay in seconds to every run to imitate a slow JVM start.
+
+Started the way ``burp_start`` does (no action flag, or only
+``--headless``/``--config-file``) it keeps running like the application
+until terminated.  If the config file is JSON with a ``fake_mcp_port`` key
+it listens on that port, so the supervisor's readiness probe succeeds.
+
+Only the standard library is imported so a run costs little more than
+interpreter startup.  Install it on PATH under the names the tools use:
+
+    mkdir -p /tmp/fakebin
+    printf '#!/bin/sh\\nexec python3 -I -S %s "$@"\\n' "$PWD/scripts/fake_burpsuite.py" > /tmp/fakebin/burpsuite
+    chmod +x /tmp/fakebin/burpsuite
+    PATH=/tmp/fakebin:$PATH python src/mcp_server_fastmcp.py
+"""
+
+import json
+import os
+import random
+import socket
+import sys
+import time
+
+
+DEFAULT_STATE = {
+    'project_options': {'project_options': {'fake': True}},
+    'user_options': {'user_options': {'fake': True}},
+    'intercepting': False,
+    'running': True,
+    'editor': '',
+}
+HISTORY_SIZE = int(os.environ.get('FAKE_BURP_HISTORY', '200'))
+
+
+def state_path():
+    directory = os.environ.get('FAKE_BURP_STATE')
+    return os.path.join(directory, 'state.json') if directory else None
+
+
+def load_state():
+    path = state_path()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return {**DEFAULT_STATE, **json.load(f)}
+    return dict(DEFAULT_STATE)
+
+
+def save_state(state):
+    path = state_path()
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.{os.getpid()}'
+    with open(temp, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp, path)
+
+
+def history_item(index):
+    rng = random.Random(index)
+    method = rng.choice(['GET', 'GET', 'POST'])
+    path = rng.choice(['/', '/login', '/api/users', '/api/orders', '/search?q=test'])
+    status = rng.choice([200, 200, 302, 404, 500])
+    return {
+        'request': f'{method} {path} HTTP/1.1\r\nHost: shop.test\r\nUser-Agent: fake\r\n\r\n',
+        'response': f'HTTP/1.1 {status} Fake\r\nContent-Type: text/html\r\n\r\nitem {index} token={rng.getrandbits(32):08x}',
+        'notes': '',
+    }
+
+
+def websocket_item(index):
+    return {'payload': f'{{"op": "ping", "seq": {index}}}', 'direction': 'CLIENT_TO_SERVER' if index % 2 else 'SERVER_TO_CLIENT', 'notes': ''}
+
+
+def issue_item(index):
+    return {
+        'name': ['Cross-site scripting (reflected)', 'SQL injection', 'Cookie without HttpOnly flag set'][index % 3],
+        'severity': ['HIGH', 'MEDIUM', 'LOW', 'INFORMATION'][index % 4],
+        'confidence': 'FIRM',
+        'baseUrl': f'https://shop.test/page{index % 7}',
+        'detail': f'Issue detail {index}',
+    }
+
+
+def page(build, options):
+    count = int(options.get('count', 10))
+    offset = int(options.get('offset', 0))
+    if offset >= HISTORY_SIZE:
+        return 'Reached end of items'
+    return '\n\n'.join(json.dumps(build(index)) for index in range(offset, min(offset + count, HISTORY_SIZE)))
+
+
+def parse(argv):
+    """Split argv into the first flag (the action), --key=value options and the rest"""
+    action, options, rest = None, {}, []
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        if arg.startswith('--') and '=' in arg:
+            key, _, value = arg[2:].partition('=')
+            options[key] = value
+        elif arg in ('--request', '--tab-name'):
+            options[arg[2:]] = argv[index + 1] if index + 1 < len(argv) else ''
+            index += 1
+        elif arg.startswith('--') and action is None:
+            action = arg
+        else:
+            rest.append(arg)
+        index += 1
+    return action, options, rest
+
+
+def run(argv):
+    action, options, rest = parse(argv)
+    state = load_state()
+
+    if action == '--list-proxy-history':
+        return page(history_item, options)
+    if action == '--list-websocket-history':
+        return page(websocket_item, options)
+    if action == '--list-scanner-issues':
+        return page(issue_item, options)
+    if action in ('--export-project-options', '--export-user-options'):
+        return json.dumps(state[action[len('--export-'):].replace('-', '_')])
+    if action in ('--import-project-options', '--import-user-options'):
+        state[action[len('--import-'):].replace('-', '_')] = json.loads(sys.stdin.read())
+        save_state(state)
+        return 'Configuration has been applied'
+    if action == '--repeater':
+        return f'Created repeater tab {options.get("tab-name")}'
+    if action == '--intruder':
+        return f'Sent to intruder {options.get("tab-name")}'
+    if action == '--proxy-intercept':
+        state['intercepting'] = rest[:1] == ['enable']
+        save_state(state)
+        return 'Intercept has been ' + ('enabled' if state['intercepting'] else 'disabled')
+    if action == '--task-engine':
+        state['running'] = rest[:1] == ['resume']
+        save_state(state)
+        return 'Task execution engine is now ' + ('running' if state['running'] else 'paused')
+    if action == '--get-active-editor-contents':
+        return state['editor'] or '<No active editor>'
+    if action == '--set-active-editor-contents':
+        state['editor'] = sys.stdin.read()
+        save_state(state)
+        return 'Editor text has been set'
+    if action == '--headless' and 'target' in options:
+        issues = [issue_item(index) for index in range(3)]
+        return '\n'.join(
+            [f'Scanning {options["target"]} ({options.get("scan-type", "passive")})']
+            + [f'[{issue["severity"]}] {issue["name"]} at {issue["baseUrl"]}' for issue in issues]
+            + ['Scan complete']
+        )
+    if action in (None, '--headless'):
+        return None
+    raise ValueError(f'Unsupported option {action}')
+
+
+def run_application(options):
+    """Stay up like the real application, listening on the config's fake_mcp_port"""
+    listener = None
+    if 'config-file' in options:
+        with open(options['config-file']) as f:
+            port = json.load(f).get('fake_mcp_port')
+        if port:
+            listener = socket.create_server(('127.0.0.1', port))
+    while True:
+        if listener is None:
+            time.sleep(3600)
+            continue
+        connection, _ = listener.accept()
+        connection.close()
+
+
+def main():
+    delay = float(os.environ.get('FAKE_BURP_DELAY', '0'))
+    if delay:
+        time.sleep(delay)
+    try:
+        output = run(sys.argv[1:])
+        if output is None:
+            run_application(parse(sys.argv[1:])[1])
+        else:
+            print(output)
+    except (ValueError, KeyError, OSError) as e:
+        print(f'burpsuite: {e}', file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
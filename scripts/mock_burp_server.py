@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Mock of Burp Suite's MCP extension for local testing.
+
+Serves the same tool names as the extension over SSE so the persistent
+control channel in ``src/burp_controller.py`` can be exercised without a
+Burp installation.  State (intercept, editor, options) lives in memory and
+the proxy history and scanner issues are generated.
+
+Usage:
+    python scripts/mock_burp_server.py --port 9876 --history-size 1000
+"""
+
+import argparse
+import random
+import re
+from json import dumps, loads
+
+from mcp.server.fastmcp import FastMCP
+
+
+def build_history(size, seed=1):
+    rng = random.Random(seed)
+    hosts = ['shop.test', 'api.shop.test', 'static.shop.test']
+    paths = ['/', '/login', '/api/users', '/api/orders', '/search?q=test', '/assets/app.js']
+    types = ['text/html', 'application/json', 'application/javascript']
+    items = []
+    for index in range(size):
+        method = rng.choice(['GET', 'GET', 'POST'])
+        status = rng.choice([200, 200, 302, 404, 500])
+        request = f'{method} {rng.choice(paths)} HTTP/1.1\r\nHost: {rng.choice(hosts)}\r\nUser-Agent: mock\r\n\r\n'
+        response = (
+            f'HTTP/1.1 {status} Mock\r\nContent-Type: {rng.choice(types)}\r\n\r\n'
+            f'item {index} token={rng.getrandbits(32):08x}'
+        )
+        items.append({'request': request, 'response': response, 'notes': ''})
+    return items
+
+
+def build_websocket_history(size, seed=2):
+    rng = random.Random(seed)
+    return [
+        {'payload': f'{{"op": "ping", "seq": {index}}}', 'direction': rng.choice(['CLIENT_TO_SERVER', 'SERVER_TO_CLIENT']), 'notes': ''}
+        for index in range(size)
+    ]
+
+
+def build_issues(size, seed=3):
+    rng = random.Random(seed)
+    names = ['Cross-site scripting (reflected)', 'SQL injection', 'Cookie without HttpOnly flag set', 'Strict transport security not enforced']
+    issues = []
+    for index in range(size):
+        issues.append({
+            'name': rng.choice(names),
+            'severity': rng.choice(['HIGH', 'MEDIUM', 'LOW', 'INFORMATION']),
+            'confidence': rng.choice(['CERTAIN', 'FIRM', 'TENTATIVE']),
+            'baseUrl': f'https://shop.test/page{index % 7}',
+            'detail': f'Issue detail {index}',
+        })
+    return issues
+
+
+def paginate(items, count, offset):
+    if offset >= len(items):
+        return 'Reached end of items'
+    return '\n\n'.join(dumps(item) for item in items[offset:offset + count])
+
+
+def create_server(host, port, history_size, issue_count):
+    mcp = FastMCP(name='mock-burp', host=host, port=port, sse_path='/', message_path='/message/')
+    state = {
+        'intercepting': False,
+        'running': True,
+        'editor': '',
+        'project_options': {'project_options': {'mock': True}},
+        'user_options': {'user_options': {'mock': True}},
+        'history': build_history(history_size),
+        'websocket_history': build_websocket_history(history_size),
+        'issues': build_issues(issue_count),
+    }
+
+    @mcp.tool()
+    async def create_repeater_tab(content: str, targetHostname: str, targetPort: int, usesHttps: bool, tabName: str = None) -> str:
+        return f'Created repeater tab {tabName} for {targetHostname}:{targetPort}'
+
+    @mcp.tool()
+    async def send_to_intruder(content: str, targetHostname: str, targetPort: int, usesHttps: bool, tabName: str = None) -> str:
+        return f'Sent to intruder {tabName} for {targetHostname}:{targetPort}'
+
+    @mcp.tool()
+    async def set_proxy_intercept_state(intercepting: bool) -> str:
+        state['intercepting'] = intercepting
+        return 'Intercept has been ' + ('enabled' if intercepting else 'disabled')
+
+    @mcp.tool()
+    async def set_task_execution_engine_state(running: bool) -> str:
+        state['running'] = running
+        return 'Task execution engine is now ' + ('running' if running else 'paused')
+
+    @mcp.tool()
+    async def output_project_options() -> str:
+        return dumps(state['project_options'])
+
+    @mcp.tool()
+    async def output_user_options() -> str:
+        return dumps(state['user_options'])
+
+    @mcp.tool()
+    async def set_project_options(json: str) -> str:
+        state['project_options'] = loads(json)
+        return 'Project configuration has been applied'
+
+    @mcp.tool()
+    async def set_user_options(json: str) -> str:
+        state['user_options'] = loads(json)
+        return 'User configuration has been applied'
+
+    @mcp.tool()
+    async def get_scanner_issues(count: int, offset: int) -> str:
+        return paginate(state['issues'], count, offset)
+
+    @mcp.tool()
+    async def get_proxy_http_history(count: int, offset: int) -> str:
+        return paginate(state['history'], count, offset)
+
+    @mcp.tool()
+    async def get_proxy_http_history_regex(regex: str, count: int, offset: int) -> str:
+        pattern = re.compile(regex)
+        matches = [item for item in state['history'] if pattern.search(item['request'] + item['response'])]
+        return paginate(matches, count, offset)
+
+    @mcp.tool()
+    async def get_proxy_websocket_history(count: int, offset: int) -> str:
+        return paginate(state['websocket_history'], count, offset)
+
+    @mcp.tool()
+    async def get_proxy_websocket_history_regex(regex: str, count: int, offset: int) -> str:
+        pattern = re.compile(regex)
+        matches = [item for item in state['websocket_history'] if pattern.search(item['payload'])]
+        return paginate(matches, count, offset)
+
+    @mcp.tool()
+    async def get_active_editor_contents() -> str:
+        return state['editor'] or '<No active editor>'
+
+    @mcp.tool()
+    async def set_active_editor_contents(text: str) -> str:
+        state['editor'] = text
+        return 'Editor text has been set'
+
+    return mcp
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Burp Suite MCP extension')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9876)
+    parser.add_argument('--history-size', type=int, default=200)
+    parser.add_argument('--issues', type=int, default=50)
+    args = parser.parse_args()
+
+    create_server(args.host, args.port, args.history_size, args.issues).run(transport='sse')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Persistent control channel to a running Burp Suite instance.
+
+Burp's MCP extension exposes the proxy, scanner and editor commands as MCP
+tools over SSE at ``server_config['burp']``.  BurpController keeps one MCP
+client session open to it from a background task and reconnects with
+exponential backoff when the connection drops, so commands no longer pay
+for a ``burpsuite`` JVM start per call.
+"""
+
+import asyncio
+import random
+from datetime import timedelta
+
+from log_pipeline import get_logger
+
+
+DEFAULT_SSE_PATH = '/'
+DEFAULT_CONNECT_TIMEOUT = 2
+DEFAULT_CALL_TIMEOUT = 60
+DEFAULT_MIN_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30
+DEFAULT_PING_INTERVAL = 15
+SSE_READ_TIMEOUT = 24 * 3600
+
+logger = get_logger('burp')
+
+
+class BurpUnavailableError(Exception):
+    """Raised when no control channel to Burp can be established"""
+
+
+class BurpCommandError(Exception):
+    """Raised when Burp reports an error for a command"""
+
+
+class BurpController:
+    """Keeps an MCP client session to Burp's extension and reconnects with backoff"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.connected_url = None
+        self.reconnects = 0
+        self.last_error = None
+        self._session = None
+        self._ready = None
+        self._stop = None
+        self._wake = None
+        self._task = None
+
+    @property
+    def url(self):
+        path = self.settings.get('sse_path', DEFAULT_SSE_PATH)
+        return f'http://{self.settings["host"]}:{self.settings["port"]}{path}'
+
+    @property
+    def connected(self):
+        return self._session is not None
+
+    def start(self):
+        """Start the background connection task if it is not running"""
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._stop = asyncio.Event()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        """Disconnect and stop reconnecting"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._session = None
+
+    async def reset(self):
+        """Drop the current connection so the next call reconnects with fresh settings"""
+        await self.close()
+        self.last_error = None
+
+    async def call(self, name, arguments=None, timeout=None):
+        """Run a Burp extension tool and return its text output"""
+        if not self.settings.get('enabled', True):
+            raise BurpUnavailableError('Burp control channel is disabled')
+
+        self.start()
+        if self._session is None and self.last_error is None:
+            # First connection attempt; once one has failed, calls fail fast
+            # while the background task keeps retrying with backoff
+            try:
+                await asyncio.wait_for(
+                    self._ready.wait(),
+                    timeout=self.settings.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT)
+                )
+            except asyncio.TimeoutError:
+                raise BurpUnavailableError(f'Burp is not reachable at {self.url}: {self.last_error}')
+
+        session = self._session
+        if session is None:
+            raise BurpUnavailableError(f'Burp is not reachable at {self.url}: {self.last_error}')
+
+        timeout = timeout or self.settings.get('call_timeout', DEFAULT_CALL_TIMEOUT)
+        try:
+            result = await session.call_tool(name, arguments or {}, read_timeout_seconds=timedelta(seconds=timeout))
+        except Exception as e:
+            from mcp.shared.exceptions import McpError
+            if isinstance(e, McpError):
+                raise BurpCommandError(f'Burp command {name} failed: {e}')
+            # Transport level failure: make the background task reconnect
+            self._wake.set()
+            raise BurpUnavailableError(f'Burp control channel failed during {name}: {_describe(e)}')
+        text = '\n\n'.join(item.text for item in result.content if getattr(item, 'text', None) is not None)
+        if result.isError:
+            raise BurpCommandError(text)
+        return text
+
+    async def _maintain(self):
+        backoff = self.settings.get('min_backoff', DEFAULT_MIN_BACKOFF)
+        while not self._stop.is_set():
+            try:
+                await self._connect_once()
+                backoff = self.settings.get('min_backoff', DEFAULT_MIN_BACKOFF)
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                # anyio may deliver our own cancellation wrapped in an exception group
+                if asyncio.current_task().cancelling():
+                    raise
+                self.last_error = _describe(e)
+            finally:
+                self._session = None
+                self._ready.clear()
+                self.connected_url = None
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            # Full jitter keeps several servers from reconnecting in lockstep
+            await asyncio.sleep(random.uniform(0, backoff))
+            backoff = min(backoff * 2, self.settings.get('max_backoff', DEFAULT_MAX_BACKOFF))
+
+    async def _connect_once(self):
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        url = self.url
+        timeout = self.settings.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT)
+        async with sse_client(url, timeout=timeout, sse_read_timeout=SSE_READ_TIMEOUT) as (read, write):
+            async with ClientSession(read, write) as session:
+                await asyncio.wait_for(session.initialize(), timeout=timeout)
+                self._session = session
+                self.connected_url = url
+                self.last_error = None
+                self._ready.set()
+                logger.info('Connected to Burp control channel', extra={'url': url})
+                await self._park(session, timeout)
+
+    async def _park(self, session, timeout):
+        # Hold the connection open, pinging so a dead peer is noticed between calls
+        interval = self.settings.get('ping_interval', DEFAULT_PING_INTERVAL)
+        self._wake.clear()
+        while not self._wake.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(session.send_ping(), timeout=timeout)
+        if not self._stop.is_set():
+            raise ConnectionError('Burp control channel reported a transport failure')
+
+
+def _describe(error):
+    """Flatten exception groups raised by the anyio based transports"""
+    while isinstance(error, BaseExceptionGroup) and len(error.exceptions) == 1:
+        error = error.exceptions[0]
+    return f'{type(error).__name__}: {error}'
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Owns the Burp Suite processes started by ``burp_start``.
+
+The supervisor keeps the process handle of every Burp it launches and
+decides when Burp is usable by probing the MCP extension's port rather than
+assuming a fixed startup time.  It refuses to start a second Burp while one
+is running or while something else already answers on the port, and
+restarts Burp with a backoff when it exits on its own.
+
+With ``warm_standby`` a second instance is started on ``standby_port`` and
+kept ready.  When the active instance dies the standby is promoted at once,
+so the control channel only has to reconnect to the other port instead of
+waiting for a JVM to start, and the dead instance is restarted as the new
+standby.
+"""
+
+import asyncio
+import contextlib
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+
+from log_pipeline import get_logger
+
+
+DEFAULT_READY_TIMEOUT = 120
+DEFAULT_PROBE_INTERVAL = 0.5
+DEFAULT_RESTART_BACKOFF = 2.0
+MAX_RESTART_BACKOFF = 60
+DEFAULT_STOP_TIMEOUT = 10
+# An instance that ran this long before exiting restarts with the initial backoff
+STABLE_AFTER = 60
+
+logger = get_logger('burp_supervisor')
+
+
+class BurpAlreadyRunningError(Exception):
+    """A Burp instance is already running or the port is taken"""
+
+
+async def probe_port(host, port, timeout=1.0):
+    """True if a TCP connection to host:port succeeds"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    with contextlib.suppress(Exception):
+        await writer.wait_closed()
+    return True
+
+
+def stop_process(process, force=False):
+    """SIGTERM (SIGKILL if force) Burp's process group, or the process itself where there are no groups (Windows)"""
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        elif force:
+            process.kill()
+        else:
+            process.terminate()
+
+
+@dataclass
+class BurpInstance:
+    role: str
+    argv: list
+    host: str
+    port: int
+    state: str = 'stopped'
+    process: object = None
+    started_at: float = None
+    ready_at: float = None
+    returncode: int = None
+    restarts: int = 0
+    stopping: bool = False
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.returncode is None
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            'role': self.role,
+            'state': self.state,
+            'pid': self.process.pid if self.running else None,
+            'port': self.port,
+            'command': self.argv,
+            'uptime': round(now - self.started_at, 3) if self.running and self.started_at else None,
+            'startup_seconds': round(self.ready_at - self.started_at, 3) if self.ready_at and self.started_at else None,
+            'restarts': self.restarts,
+            'returncode': self.returncode,
+        }
+
+
+class BurpSupervisor:
+    """Starts, probes, restarts and stops the Burp processes"""
+
+    def __init__(self, settings, metrics=None, on_promote=None):
+        self.settings = settings
+        self.on_promote = on_promote
+        self.active = None
+        self.standby = None
+        self._tasks = {}
+        self._lock = asyncio.Lock()
+        self._restarts = None
+        self._ready = None
+        if metrics is not None:
+            self._restarts = metrics.counter('burp_restarts_total', 'Burp processes restarted by the supervisor', ('role',))
+            self._ready = metrics.gauge('burp_ready', 'Whether the supervised Burp instance answers on its port', ('role',))
+
+    def instances(self):
+        return [instance for instance in (self.active, self.standby) if instance is not None]
+
+    async def start(self, argv, host, port, standby_argv=None, standby_port=None):
+        """Launch Burp, plus a standby instance when standby_argv is given
+
+        Returns immediately; use wait_ready() or status() to follow startup.
+        """
+        async with self._lock:
+            for instance in self.instances():
+                if instance.running:
+                    raise BurpAlreadyRunningError(
+                        f'Burp is already {instance.state} as the {instance.role} instance '
+                        f'(pid {instance.process.pid}, port {instance.port}); stop it first'
+                    )
+            for candidate in (port, standby_port if standby_argv else None):
+                if candidate is not None and await probe_port(host, candidate):
+                    raise BurpAlreadyRunningError(f'Something is already listening on {host}:{candidate}')
+
+            await self._cancel_tasks()
+            self.active = BurpInstance('active', list(argv), host, port)
+            self.standby = BurpInstance('standby', list(standby_argv), host, standby_port) if standby_argv else None
+            for instance in self.instances():
+                await self._launch(instance)
+                self._tasks[id(instance)] = asyncio.create_task(self._supervise(instance))
+            return self.active
+
+    async def stop(self):
+        """Terminate every supervised instance, returning how many were running"""
+        async with self._lock:
+            instances = self.instances()
+            running = sum(1 for instance in instances if instance.running)
+            for instance in instances:
+                instance.stopping = True
+            await self._cancel_tasks()
+            await asyncio.gather(*(self._terminate(instance) for instance in instances))
+            for instance in instances:
+                instance.state = 'stopped'
+                self._set_ready(instance, False)
+            return running
+
+    def stop_now(self):
+        """Synchronous SIGTERM for every running instance, for use at interpreter exit"""
+        if not self.settings.get('stop_on_exit', True):
+            return
+        for instance in self.instances():
+            if instance.running:
+                stop_process(instance.process)
+
+    async def wait_ready(self, timeout=None):
+        """Wait until the active instance answers on its port, True if it did"""
+        if self.active is None:
+            return False
+        timeout = timeout or self.settings.get('ready_timeout', DEFAULT_READY_TIMEOUT)
+        try:
+            await asyncio.wait_for(self.active.ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def snapshot(self):
+        """Supervisor state without touching the network"""
+        return {
+            'state': self.active.state if self.active is not None else 'idle',
+            'active': self.active.to_dict() if self.active is not None else None,
+            'standby': self.standby.to_dict() if self.standby is not None else None,
+        }
+
+    async def status(self):
+        """snapshot() plus a live probe of the active instance's port"""
+        status = self.snapshot()
+        if self.active is not None:
+            status['port_open'] = await probe_port(self.active.host, self.active.port)
+        return status
+
+    async def _launch(self, instance):
+        instance.ready = asyncio.Event()
+        instance.ready_at = None
+        instance.returncode = None
+        # A session of its own so the JVM and its helpers stop together
+        instance.process = await asyncio.create_subprocess_exec(
+            *instance.argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        instance.started_at = time.time()
+        instance.state = 'starting'
+        logger.info('Burp started', extra={'role': instance.role, 'pid': instance.process.pid, 'port': instance.port})
+
+    async def _probe_until_ready(self, instance):
+        interval = self.settings.get('probe_interval', DEFAULT_PROBE_INTERVAL)
+        deadline = time.monotonic() + self.settings.get('ready_timeout', DEFAULT_READY_TIMEOUT)
+        while instance.running:
+            if await probe_port(instance.host, instance.port):
+                instance.state = 'ready'
+                instance.ready_at = time.time()
+                instance.ready.set()
+                self._set_ready(instance, True)
+                logger.info('Burp is ready', extra={
+                    'role': instance.role, 'port': instance.port,
+                    'startup_seconds': round(instance.ready_at - instance.started_at, 3),
+                })
+                return
+            if instance.state == 'starting' and time.monotonic() > deadline:
+                # Keep probing: Burp may be up without the MCP extension listening yet
+                instance.state = 'unresponsive'
+                logger.warning('Burp did not open its port in time', extra={'role': instance.role, 'port': instance.port})
+            await asyncio.sleep(interval)
+
+    async def _supervise(self, instance):
+        backoff = self.settings.get('restart_backoff', DEFAULT_RESTART_BACKOFF)
+        while True:
+            probe = asyncio.create_task(self._probe_until_ready(instance))
+            try:
+                instance.returncode = await instance.process.wait()
+            finally:
+                probe.cancel()
+            self._set_ready(instance, False)
+            if instance.stopping:
+                return
+
+            instance.state = 'exited'
+            logger.warning('Burp exited', extra={'role': instance.role, 'returncode': instance.returncode, 'port': instance.port})
+            if instance.role == 'active' and self.standby is not None and self.standby.state == 'ready':
+                await self._promote_standby()
+            if not self.settings.get('restart', True):
+                instance.state = 'failed'
+                return
+
+            if time.time() - instance.started_at > STABLE_AFTER:
+                backoff = self.settings.get('restart_backoff', DEFAULT_RESTART_BACKOFF)
+            instance.state = 'restarting'
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.settings.get('max_restart_backoff', MAX_RESTART_BACKOFF))
+            if instance.stopping:
+                return
+            instance.restarts += 1
+            if self._restarts is not None:
+                self._restarts.inc(instance.role)
+            try:
+                await self._launch(instance)
+            except OSError as e:
+                instance.state = 'failed'
+                logger.error('Burp could not be restarted', extra={'role': instance.role, 'error': str(e)})
+                return
+
+    async def _promote_standby(self):
+        """Swap roles so the ready standby serves and the dead instance restarts as standby"""
+        self.active, self.standby = self.standby, self.active
+        self.active.role, self.standby.role = 'active', 'standby'
+        self._set_ready(self.active, True)
+        logger.warning('Promoted the standby Burp instance', extra={'port': self.active.port, 'pid': self.active.process.pid})
+        if self.on_promote is not None:
+            try:
+                await self.on_promote(self.active)
+            except Exception as e:
+                logger.error('Standby promotion hook failed', extra={'error': str(e)})
+
+    async def _terminate(self, instance):
+        if not instance.running:
+            return
+        stop_process(instance.process)
+        try:
+            instance.returncode = await asyncio.wait_for(
+                instance.process.wait(), timeout=self.settings.get('stop_timeout', DEFAULT_STOP_TIMEOUT)
+            )
+        except asyncio.TimeoutError:
+            stop_process(instance.process, force=True)
+            instance.returncode = await instance.process.wait()
+        logger.info('Burp stopped', extra={'role': instance.role, 'returncode': instance.returncode})
+
+    async def _cancel_tasks(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _set_ready(self, instance, ready):
+        if self._ready is not None:
+            self._ready.set(instance.role, value=1 if ready else 0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Executable lookup for the tools that launch programs directly.
+
+``run_security_tool`` and ``burp_scan`` run an argv list without a shell.
+CommandResolver turns a tool name into the absolute path of its
+executable.  Each name is looked up on PATH once.  The cache is dropped
+when PATH changes, and a cached path is re-checked with one ``access()``
+call, so an uninstalled tool is looked up again instead of failing to
+exec.  Only the tool names (or paths) in ``allowlist`` can be run; the
+default is DEFAULT_ALLOWLIST, common Kali tools that do not run arbitrary
+commands themselves, and None allows anything on PATH.  The list is
+checked at startup and missing entries are logged.
+"""
+
+import os
+import shutil
+import threading
+
+from log_pipeline import get_logger
+
+
+# No shells or interpreters: they would make the allowlist pointless
+DEFAULT_ALLOWLIST = (
+    'nmap', 'masscan', 'nikto', 'sqlmap', 'gobuster', 'dirb', 'ffuf', 'wfuzz',
+    'whatweb', 'wpscan', 'nuclei', 'sslscan', 'sslyze', 'testssl.sh',
+    'hydra', 'john', 'hashcat', 'enum4linux', 'nbtscan', 'smbclient',
+    'dnsenum', 'dnsrecon', 'fierce', 'amass', 'subfinder', 'theHarvester',
+    'whois', 'dig', 'host', 'curl', 'searchsploit',
+)
+
+logger = get_logger('command_resolver')
+
+
+class ToolNotAllowedError(Exception):
+    """Raised for a tool that is not on the allowlist"""
+
+
+class ToolNotFoundError(Exception):
+    """Raised when a tool's executable is not on PATH"""
+
+
+class CommandResolver:
+    """Caches tool name -> executable path for the current PATH"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._cache = {}
+        self._path = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def allowed(self, name):
+        allowlist = self.settings.get('allowlist')
+        return allowlist is None or name in allowlist
+
+    def which(self, name):
+        """Absolute path of name on PATH, cached until PATH changes"""
+        path = os.environ.get('PATH', os.defpath)
+        with self._lock:
+            if path != self._path:
+                self._cache.clear()
+                self._path = path
+            cached = self._cache.get(name)
+        if cached is not None and os.access(cached, os.X_OK):
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        resolved = shutil.which(name, path=path)
+        if resolved is None:
+            raise ToolNotFoundError(f'{name} was not found on PATH')
+        resolved = os.path.abspath(resolved)
+        with self._lock:
+            if path == self._path:
+                self._cache[name] = resolved
+        return resolved
+
+    def resolve_tool(self, name):
+        """which() for a user-supplied tool name, enforcing the allowlist"""
+        if not name or not self.allowed(name):
+            raise ToolNotAllowedError(f'Tool {name!r} is not in the security_tools allowlist')
+        if os.sep in name or (os.altsep and os.altsep in name):
+            # Paths skip the PATH lookup; with an allowlist they must be listed as paths
+            if not os.access(name, os.X_OK):
+                raise ToolNotFoundError(f'{name} is not executable')
+            return os.path.abspath(name)
+        return self.which(name)
+
+    def validate(self):
+        """Resolve every allowlisted tool once, returning name -> path or None"""
+        allowlist = self.settings.get('allowlist')
+        if allowlist is None:
+            return {}
+        resolved = {}
+        for name in allowlist:
+            try:
+                resolved[name] = self.resolve_tool(name)
+            except (ToolNotAllowedError, ToolNotFoundError):
+                resolved[name] = None
+        missing = [name for name, path in resolved.items() if path is None]
+        if missing:
+            # Most hosts lack some of the default tools, that is no cause for a warning
+            log = logger.info if list(allowlist) == list(DEFAULT_ALLOWLIST) else logger.warning
+            log('Allowlisted tools not found on PATH', extra={'tools': missing})
+        return resolved
+
+    def stats(self):
+        with self._lock:
+            return {'cached': len(self._cache), 'hits': self.hits, 'misses': self.misses}
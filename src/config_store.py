@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Persistent server configuration with atomic writes and hot reload.
+
+ConfigStore owns ``server_config``.  The file at ``path`` holds only the
+settings that differ from the built-in defaults, as a JSON object of
+sections, e.g. ``{"burp": {"port": 9886}}``.  It is merged over the
+defaults at startup.
+
+Writers go through ``update()``, which serialises them, rewrites the file
+with a write to a temporary file, fsync and ``os.replace`` and then
+publishes a new snapshot.  A snapshot is a deep copy of the configuration
+that is never modified once published, so ``snapshot()`` is a plain
+attribute read: readers take no lock and always see every key of one
+version.  The section dicts that modules hold on to are updated in the same
+synchronous step, so nothing sees half of an update either way.  When
+several processes share the file, each update re-reads it under an
+``flock`` first so no process overwrites another's change.
+
+``watch()`` follows the file with inotify where available and falls back
+to polling its stat every ``poll_interval`` seconds.  Edits made by hand or
+by another process are applied and reported to ``on_change`` per changed
+section; a file that does not parse is logged and ignored.
+"""
+
+import asyncio
+import contextlib
+import copy
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+import sys
+import tempfile
+
+from log_pipeline import get_logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+DEFAULT_PATH = '~/.config/kali-mcp/config.json'
+DEFAULT_POLL_INTERVAL = 1.0
+# Editors and other writers often produce several events per save
+DEBOUNCE_SECONDS = 0.05
+PATH_ENV = 'KALI_MCP_CONFIG'
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+INOTIFY_EVENT = struct.Struct('iIII')
+
+logger = get_logger('config_store')
+
+
+class ConfigError(Exception):
+    """Raised for a configuration file that cannot be used"""
+
+
+def _signature(path):
+    """Identity of the file's current contents, None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class InotifyWatch:
+    """inotify watch on a directory, via libc since the stdlib has no binding"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f'inotify_add_watch failed for {directory}')
+
+    def names(self):
+        """File names with pending events"""
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigStore:
+    """server_config with copy-on-write snapshots, file persistence and reload"""
+
+    def __init__(self, config, settings, on_change=None):
+        self.config = config
+        self.settings = settings
+        self.on_change = on_change
+        self.defaults = copy.deepcopy(config)
+        self.path = None
+        self.overrides = {}
+        self.version = 0
+        self._snapshot = copy.deepcopy(config)
+        self._signature = None
+        self._lock = asyncio.Lock()
+
+    def snapshot(self):
+        """The current configuration; treat it as read-only"""
+        return self._snapshot
+
+    @staticmethod
+    def default_path():
+        return os.environ.get(PATH_ENV) or DEFAULT_PATH
+
+    def load(self, path=None):
+        """Read the file at path (default: $KALI_MCP_CONFIG or the default path) and apply it"""
+        self.path = os.path.abspath(os.path.expanduser(path or self.default_path()))
+        signature = _signature(self.path)
+        overrides = self._read()
+        self._signature = signature
+        changed = self._apply(overrides)
+        logger.info('Configuration loaded', extra={'path': self.path, 'sections': changed})
+        return changed
+
+    async def update(self, section, changes):
+        """Change keys of one section, persist the change and publish a new snapshot
+
+        Returns the section as it now stands.  Sections that another process
+        changed in the file in the meantime are applied and reported to
+        on_change as well.
+        """
+        if section not in self.defaults:
+            raise ConfigError(f'Unknown configuration section {section!r}')
+        async with self._lock:
+            if self.path is None:
+                overrides = copy.deepcopy(self.overrides)
+                overrides.setdefault(section, {}).update(changes)
+            else:
+                overrides = await asyncio.to_thread(self._commit, section, changes)
+            changed = self._apply(overrides)
+        await self._notify([name for name in changed if name != section])
+        return self._snapshot[section]
+
+    def refresh(self):
+        """Publish changes made to the live sections in place, e.g. by the worker sync, without persisting them"""
+        if self.config != self._snapshot:
+            self._publish()
+
+    def _commit(self, section, changes):
+        with self._file_lock():
+            # Build on the file rather than on memory if another process wrote it
+            if _signature(self.path) != self._signature:
+                overrides = self._read()
+            else:
+                overrides = copy.deepcopy(self.overrides)
+            overrides.setdefault(section, {}).update(changes)
+            self._write(overrides)
+        return overrides
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read(self):
+        """Overrides from the file, {} if it does not exist"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            raise ConfigError(f'Cannot read {self.path}: {e}') from e
+        if not isinstance(data, dict):
+            raise ConfigError(f'{self.path} must contain a JSON object of sections')
+
+        overrides = {}
+        for section, values in data.items():
+            if section not in self.defaults or not isinstance(values, dict):
+                logger.warning('Ignoring unknown configuration section', extra={'path': self.path, 'section': section})
+                continue
+            overrides[section] = values
+        return overrides
+
+    def _write(self, overrides):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(prefix='.config-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(overrides, f, indent=2, sort_keys=True)
+                f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temporary)
+            raise
+        if sys.platform != 'win32':
+            # Make the rename itself durable
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        # Our own write must not come back as a reload
+        self._signature = _signature(self.path)
+
+    def _merged(self, overrides, section):
+        return {**self.defaults[section], **overrides.get(section, {})}
+
+    def _apply(self, overrides):
+        """Make defaults + overrides the live configuration, returning the changed sections
+
+        Only keys whose merged value changed are written, so settings changed
+        in place for this run (command line options) survive an update of
+        another key in their section.
+        """
+        changed = []
+        for section in self.defaults:
+            old = self._merged(self.overrides, section)
+            new = self._merged(overrides, section)
+            keys = [key for key in new if key not in old or new[key] != old[key]]
+            if keys:
+                self.config[section].update({key: copy.deepcopy(new[key]) for key in keys})
+                changed.append(section)
+        self.overrides = overrides
+        if changed:
+            self._publish()
+        return changed
+
+    def _publish(self):
+        self._snapshot = copy.deepcopy(self.config)
+        self.version += 1
+
+    async def reload(self):
+        """Apply the file if it changed since it was last read or written"""
+        signature = _signature(self.path)
+        if signature == self._signature:
+            return []
+        async with self._lock:
+            try:
+                overrides = self._read()
+            except ConfigError as e:
+                logger.warning('Configuration file not reloaded', extra={'error': str(e)})
+                return []
+            self._signature = signature
+            changed = self._apply(overrides)
+        if changed:
+            logger.info('Configuration reloaded', extra={'path': self.path, 'sections': changed})
+        await self._notify(changed)
+        return changed
+
+    async def _notify(self, sections):
+        if self.on_change is None:
+            return
+        for section in sections:
+            try:
+                await self.on_change(section)
+            except Exception as e:
+                logger.error('Configuration change hook failed', extra={'section': section, 'error': str(e)})
+
+    async def watch(self):
+        """Reload the file whenever it changes, until cancelled"""
+        if self.path is None:
+            return
+        watch = None
+        if self.settings.get('watch', 'auto') in ('auto', 'inotify') and sys.platform.startswith('linux'):
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                watch = InotifyWatch(os.path.dirname(self.path))
+            except (OSError, AttributeError) as e:
+                logger.info('inotify unavailable, polling the configuration file', extra={'error': str(e)})
+        try:
+            if watch is not None:
+                await self._watch_inotify(watch)
+            else:
+                await self._watch_poll()
+        finally:
+            if watch is not None:
+                watch.close()
+
+    async def _watch_inotify(self, watch):
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        loop.add_reader(watch.fd, ready.set)
+        name = os.path.basename(self.path)
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                if name not in watch.names():
+                    continue
+                await asyncio.sleep(DEBOUNCE_SECONDS)
+                watch.names()
+                await self.reload()
+        finally:
+            loop.remove_reader(watch.fd)
+
+    async def _watch_poll(self):
+        while True:
+            await asyncio.sleep(self.settings.get('poll_interval', DEFAULT_POLL_INTERVAL))
+            await self.reload()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Local indexed copy of Burp's proxy HTTP and WebSocket history.
+
+Burp only offers offset based paging over its history, so filtering a large
+history by regex means re-reading and re-scanning it for every page.  This
+store keeps an incremental SQLite copy instead: each sync fetches only the
+items after the last one seen, indexes host, path, method, status and
+content type, and queries are answered locally with cursor based paging
+on the stable Burp history index.  Queries with a regex run in the child
+processes of a RegexSandbox so a runaway pattern is cut off at its time
+budget instead of stalling the server.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from regex_filter import RegexSandbox, compile_filter, regexp
+
+
+DEFAULT_SYNC_BATCH = 200
+END_OF_ITEMS = 'Reached end of items'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS http_history (
+    id INTEGER PRIMARY KEY,
+    host TEXT,
+    method TEXT,
+    path TEXT,
+    status INTEGER,
+    content_type TEXT,
+    request TEXT,
+    response TEXT,
+    raw TEXT
+);
+CREATE INDEX IF NOT EXISTS http_history_host ON http_history (host, id);
+CREATE INDEX IF NOT EXISTS http_history_path ON http_history (path, id);
+CREATE INDEX IF NOT EXISTS http_history_status ON http_history (status, id);
+CREATE INDEX IF NOT EXISTS http_history_method ON http_history (method, id);
+CREATE INDEX IF NOT EXISTS http_history_content_type ON http_history (content_type, id);
+
+CREATE TABLE IF NOT EXISTS websocket_history (
+    id INTEGER PRIMARY KEY,
+    direction TEXT,
+    payload TEXT,
+    raw TEXT
+);
+CREATE INDEX IF NOT EXISTS websocket_history_direction ON websocket_history (direction, id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    kind TEXT PRIMARY KEY,
+    next_offset INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+'''
+
+KINDS = ('http', 'websocket')
+
+
+class HistorySyncError(Exception):
+    """Raised when the history could not be fetched from Burp"""
+
+
+def encode_cursor(kind, last_id):
+    return base64.urlsafe_b64encode(f'{kind}:{last_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(kind, cursor):
+    """Return the last history index a cursor points past, or -1 for no cursor"""
+    if not cursor:
+        return -1
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_kind, last_id = base64.urlsafe_b64decode(padded).decode().split(':')
+        if cursor_kind != kind:
+            raise ValueError
+        return int(last_id)
+    except ValueError:
+        raise ValueError(f'Invalid cursor for {kind} history: {cursor}')
+
+
+def parse_http_item(raw):
+    """Extract the indexed columns from one Burp HTTP history item"""
+    try:
+        item = json.loads(raw)
+    except ValueError:
+        item = {'request': raw, 'response': ''}
+    request = item.get('request') or ''
+    response = item.get('response') or ''
+
+    method = path = host = content_type = None
+    status = None
+    request_lines = request.split('\n')
+    parts = request_lines[0].split(' ')
+    if len(parts) >= 2:
+        method, path = parts[0].strip(), parts[1].strip()
+    for line in request_lines[1:]:
+        if not line.strip():
+            break
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'host':
+            host = value.strip()
+
+    response_lines = response.split('\n')
+    parts = response_lines[0].split(' ')
+    if len(parts) >= 2 and parts[1].strip().isdigit():
+        status = int(parts[1])
+    for line in response_lines[1:]:
+        if not line.strip():
+            break
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-type':
+            content_type = value.split(';')[0].strip().lower()
+
+    return host, method, path, status, content_type, request, response
+
+
+def parse_websocket_item(raw):
+    try:
+        item = json.loads(raw)
+    except ValueError:
+        item = {'payload': raw}
+    return item.get('direction'), item.get('payload') or ''
+
+
+def split_items(text):
+    """Split a Burp history page into raw items"""
+    text = text.strip()
+    if not text or text == END_OF_ITEMS:
+        return []
+    return [item for item in text.split('\n\n') if item.strip()]
+
+
+class HistoryStore:
+    """SQLite copy of Burp proxy history with incremental sync"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.regex = RegexSandbox(settings)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._sync_locks = {kind: asyncio.Lock() for kind in KINDS}
+
+    @property
+    def path(self):
+        return os.path.expanduser(self.settings.get('db_path', ':memory:'))
+
+    def _connect(self):
+        if self._conn is None:
+            path = self.path
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            conn.create_function('regexp', 2, regexp, deterministic=True)
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(self._connect(), *args)
+        return await asyncio.to_thread(locked)
+
+    async def sync(self, kind, fetch_page):
+        """Fetch items added to Burp since the last sync
+
+        fetch_page(count, offset) returns one page of Burp's history as text.
+        The last stored item is re-fetched along with the new ones; if it no
+        longer matches (Burp project changed or history cleared) the local
+        copy is rebuilt from scratch.
+        """
+        batch = self.settings.get('sync_batch', DEFAULT_SYNC_BATCH)
+        async with self._sync_locks[kind]:
+            offset, last_raw = await self._run(self._sync_position, kind)
+            if offset > 0:
+                page = split_items(await fetch_page(batch, offset - 1))
+                if page and page[0] == last_raw:
+                    new_items = page[1:]
+                else:
+                    await self._run(self._clear, kind)
+                    offset = 0
+                    page = new_items = split_items(await fetch_page(batch, 0))
+            else:
+                page = new_items = split_items(await fetch_page(batch, 0))
+
+            added = 0
+            while True:
+                if new_items:
+                    await self._run(self._insert, kind, offset, new_items)
+                    offset += len(new_items)
+                    added += len(new_items)
+                if len(page) < batch:
+                    break
+                page = new_items = split_items(await fetch_page(batch, offset))
+
+            await self._run(self._mark_synced, kind, offset)
+            return added
+
+    async def query_http(self, regex=None, host=None, method=None, status=None, content_type=None,
+                         path_prefix=None, after=-1, limit=10, offset=0):
+        clauses, params = ['id > ?'], [after]
+        if host:
+            clauses.append('host = ?')
+            params.append(host)
+        if method:
+            clauses.append('method = ?')
+            params.append(method.upper())
+        if status is not None:
+            clauses.append('status = ?')
+            params.append(status)
+        if content_type:
+            clauses.append('content_type = ?')
+            params.append(content_type.lower())
+        if path_prefix:
+            clauses.append('substr(path, 1, ?) = ?')
+            params.extend([len(path_prefix), path_prefix])
+        if regex:
+            compile_filter(regex)
+            # Matched against each part on its own so no match spans the boundary
+            clauses.append('(request REGEXP ? OR response REGEXP ?)')
+            params.extend([regex, regex])
+        return await self._query('http_history', clauses, params, limit, offset, isolated=bool(regex))
+
+    async def query_websocket(self, regex=None, direction=None, after=-1, limit=10, offset=0):
+        clauses, params = ['id > ?'], [after]
+        if direction:
+            clauses.append('direction = ?')
+            params.append(direction)
+        if regex:
+            compile_filter(regex)
+            clauses.append('payload REGEXP ?')
+            params.append(regex)
+        return await self._query('websocket_history', clauses, params, limit, offset, isolated=bool(regex))
+
+    async def _query(self, table, clauses, params, limit, offset, isolated=False):
+        sql = f'SELECT * FROM {table} WHERE {" AND ".join(clauses)} ORDER BY id LIMIT ? OFFSET ?'
+        params = [*params, limit, offset]
+        # An in-memory database is only visible to this process
+        if isolated and self.path != ':memory:':
+            # Open here first so the file and schema exist for the read-only child
+            await self._run(self._connect_only)
+            return await self.regex.query(self.path, sql, params)
+        return await self._run(self._select, sql, params)
+
+    @staticmethod
+    def _connect_only(conn):
+        pass
+
+    @staticmethod
+    def _select(conn, sql, params):
+        return [dict(row) for row in conn.execute(sql, params)]
+
+    async def close(self):
+        await self.regex.close()
+
+    @staticmethod
+    def _sync_position(conn, kind):
+        row = conn.execute('SELECT next_offset FROM sync_state WHERE kind = ?', (kind,)).fetchone()
+        next_offset = row[0] if row else 0
+        last = conn.execute(f'SELECT raw FROM {kind}_history WHERE id = ?', (next_offset - 1,)).fetchone()
+        return (next_offset, last[0]) if last else (0, None)
+
+    @staticmethod
+    def _clear(conn, kind):
+        with conn:
+            conn.execute(f'DELETE FROM {kind}_history')
+            conn.execute('DELETE FROM sync_state WHERE kind = ?', (kind,))
+
+    @staticmethod
+    def _insert(conn, kind, offset, items):
+        with conn:
+            if kind == 'http':
+                conn.executemany(
+                    'INSERT OR REPLACE INTO http_history '
+                    '(id, host, method, path, status, content_type, request, response, raw) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(offset + index, *parse_http_item(raw), raw) for index, raw in enumerate(items)]
+                )
+            else:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO websocket_history (id, direction, payload, raw) VALUES (?, ?, ?, ?)',
+                    [(offset + index, *parse_websocket_item(raw), raw) for index, raw in enumerate(items)]
+                )
+
+    @staticmethod
+    def _mark_synced(conn, kind, next_offset):
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sync_state (kind, next_offset, synced_at) VALUES (?, ?, ?)',
+                (kind, next_offset, time.time())
+            )
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Shared outbound HTTP client for the request tools.
+
+One aiohttp ClientSession lives for the whole server process so that
+repeated requests to the same host reuse keep-alive connections, cached DNS
+answers and TLS sessions instead of paying for a new connector every call.
+
+HTTP/2 requests go through a separate httpx client with h2 enabled.  It
+negotiates the protocol with ALPN and multiplexes concurrent requests to one
+origin over a single connection.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import logging
+import re
+import urllib.parse
+from dataclasses import dataclass
+from typing import Optional
+
+from lazy_imports import aiohttp, httpx
+
+
+# httpx logs every request at INFO, which would flood stderr on the stdio transport
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 10
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_TTL_DNS_CACHE = 300
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_BODY_BYTES = 5000
+READ_CHUNK_SIZE = 64 * 1024
+
+CHARSET_PARAM_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+SNIFF_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)|<\?xml[^>]+encoding=["\']([\w.:-]+)', re.IGNORECASE)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Headers that are connection-specific and forbidden in HTTP/2 (RFC 9113 8.2.2)
+HTTP2_FORBIDDEN_HEADERS = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+PSEUDO_HEADERS = (':method', ':scheme', ':authority', ':path')
+
+
+def build_http2_request(method, url, pseudo_headers=None, headers=None):
+    """Resolve pseudo-headers into the method, URL and headers of an HTTP/2 request
+
+    :method, :authority and :path override the corresponding parts of
+    method/url.  :scheme is only accepted when it matches the URL's scheme:
+    httpx sends the scheme of the connection, so any other value would
+    either not reach the wire or change the connection (e.g. https to http).
+    Returns (method, url, headers, effective_pseudo_headers).
+    """
+    pseudo_headers = pseudo_headers or {}
+    unknown = [name for name in pseudo_headers if name not in PSEUDO_HEADERS]
+    if unknown:
+        raise ValueError(f'Unsupported pseudo-header(s): {", ".join(unknown)}')
+
+    parts = urllib.parse.urlsplit(url)
+    method = pseudo_headers.get(':method', method).upper()
+    scheme = parts.scheme
+    if pseudo_headers.get(':scheme', scheme).lower() != scheme.lower():
+        raise ValueError(f':scheme {pseudo_headers[":scheme"]!r} does not match the URL scheme {scheme!r}')
+    path = pseudo_headers.get(':path') or urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+    # The connection always goes to the URL's origin with the URL's scheme;
+    # :authority only changes the value sent on the wire, which httpx takes
+    # from the Host header.
+    resolved_url = f'{scheme}://{parts.netloc}{path}'
+    authority = parts.netloc
+
+    request_headers = {}
+    for name, value in (headers or {}).items():
+        if name.startswith(':'):
+            raise ValueError(f'Pseudo-header {name} must be passed in pseudo_headers')
+        if name.lower() in HTTP2_FORBIDDEN_HEADERS:
+            continue
+        if name.lower() == 'host':
+            authority = value
+            continue
+        request_headers[name] = value
+
+    authority = pseudo_headers.get(':authority', authority)
+    request_headers['Host'] = authority
+
+    effective = {':method': method, ':scheme': scheme, ':authority': authority, ':path': path}
+    return method, resolved_url, request_headers, effective
+
+
+@dataclass
+class BoundedBody:
+    """Response body read up to a byte cap"""
+    data: bytes
+    total_bytes: Optional[int]
+    truncated: bool
+    charset: str
+    sha256: Optional[str] = None
+
+    def text(self):
+        """Decode the retained bytes, dropping a multi-byte sequence cut by the cap"""
+        decoder = codecs.getincrementaldecoder(self.charset)(errors='replace')
+        return decoder.decode(self.data, final=not self.truncated)
+
+
+def detect_charset(content_type, first_chunk):
+    """Pick a charset from the Content-Type header, a BOM or an HTML/XML declaration"""
+    match = CHARSET_PARAM_RE.search(content_type or '')
+    candidates = [match.group(1)] if match else []
+
+    for bom, charset in BOMS:
+        if first_chunk.startswith(bom):
+            candidates.append(charset)
+            break
+
+    match = SNIFF_CHARSET_RE.search(first_chunk[:1024])
+    if match:
+        candidates.append((match.group(1) or match.group(2)).decode('ascii'))
+
+    for charset in candidates:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+async def read_bounded_body(chunks, max_bytes, headers, hash_body=False):
+    """Read an async iterator of body chunks keeping at most max_bytes
+
+    Reading stops as soon as the cap is reached unless hash_body is set, in
+    which case the rest of the body is streamed through SHA-256 and dropped.
+    total_bytes is None when reading stopped early and the server did not
+    announce a usable Content-Length for the decoded body.
+    """
+    retained = bytearray()
+    digest = hashlib.sha256() if hash_body else None
+    total = 0
+    first_chunk = None
+    exhausted = True
+
+    async for chunk in chunks:
+        if first_chunk is None:
+            first_chunk = chunk
+        total += len(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        if len(retained) < max_bytes:
+            retained += chunk[:max_bytes - len(retained)]
+        if total > max_bytes and digest is None:
+            exhausted = False
+            break
+
+    content_length = headers.get('Content-Length', '')
+    if exhausted:
+        total_bytes = total
+    elif content_length.isdigit() and 'Content-Encoding' not in headers:
+        total_bytes = int(content_length)
+    else:
+        total_bytes = None
+
+    return BoundedBody(
+        data=bytes(retained),
+        total_bytes=total_bytes,
+        truncated=total > max_bytes,
+        charset=detect_charset(headers.get('Content-Type'), first_chunk or b''),
+        sha256=digest.hexdigest() if digest is not None else None,
+    )
+
+
+class HttpClientPool:
+    """Owns the long-lived aiohttp session and the HTTP/2 httpx client"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._session = None
+        self._http2_client = None
+        self._loop = None
+        self._lock = None
+
+    async def open(self):
+        """Create the shared session if it does not exist yet"""
+        await self.get_session()
+
+    async def get_session(self):
+        """Return the shared session, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+
+        self._bind_loop(loop)
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = self._create_session()
+        return self._session
+
+    async def get_http2_client(self):
+        """Return the shared HTTP/2 capable httpx client, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._http2_client is not None and not self._http2_client.is_closed and self._loop is loop:
+            return self._http2_client
+
+        self._bind_loop(loop)
+        async with self._lock:
+            if self._http2_client is None or self._http2_client.is_closed:
+                self._http2_client = self._create_http2_client()
+        return self._http2_client
+
+    async def close(self):
+        """Close the shared clients and release pooled connections"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+        http2_client, self._http2_client = self._http2_client, None
+        if http2_client is not None and not http2_client.is_closed:
+            await http2_client.aclose()
+
+    def _bind_loop(self, loop):
+        # Clients cannot be shared between event loops
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+            self._session = None
+            self._http2_client = None
+
+    def _create_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.settings.get('limit', DEFAULT_LIMIT),
+            limit_per_host=self.settings.get('limit_per_host', DEFAULT_LIMIT_PER_HOST),
+            keepalive_timeout=self.settings.get('keepalive_timeout', DEFAULT_KEEPALIVE_TIMEOUT),
+            ttl_dns_cache=self.settings.get('ttl_dns_cache', DEFAULT_TTL_DNS_CACHE),
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.settings.get('timeout', DEFAULT_TIMEOUT))
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def _create_http2_client(self):
+        limits = httpx.Limits(
+            max_connections=self.settings.get('limit', DEFAULT_LIMIT),
+            max_keepalive_connections=self.settings.get('limit', DEFAULT_LIMIT),
+            keepalive_expiry=self.settings.get('keepalive_timeout', DEFAULT_KEEPALIVE_TIMEOUT),
+        )
+        return httpx.AsyncClient(
+            http2=True,
+            limits=limits,
+            timeout=self.settings.get('timeout', DEFAULT_TIMEOUT),
+            follow_redirects=False,
+        )
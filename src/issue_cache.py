@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Cached, deduplicated view of Burp scanner issues.
+
+Paging through Burp's scanner issues with count/offset re-runs a full
+export for every page.  IssueCache exports the issue list at most once per
+refresh interval, groups issues by type, host and path, and stamps every
+new or changed group with an increasing sequence number.  Opaque cursors
+carry the last sequence number a client has seen, so the same cursor
+serves both paging and "what changed since" polling.
+
+Burp exports the issues of all scans as one list and cannot narrow the
+export to a single scan task, so there is one cache for the whole list.
+
+With a SharedState store (multi-worker mode) the cache is saved there
+after each export and loaded before each freshness check, so cursors
+issued by one worker stay valid on the others.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import time
+import urllib.parse
+from dataclasses import asdict, dataclass, field
+
+from history_store import split_items
+
+
+DEFAULT_REFRESH_INTERVAL = 5
+DEFAULT_EXPORT_BATCH = 500
+# Key of the cached export in the SharedState store
+STORE_KEY = 'all'
+
+
+@dataclass
+class IssueGroup:
+    """All reported instances of one issue type on one host and path"""
+    key: tuple
+    name: str
+    host: str
+    path: str
+    severity: str
+    confidence: str
+    count: int
+    fingerprint: str
+    seq: int
+    issue: dict
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(key=tuple(data.pop('key')), **data)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'host': self.host,
+            'path': self.path,
+            'severity': self.severity,
+            'confidence': self.confidence,
+            'count': self.count,
+            'seq': self.seq,
+            'issue': self.issue,
+        }
+
+
+@dataclass
+class ScannerIssues:
+    """Cached issue groups of Burp's issue list"""
+    groups: dict = field(default_factory=dict)
+    seq: int = 0
+    refreshed_at: float = 0.0
+    raw_issues: list = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def parse_issue(raw):
+    """Return (key, parsed issue) for one raw issue exported by Burp"""
+    try:
+        issue = json.loads(raw)
+    except ValueError:
+        issue = {'name': raw.split('\n', 1)[0], 'detail': raw}
+    if not isinstance(issue, dict):
+        issue = {'name': str(issue)}
+
+    name = issue.get('name') or issue.get('issueType') or issue.get('type') or 'unknown'
+    url = urllib.parse.urlsplit(issue.get('baseUrl') or issue.get('url') or '')
+    host = url.netloc or issue.get('host') or ''
+    path = issue.get('path') or url.path or '/'
+    return (name, host, path), issue
+
+
+def encode_issue_cursor(seq):
+    payload = json.dumps({'k': 'issues', 's': seq}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_issue_cursor(cursor):
+    """Return the sequence number a cursor points past, or 0 for no cursor"""
+    if not cursor:
+        return 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if payload['k'] != 'issues':
+            raise ValueError
+        return int(payload['s'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f'Invalid scanner issue cursor: {cursor}')
+
+
+class IssueCache:
+    """Cache of Burp's scanner issue list"""
+
+    def __init__(self, settings, store=None):
+        self.settings = settings
+        self.store = store
+        self.issues = ScannerIssues()
+        self.exports = 0
+
+    async def refresh(self, fetch_page, force=False):
+        """Re-export the issues unless the cached copy is fresh enough"""
+        issues = self.issues
+        async with issues.lock:
+            if self.store is not None:
+                await self._load(issues)
+            interval = self.settings.get('refresh_interval', DEFAULT_REFRESH_INTERVAL)
+            if not force and time.time() - issues.refreshed_at < interval:
+                return issues
+
+            batch = self.settings.get('export_batch', DEFAULT_EXPORT_BATCH)
+            raw_issues, offset = [], 0
+            while True:
+                page = split_items(await fetch_page(batch, offset))
+                raw_issues.extend(page)
+                offset += len(page)
+                if len(page) < batch:
+                    break
+            self.exports += 1
+            self._merge(issues, raw_issues)
+            issues.raw_issues = raw_issues
+            issues.refreshed_at = time.time()
+            if self.store is not None:
+                await self._save(issues)
+            return issues
+
+    async def _load(self, issues):
+        saved, _ = await self.store.get('issue_cache', STORE_KEY)
+        if saved is None or saved['refreshed_at'] <= issues.refreshed_at:
+            return
+        groups = [IssueGroup.from_dict(group) for group in saved['groups']]
+        issues.groups = {group.key: group for group in groups}
+        issues.seq = saved['seq']
+        issues.raw_issues = saved['raw_issues']
+        issues.refreshed_at = saved['refreshed_at']
+
+    async def _save(self, issues):
+        await self.store.put('issue_cache', STORE_KEY, {
+            'groups': [{**asdict(group), 'key': list(group.key)} for group in issues.groups.values()],
+            'seq': issues.seq,
+            'raw_issues': issues.raw_issues,
+            'refreshed_at': issues.refreshed_at,
+        })
+
+    @staticmethod
+    def _merge(issues, raw_issues):
+        grouped = {}
+        for raw in raw_issues:
+            key, issue = parse_issue(raw)
+            entry = grouped.setdefault(key, {'issue': issue, 'raws': []})
+            entry['raws'].append(raw)
+
+        for key, entry in grouped.items():
+            fingerprint = hashlib.sha1('\n\n'.join(sorted(entry['raws'])).encode()).hexdigest()
+            existing = issues.groups.get(key)
+            if existing is not None and existing.fingerprint == fingerprint:
+                continue
+            issues.seq += 1
+            issue = entry['issue']
+            issues.groups[key] = IssueGroup(
+                key=key,
+                name=key[0],
+                host=key[1],
+                path=key[2],
+                severity=issue.get('severity', ''),
+                confidence=issue.get('confidence', ''),
+                count=len(entry['raws']),
+                fingerprint=fingerprint,
+                seq=issues.seq,
+                issue=issue,
+            )
+
+        # Groups that disappeared from the export are fixed or were removed
+        for key in set(issues.groups) - set(grouped):
+            del issues.groups[key]
+
+    @staticmethod
+    def changed_since(issues, seq, limit):
+        """Groups with a sequence number above seq, oldest change first"""
+        groups = sorted((group for group in issues.groups.values() if group.seq > seq), key=lambda group: group.seq)
+        return groups[:limit], len(groups)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Background jobs for long-running tools.
+
+A job wraps one command, either a shell command line or an argv list run
+without a shell, executed through the shared ProcessRunner.  Starting a job
+returns immediately with its ID; the client then polls ``status`` and pages
+through ``output`` instead of holding an MCP request open for the whole
+run.  Finished jobs are kept in a bounded table and evicted by age or
+count.
+
+With a SharedState store (multi-worker mode) every job is also published
+there while it runs, so job_status, job_output and job_cancel work from
+any worker, not only the one that started the job.  Each publish writes
+the job's state and only the output lines added since the previous one.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from process_runner import OutputRing, ProcessTimeoutError
+
+
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_MAX_COMPLETED = 100
+DEFAULT_MAX_AGE = 3600
+DEFAULT_OUTPUT_BYTES = 1024 * 1024
+DEFAULT_PUBLISH_INTERVAL = 1.0
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled', 'timeout')
+
+
+@dataclass
+class Job:
+    """State of a single background job"""
+    id: str
+    kind: str
+    command: object  # shell command line, or an argv list run without a shell
+    timeout: Optional[int] = None
+    status: str = 'queued'
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    returncode: Optional[int] = None
+    error: Optional[str] = None
+    output: OutputRing = field(default_factory=OutputRing)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    # Absolute number of the first output line not yet in the SharedState store
+    published_lines: int = field(default=0, repr=False)
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    async def append_output(self, stream_name, line):
+        self.output.append(line if stream_name == 'stdout' else f'[stderr] {line}')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'command': self.command,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'returncode': self.returncode,
+            'error': self.error,
+            'output_lines': self.output.total_lines,
+            'output_dropped_lines': self.output.dropped_lines,
+        }
+
+
+@dataclass
+class JobSnapshot:
+    """Read-only copy of a job published by another worker"""
+    data: dict
+    output: OutputRing
+    worker: int
+
+    @property
+    def id(self):
+        return self.data['id']
+
+    @property
+    def status(self):
+        return self.data['status']
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def to_dict(self):
+        return {**self.data, 'worker': self.worker}
+
+
+class JobManager:
+    """In-process scheduler for background jobs with bounded history"""
+
+    def __init__(self, settings, runner, store=None):
+        self.settings = settings
+        self.runner = runner
+        self.store = store
+        self.jobs = {}
+        self._semaphore = None
+        self._evicted = []
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(int(self.settings.get('max_parallel', DEFAULT_MAX_PARALLEL)))
+        return self._semaphore
+
+    def submit(self, kind, command, timeout=None):
+        """Queue a shell command line or argv list and return its Job without waiting for it"""
+        self.evict()
+        job = Job(
+            id=uuid.uuid4().hex[:12],
+            kind=kind,
+            command=command,
+            timeout=timeout,
+            output=OutputRing(self.settings.get('output_bytes', DEFAULT_OUTPUT_BYTES)),
+        )
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._execute(job))
+        return job
+
+    def get(self, job_id):
+        self.evict()
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job, returning the Job or None"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if not job.finished and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def lookup(self, job_id):
+        """Return the local Job, a JobSnapshot published by another worker, or None"""
+        job = self.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        await self._flush_evicted()
+        stored = await self.store.load_job(job_id)
+        if stored is None:
+            return None
+        data, lines, dropped_lines, worker = stored
+        return JobSnapshot(data=data, output=OutputRing.from_lines(lines, dropped_lines), worker=worker)
+
+    async def list_all(self):
+        """Dicts of every known job, across workers when a store is configured"""
+        self.evict()
+        if self.store is None:
+            return [job.to_dict() for job in self.jobs.values()]
+        await self._flush_evicted()
+        for job in self.jobs.values():
+            await self._publish(job)
+        return await self.store.list_jobs()
+
+    async def request_cancel(self, job_id):
+        """Cancel a job here, or ask the worker that owns it to cancel it"""
+        job = self.cancel(job_id)
+        if job is not None or self.store is None:
+            return job
+        job = await self.lookup(job_id)
+        if job is not None and not job.finished:
+            await self.store.request_cancel(job_id)
+        return job
+
+    def evict(self):
+        """Drop finished jobs that are too old or exceed the table size"""
+        now = time.time()
+        max_age = self.settings.get('max_age', DEFAULT_MAX_AGE)
+        max_completed = self.settings.get('max_completed', DEFAULT_MAX_COMPLETED)
+
+        finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.finished_at)
+        for job in finished:
+            if now - job.finished_at > max_age:
+                del self.jobs[job.id]
+                self._evicted.append(job.id)
+        finished = [job for job in finished if job.id in self.jobs]
+        for job in finished[:max(len(finished) - max_completed, 0)]:
+            del self.jobs[job.id]
+            self._evicted.append(job.id)
+        if self.store is None:
+            self._evicted.clear()
+
+    async def _flush_evicted(self):
+        if self._evicted:
+            evicted, self._evicted = self._evicted, []
+            await self.store.delete_jobs(evicted)
+
+    async def _publish(self, job):
+        # Only lines added since the last publish are written, not the whole ring
+        output = job.output
+        start = max(job.published_lines, output.dropped_lines)
+        lines = output.slice(start)
+        await self.store.publish_job(job.to_dict(), lines, start, output.dropped_lines)
+        job.published_lines = start + len(lines)
+
+    async def _follow(self, job):
+        # Publish progress and pick up cancel requests made on other workers
+        interval = self.settings.get('publish_interval', DEFAULT_PUBLISH_INTERVAL)
+        published = None
+        while not job.finished:
+            state = (job.status, job.output.total_lines)
+            if state != published:
+                await self._publish(job)
+                published = state
+            if job.task is not None and await self.store.cancel_requested(job.id):
+                job.task.cancel()
+            await asyncio.sleep(interval)
+
+    async def _execute(self, job):
+        follower = asyncio.create_task(self._follow(job)) if self.store is not None else None
+        try:
+            async with self._get_semaphore():
+                job.status = 'running'
+                job.started_at = time.time()
+                if isinstance(job.command, list):
+                    result = await self.runner.stream(job.command, on_line=job.append_output, timeout=job.timeout)
+                else:
+                    result = await self.runner.stream_shell(job.command, on_line=job.append_output, timeout=job.timeout)
+            job.returncode = result.returncode
+            job.status = 'completed' if result.returncode == 0 else 'failed'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+        except ProcessTimeoutError as e:
+            job.status = 'timeout'
+            job.error = str(e)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            if follower is not None:
+                follower.cancel()
+                await asyncio.shield(self._publish(job))
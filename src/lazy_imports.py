@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Heavy and optional dependencies, imported once on first use.
+
+Starting the server and answering ``tools/list`` needs none of these, so
+they are not imported until a tool actually uses them.  Each LazyModule
+imports its module the first time an attribute is read and then copies the
+module namespace onto itself, so later attribute reads are plain instance
+lookups with no import machinery involved.
+"""
+
+import importlib
+import threading
+import time
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name, install_hint=None):
+        self._lazy_name = name
+        self._lazy_hint = install_hint
+        self._lazy_module = None
+        self._lazy_import_seconds = None
+        self._lazy_lock = threading.Lock()
+
+    # Methods carry the _lazy_ prefix so names copied from the module never shadow them
+
+    def _lazy_load(self):
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    started = time.perf_counter()
+                    try:
+                        module = importlib.import_module(self._lazy_name)
+                    except ImportError as e:
+                        if self._lazy_hint is None:
+                            raise
+                        raise ImportError(f'{self._lazy_name} is not installed ({self._lazy_hint})') from e
+                    self._lazy_import_seconds = time.perf_counter() - started
+                    self.__dict__.update(
+                        (name, value) for name, value in vars(module).items() if not name.startswith('__')
+                    )
+                    self._lazy_module = module
+        return self._lazy_module
+
+    def __getattr__(self, name):
+        # Only reached for names not yet copied, i.e. before the first load
+        # or for submodules imported later
+        return getattr(self._lazy_load(), name)
+
+    def __repr__(self):
+        state = 'not loaded' if self._lazy_module is None else 'loaded'
+        return f'<LazyModule {self._lazy_name} ({state})>'
+
+
+aiohttp = LazyModule('aiohttp', 'pip install aiohttp')
+httpx = LazyModule('httpx', 'pip install "httpx[http2]"')
+uvicorn = LazyModule('uvicorn', 'pip install uvicorn')
+zstandard = LazyModule('zstandard', 'pip install zstandard')
+
+MODULES = (aiohttp, httpx, uvicorn, zstandard)
+
+
+def status():
+    """Name -> import seconds for every lazy module, None if not imported yet"""
+    return {module._lazy_name: module._lazy_import_seconds for module in MODULES}
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Non-blocking structured logging.
+
+Records are formatted as JSON lines and handed to a bounded queue; a
+background thread writes them to stderr and, optionally, a rotating log
+file, so a full stderr pipe never blocks the event loop.  Every record
+carries the tool and call ID of the tool call it was logged from, and
+high-volume tools can be sampled down to a fraction of their records.
+When the queue is full new records are dropped and counted instead of
+waiting.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+from metrics import current_call_id, current_tool
+
+
+LOGGER_NAME = 'kali_mcp'
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_MAX_FIELD_CHARS = 2000
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def get_logger(name=None):
+    """Return the server logger or one of its children"""
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's extra fields inlined"""
+
+    def __init__(self, max_field_chars=DEFAULT_MAX_FIELD_CHARS):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def _clip(self, value):
+        if isinstance(value, str) and len(value) > self.max_field_chars:
+            return value[:self.max_field_chars] + f'... ({len(value) - self.max_field_chars} more chars)'
+        return value
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': self._clip(record.getMessage()),
+        }
+        for key in ('tool', 'call_id'):
+            value = getattr(record, key, '')
+            if value:
+                entry[key] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key not in ('tool', 'call_id') and key not in entry:
+                entry[key] = self._clip(value)
+        if record.exc_info:
+            entry['exc'] = self._clip(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current tool call's correlation fields and apply sampling"""
+
+    def __init__(self, sample_rates=None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+
+    def filter(self, record):
+        if not hasattr(record, 'tool'):
+            record.tool = current_tool.get()
+        if not hasattr(record, 'call_id'):
+            record.call_id = current_call_id.get()
+        rate = self.sample_rates.get(record.tool)
+        if rate is not None and record.levelno < logging.WARNING and random.random() >= rate:
+            return False
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Owns the queue, its writer thread and the sinks"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.handler = None
+        self.listener = None
+
+    @property
+    def dropped(self):
+        return self.handler.dropped if self.handler is not None else 0
+
+    def start(self):
+        if self.listener is not None:
+            return
+        logger = get_logger()
+        logger.setLevel(self.settings.get('level', 'INFO').upper())
+        logger.propagate = False
+
+        sinks = []
+        if self.settings.get('stderr', True):
+            sinks.append(logging.StreamHandler(sys.stderr))
+        path = self.settings.get('file')
+        if path:
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            sinks.append(logging.handlers.RotatingFileHandler(
+                path,
+                maxBytes=self.settings.get('max_bytes', DEFAULT_MAX_BYTES),
+                backupCount=self.settings.get('backup_count', DEFAULT_BACKUP_COUNT),
+                encoding='utf-8',
+            ))
+        # Records are already JSON once they leave the queue handler
+        for sink in sinks:
+            sink.setFormatter(logging.Formatter('%(message)s'))
+
+        log_queue = queue.Queue(self.settings.get('queue_size', DEFAULT_QUEUE_SIZE))
+        self.handler = DroppingQueueHandler(log_queue)
+        self.handler.setFormatter(JsonFormatter(self.settings.get('max_field_chars', DEFAULT_MAX_FIELD_CHARS)))
+        self.handler.addFilter(ContextFilter(self.settings.get('sample')))
+        logger.addHandler(self.handler)
+
+        self.listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=False)
+        self.listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the writer thread"""
+        if self.listener is None:
+            return
+        get_logger().removeHandler(self.handler)
+        self.listener.stop()
+        for sink in self.listener.handlers:
+            sink.close()
+        self.listener = None
+        if self.handler.dropped:
+            sys.stderr.write(json.dumps({
+                'ts': round(time.time(), 6),
+                'level': 'warning',
+                'logger': LOGGER_NAME,
+                'msg': 'Log records dropped because the queue was full',
+                'dropped': self.handler.dropped,
+            }) + '\n')
@@ -1,15 +1,72 @@
 #!/usr/bin/env python3
 
 import asyncio
+import atexit
 import json
-import subprocess
+import os
+import shutil
 import sys
 import base64
 import urllib.parse
 import random
+import shlex
 import time
+from contextlib import asynccontextmanager
 from typing import Any
-from mcp.server.fastmcp import FastMCP
+import anyio
+from mcp.server.fastmcp import FastMCP, Context
+from mcp.types import CallToolResult, ResourceLink, TextContent
+from starlette.responses import JSONResponse, PlainTextResponse
+from burp_controller import BurpCommandError, BurpController, BurpUnavailableError
+from burp_supervisor import BurpAlreadyRunningError, BurpSupervisor
+from config_store import ConfigError, ConfigStore
+from command_resolver import DEFAULT_ALLOWLIST, CommandResolver, ToolNotAllowedError, ToolNotFoundError
+from history_store import HistoryStore, HistorySyncError, decode_cursor, encode_cursor
+from issue_cache import IssueCache, decode_issue_cursor, encode_issue_cursor
+from http_client import READ_CHUNK_SIZE, BoundedBody, HttpClientPool, build_http2_request, read_bounded_body
+from job_manager import JobManager
+from lazy_imports import aiohttp, httpx
+from log_pipeline import LogPipeline, get_logger
+from metrics import Metrics
+from output_sink import OUTPUT_URI_PREFIX, OutputSink, SpilledOutputs, UnknownOutputError
+from process_runner import ProcessResult, ProcessRunner
+from rate_limiter import RateLimiter, RateLimitTimeoutError
+from response_store import ResponseStore, UnknownResponseError
+from result_cache import ResultCache
+from tool_output import BODY_URI_PREFIX, COMPRESSIONS, OUTPUT_MODES, BlobStore, compact_body, dumps
+from transforms import TransformError, run_chain
+from transports import TRANSPORTS, TransportRunner
+import workers
+
+# Task reloading the configuration file while the server runs
+_config_watch = None
+
+
+@asynccontextmanager
+async def shared_resources():
+    """Open the resources shared by all sessions once per process and close them on shutdown
+
+    Entered by TransportRunner around serving rather than used as the
+    FastMCP lifespan: with stateless HTTP (worker mode) and SSE, mcp runs
+    the lifespan per request or per session, which would close pooled
+    connections, the Burp channel and the regex sandbox after every call.
+    """
+    global _config_watch
+    await http_pool.open()
+    metrics.start_lag_monitor()
+    commands.validate()
+    _config_watch = asyncio.create_task(config_store.watch())
+    try:
+        yield
+    finally:
+        _config_watch.cancel()
+        # The serving task may already be cancelled at this point
+        with anyio.CancelScope(shield=True):
+            await http_pool.close()
+            await burp.close()
+            await history.close()
+            await metrics.stop_lag_monitor()
+
 
 # Initialize FastMCP server
 mcp = FastMCP(
@@ -21,6 +78,10 @@ mcp = FastMCP(
     debug=False
 )
 
+# Every tool registered below is wrapped to record calls, errors and latency
+metrics = Metrics()
+metrics.instrument(mcp)
+
 # Server configuration
 server_config = {
     'burp': {
@@ -28,6 +89,28 @@ server_config = {
         'port': 9876,
         'host': 'localhost',
         'allowConfigEdit': False,
+        'sse_path': '/',
+        'connect_timeout': 2,
+        'call_timeout': 60,
+        'max_backoff': 30,
+    },
+    'burp_process': {
+        # Seconds to wait for the extension port after starting Burp
+        'ready_timeout': 120,
+        'probe_interval': 0.5,
+        'restart': True,
+        'restart_backoff': 2.0,
+        'max_restart_backoff': 60,
+        'stop_timeout': 10,
+        'stop_on_exit': True,
+        # Keep a second, already started Burp to take over when the active one dies;
+        # standby_config must make its MCP extension listen on standby_port
+        'warm_standby': False,
+        'standby_port': 9880,
+        'standby_config': None,
+    },
+    'stdio': {
+        'enabled': True,
     },
     'sse': {
         'enabled': True,
@@ -38,228 +121,994 @@ server_config = {
         'enabled': False,
         'port': 9878,
         'host': 'localhost',
+        'path': '/',
+    },
+    'http': {
+        'enabled': False,
+        'port': 9879,
+        'host': 'localhost',
+        'path': '/mcp',
+    },
+    'transports': {
+        'shutdown_timeout': 5,
+        'exit_on_stdio_eof': True,
+        'log_level': 'warning',
+    },
+    'http_client': {
+        'limit': 100,
+        'limit_per_host': 10,
+        'keepalive_timeout': 30,
+        'ttl_dns_cache': 300,
+        'timeout': 30,
+        'max_body_bytes': 5000,
+    },
+    'http_rate_limit': {
+        # Pacing per origin (scheme://host:port) for send_http1/2_request
+        'enabled': True,
+        'rate': 10.0,           # requests per second
+        'burst': 20,
+        'max_concurrency': 4,   # requests in flight per origin
+        'queue_timeout': 30,    # seconds a request may wait for a slot
+        # 429/503 and connection failures multiply the rate by backoff_factor;
+        # each successful response adds recovery_step of it back
+        'backoff_factor': 0.5,
+        'min_rate': 0.5,
+        'recovery_step': 0.05,
+        'max_retry_after': 60,
+        'max_origins': 1024,
+        'origins': {},          # e.g. {'https://fragile.test:443': {'rate': 1, 'burst': 1, 'max_concurrency': 1}}
+    },
+    'tool_output': {
+        'mode': 'pretty',       # 'pretty' or 'compact'
+        'inline_bytes': 4096,
+        'store_bytes': 64 * 1024 * 1024,
+    },
+    'output_capture': {
+        # Subprocess/Burp output kept in memory; larger output spills to disk
+        # and the tool returns a preview plus tool-output:// page links
+        'memory_bytes': 64 * 1024,
+        'page_bytes': 64 * 1024,
+        'dir': None,            # None: a private temporary directory
+        'max_outputs': 64,
+        'max_disk_bytes': 1024 * 1024 * 1024,
+        'ttl': 3600,
+    },
+    'responses': {
+        # Off by default: stored bodies of pentest traffic may hold secrets
+        'enabled': False,
+        'dir': '~/.cache/kali-mcp/responses',
+        'max_responses': 10000,
+        'max_age': 24 * 3600,
+        'max_disk_bytes': 256 * 1024 * 1024,
+        'mmap_bytes': 1024 * 1024,
+    },
+    'history': {
+        'db_path': '~/.cache/kali-mcp/history.sqlite3',
+        'sync_batch': 200,
+        'regex_timeout': 2.0,
+        'regex_processes': 2,
+    },
+    'scanner_issues': {
+        'refresh_interval': 5,
+        'export_batch': 500,
+    },
+    'jobs': {
+        'max_parallel': 4,
+        'max_completed': 100,
+        'max_age': 3600,
+        'output_bytes': 1024 * 1024,
+    },
+    'logging': {
+        'level': 'INFO',
+        'stderr': True,
+        'file': None,
+        'max_bytes': 10 * 1024 * 1024,
+        'backup_count': 5,
+        'queue_size': 10000,
+        'max_field_chars': 2000,
+        # Fraction of info/debug records kept for high-volume tools
+        'sample': {
+            'url_encode': 0.01,
+            'url_decode': 0.01,
+            'base64_encode': 0.01,
+            'base64_decode': 0.01,
+            'generate_random_string': 0.01,
+        },
+    },
+    'workers': {
+        # Number of worker processes for the network transports, 0 serves
+        # everything from this process
+        'count': 0,
+        'state_dir': '~/.cache/kali-mcp/workers',
+        'sync_interval': 1.0,
+        'restart_backoff': 1.0,
+        'shutdown_timeout': 10,
+    },
+    'result_cache': {
+        'enabled': True,
+        'max_entries': 128,
+        # Seconds a read-only tool's result is reused
+        'ttl': {
+            'output_project_options': 60,
+            'output_user_options': 60,
+        },
+    },
+    'subprocess': {
+        'max_concurrency': 8,
+        'timeout': 600,
+        'stream_buffer_bytes': 256 * 1024,
+        'progress_interval': 0.5,
+    },
+    'security_tools': {
+        # 'argv' runs run_security_tool/burp_scan without a shell, 'shell'
+        # joins them into one /bin/sh command line as before
+        'exec_mode': 'argv',
+        # Tool names run_security_tool may run, None allows any on PATH
+        'allowlist': list(DEFAULT_ALLOWLIST),
+        # Launch through posix_spawn; the child gets no process group of its own
+        'posix_spawn': False,
+    },
+    'config_store': {
+        # The file itself is chosen with --config or $KALI_MCP_CONFIG
+        # (default ~/.config/kali-mcp/config.json)
+        'watch': 'auto',        # 'auto' (inotify, else polling), 'inotify' or 'poll'
+        'poll_interval': 1.0,
     },
 }
 
+# JSON logs written from a background thread so tool calls never block on stderr
+log_pipeline = LogPipeline(server_config['logging'])
+log_pipeline.start()
+atexit.register(log_pipeline.stop)
+logger = get_logger()
+
+# Shared non-blocking process runner used by every tool that spawns a child
+runner = ProcessRunner(server_config['subprocess'], metrics=metrics)
+
+# Executables for run_security_tool and burp_scan, resolved once per PATH
+commands = CommandResolver(server_config['security_tools'])
+
+# Background jobs for long-running tools
+jobs = JobManager(server_config['jobs'], runner)
+
+# Pooled outbound HTTP session shared by the request tools
+http_pool = HttpClientPool(server_config['http_client'])
+
+# Per-origin pacing of the HTTP request tools
+rate_limiter = RateLimiter(server_config['http_rate_limit'], metrics=metrics)
+
+# Persistent control channel to Burp's MCP extension
+burp = BurpController(server_config['burp'])
+
+
+async def on_config_change(key: str):
+    """React to a configuration section changed by another worker or in the config file"""
+    config_store.refresh()
+    logger.info('Config updated outside this process', extra={'section': key})
+    if key == 'burp':
+        await burp.reset()
+        result_cache.invalidate('burp_options')
+
+
+# server_config loaded from and saved to the config file, see config_store.py
+config_store = ConfigStore(server_config, server_config['config_store'], on_change=on_config_change)
+
+
+async def on_burp_promoted(instance):
+    """Point the control channel at the standby instance that took over"""
+    # For this run only: the saved port stays the one burp_start was given
+    server_config['burp']['port'] = instance.port
+    config_store.refresh()
+    await burp.reset()
+    result_cache.invalidate('burp_options')
+    if worker is not None:
+        await worker.publish_config(server_config, 'burp')
+
+
+# Burp processes started by burp_start
+burp_process = BurpSupervisor(server_config['burp_process'], metrics=metrics, on_promote=on_burp_promoted)
+atexit.register(burp_process.stop_now)
+
+# Local indexed copy of Burp's proxy history
+history = HistoryStore(server_config['history'])
+issue_cache = IssueCache(server_config['scanner_issues'])
+
+# Large response bodies returned by reference in compact output mode
+body_store = BlobStore(server_config['tool_output'])
+
+# Large subprocess and Burp outputs, spilled to disk and read back in pages
+tool_outputs = SpilledOutputs(server_config['output_capture'])
+atexit.register(tool_outputs.close)
+
+# Every HTTP tool response, kept for diff_responses
+responses = ResponseStore(server_config['responses'])
+
+# Cached results of read-only tools, dropped by the tools that change them
+result_cache = ResultCache(server_config['result_cache'], metrics=metrics)
+
+# Set in multi-worker mode, see workers.py
+worker = None
+
+
+async def burp_command(name: str, arguments: dict, argv: list, input: str = None, sink: OutputSink = None) -> ProcessResult:
+    """Run a Burp command over the persistent channel, falling back to the burpsuite CLI
+
+    The result is shaped like a finished process so callers can treat both
+    paths the same way.  With a sink, stdout is its preview as for
+    ProcessRunner.run.
+    """
+    try:
+        output = await burp.call(name, arguments)
+        if sink is not None:
+            await sink.write(output)
+            await sink.finish()
+            output = sink.text()
+        return ProcessResult(argv=argv, returncode=0, stdout=output, stderr='')
+    except BurpCommandError as e:
+        return ProcessResult(argv=argv, returncode=1, stdout='', stderr=str(e))
+    except BurpUnavailableError as e:
+        logger.warning('Burp channel unavailable, falling back to burpsuite CLI', extra={'command': name, 'error': str(e)})
+    
+    return await runner.run(argv, input=input, sink=sink)
+
+
+def burp_request_target(request: str) -> dict:
+    """Derive the target host, port and scheme Burp needs from a raw HTTP request"""
+    host = ''
+    for line in request.split('\n')[1:]:
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'host':
+            host = value.strip()
+            break
+    
+    hostname, _, port = host.partition(':')
+    port = int(port) if port.isdigit() else 443
+    return {'targetHostname': hostname, 'targetPort': port, 'usesHttps': port != 80}
+
+
+class ProgressForwarder:
+    """Forwards child process output to the client as MCP progress notifications
+
+    Lines are batched so that a chatty tool produces one notification per
+    progress_interval (or per max_chunk characters) instead of one per line.
+    """
+
+    max_chunk = 16 * 1024
+
+    def __init__(self, ctx: Context):
+        self.ctx = ctx
+        self.interval = server_config['subprocess']['progress_interval']
+        self.lines = 0
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = 0.0
+
+    async def __call__(self, stream_name: str, line: str):
+        self.lines += 1
+        self._pending.append(line if stream_name == 'stdout' else f'[stderr] {line}')
+        self._pending_size += len(line)
+        if self._pending_size >= self.max_chunk or time.monotonic() - self._last_flush >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        chunk = ''.join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+        await self.ctx.report_progress(self.lines, message=chunk)
+
+
+def render_process_output(text: str, sink: OutputSink, label: str):
+    """Tool result for captured output, linking the full output when it spilled to disk"""
+    if not sink.spilled:
+        return text
+    
+    output = tool_outputs.publish(sink, label)
+    text += (
+        f'\n... [output truncated: {output.size} bytes in total, read it in {output.pages} page(s) '
+        f'from {output.uri(0)} to {output.uri(output.pages - 1)}]'
+    )
+    link = ResourceLink(type='resource_link', uri=output.uri(0), name=f'{label} output', mimeType='text/plain', size=output.size)
+    return CallToolResult(content=[TextContent(type='text', text=text), link], structuredContent={'result': text})
+
+
+@mcp.resource(OUTPUT_URI_PREFIX + '{output_id}/{page}', mime_type='text/plain')
+async def tool_output_page(output_id: str, page: str) -> str:
+    """One page of a tool output that was too large to return inline"""
+    try:
+        return await asyncio.to_thread(tool_outputs.read_page, output_id, int(page))
+    except UnknownOutputError as e:
+        raise ValueError(str(e))
+
+
+def fast_spawn() -> bool:
+    return server_config['security_tools'].get('posix_spawn', False)
+
+
+async def run_command(command, timeout: int = None, sink: OutputSink = None) -> ProcessResult:
+    """Run an argv list directly, or a command line through the shell"""
+    if isinstance(command, list):
+        return await runner.run(command, timeout=timeout, sink=sink, fast_spawn=fast_spawn())
+    return await runner.run_shell(command, timeout=timeout, sink=sink)
+
+
+async def run_streaming(command, ctx: Context, timeout: int = None, sink: OutputSink = None):
+    """Run an argv list or shell command, pushing its output to ctx as it is produced"""
+    forwarder = ProgressForwarder(ctx) if ctx is not None else None
+    if isinstance(command, list):
+        result = await runner.stream(command, on_line=forwarder, timeout=timeout, sink=sink, fast_spawn=fast_spawn())
+    else:
+        result = await runner.stream_shell(command, on_line=forwarder, timeout=timeout, sink=sink)
+    if forwarder is not None:
+        await forwarder.flush()
+    return result
+
 # Add custom route for health check
 @mcp.custom_route(path="/health", methods=["GET"], name="health_check")
 async def health_check(request):
     """Health check endpoint for monitoring of MCP server"""
-    from starlette.responses import JSONResponse
+    # Probe the loop now as well, in case no MCP session has started the monitor yet
+    metrics.start_lag_monitor()
     return JSONResponse({
         "status": "ok",
         "name": mcp.name,
         "version": "2.1.0",
-        "timestamp": int(time.time())
+        "timestamp": int(time.time()),
+        "uptime": round(time.time() - metrics.started_at, 3),
+        "event_loop_lag": {
+            "last": round(metrics.loop_lag.values.get((), 0.0), 6),
+            "max": round(metrics.loop_lag_max.values.get((), 0.0), 6),
+        },
+        "in_flight": metrics.in_flight(),
+        "burp": {"connected": burp.connected, "last_error": burp.last_error, "process": burp_process.snapshot()},
+        "jobs": sum(1 for job in jobs.jobs.values() if not job.finished),
+        "result_cache": result_cache.stats(),
+        "http_rate_limit": rate_limiter.stats(),
+        "log_records_dropped": log_pipeline.dropped,
     })
 
 
+@mcp.custom_route(path="/metrics", methods=["GET"], name="metrics")
+async def metrics_endpoint(request):
+    """Prometheus text format metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+async def sync_history(kind: str):
+    """Pull new proxy history items from Burp into the local store"""
+    tool_name, flag = {
+        'http': ('get_proxy_http_history', '--list-proxy-history'),
+        'websocket': ('get_proxy_websocket_history', '--list-websocket-history'),
+    }[kind]
+    
+    async def fetch_page(count: int, offset: int) -> str:
+        result = await burp_command(
+            tool_name,
+            {'count': count, 'offset': offset},
+            ['burpsuite', flag, f'--count={count}', f'--offset={offset}']
+        )
+        if result.returncode != 0:
+            raise HistorySyncError(f'Failed to fetch {kind} history: {result.stderr}')
+        return result.stdout
+    
+    return await history.sync(kind, fetch_page)
+
+
+async def refresh_scanner_issues(force: bool = False):
+    """Export Burp's scanner issues (all scans, Burp cannot filter by task) into the cache unless it is fresh"""
+    async def fetch_page(count: int, offset: int) -> str:
+        result = await burp_command(
+            'get_scanner_issues',
+            {'count': count, 'offset': offset},
+            ['burpsuite', '--list-scanner-issues', f'--count={count}', f'--offset={offset}']
+        )
+        if result.returncode != 0:
+            raise HistorySyncError(f'Failed to get scanner issues: {result.stderr}')
+        return result.stdout
+    
+    return await issue_cache.refresh(fetch_page, force=force)
+
+
+def format_history_page(rows: list) -> str:
+    """Render stored history rows the way Burp pages them"""
+    if not rows:
+        return 'Reached end of items'
+    return '\n\n'.join(row['raw'] for row in rows)
+
+
+def build_security_tool_command(tool: str, arguments: list = None, target: str = None) -> str:
+    """Build the shell command line for run_security_tool"""
+    command = tool
+    
+    if target:
+        command += f' {target}'
+    
+    if arguments:
+        command += ' ' + ' '.join(arguments)
+    
+    return command
+
+
+def build_burp_scan_command(target: str, config: str = None, output: str = None, scope: list = None, scan_type: str = 'passive') -> str:
+    """Build the shell command line for burp_scan"""
+    command = f'burpsuite --headless --target={target} --scan-type={scan_type}'
+    
+    if config:
+        command += f' --config-file={config}'
+    
+    if output:
+        command += f' --report-output={output}'
+    
+    if scope:
+        scope_str = ','.join(scope)
+        command += f' --scope-include={scope_str}'
+    
+    return command
+
+
+def build_security_tool_argv(tool: str, arguments: list = None, target: str = None) -> list:
+    """Build the argv for run_security_tool, resolving the tool through the allowlist
+
+    tool is split into words as the shell would split it, so 'nmap -sV'
+    keeps working.  Each item of arguments becomes exactly one argument,
+    spaces included; a single string is split into words instead.  No shell
+    is involved, so variables, globs, pipes and redirects are passed
+    through literally.
+    """
+    words = shlex.split(tool)
+    argv = [commands.resolve_tool(words[0] if words else tool), *words[1:]]
+    
+    if target:
+        argv.append(target)
+    
+    if isinstance(arguments, str):
+        argv.extend(shlex.split(arguments))
+    else:
+        argv.extend(str(argument) for argument in arguments or ())
+    
+    return argv
+
+
+def build_burp_scan_argv(target: str, config: str = None, output: str = None, scope: list = None, scan_type: str = 'passive') -> list:
+    """Build the argv for burp_scan"""
+    argv = [commands.which('burpsuite'), '--headless', f'--target={target}', f'--scan-type={scan_type}']
+    
+    if config:
+        argv.append(f'--config-file={config}')
+    
+    if output:
+        argv.append(f'--report-output={output}')
+    
+    if scope:
+        argv.append(f'--scope-include={",".join(scope)}')
+    
+    return argv
+
+
+def security_tool_command(tool: str, arguments: list = None, target: str = None):
+    """argv list or shell command line for run_security_tool, depending on security_tools.exec_mode"""
+    if server_config['security_tools'].get('exec_mode', 'argv') == 'shell':
+        return build_security_tool_command(tool, arguments, target)
+    return build_security_tool_argv(tool, arguments, target)
+
+
+def burp_scan_command(target: str, config: str = None, output: str = None, scope: list = None, scan_type: str = 'passive'):
+    """argv list or shell command line for burp_scan, depending on security_tools.exec_mode"""
+    if server_config['security_tools'].get('exec_mode', 'argv') == 'shell':
+        return build_burp_scan_command(target, config, output, scope, scan_type)
+    return build_burp_scan_argv(target, config, output, scope, scan_type)
+
+
+def format_command(command) -> str:
+    return shlex.join(command) if isinstance(command, list) else command
+
+
 @mcp.tool()
-async def run_security_tool(tool: str, arguments: list = None, target: str = None) -> str:
-    """Run a specified security tool with arguments"""
+async def run_security_tool(tool: str, arguments: list = None, target: str = None, timeout: int = None, stream: bool = False, ctx: Context = None) -> str:
+    """Run a specified security tool (one of security_tools.allowlist) with arguments, without a shell: each item of arguments is one argument, pipes, redirects, $VARS and globs are not interpreted. Set stream to receive output as progress notifications."""
     if not tool:
         return 'Error: Tool name is required'
     
+    sink = tool_outputs.sink()
     try:
-        command = tool
-        
-        if target:
-            command += f' {target}'
+        command = security_tool_command(tool, arguments, target)
         
-        if arguments:
-            command += ' ' + ' '.join(arguments)
-        
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        if stream:
+            result = await run_streaming(command, ctx, timeout=timeout, sink=sink)
+        else:
+            result = await run_command(command, timeout=timeout, sink=sink)
         
         if result.returncode != 0:
-            print(f'Error running tool {tool}: {result.stderr}', file=sys.stderr)
-            return f'Error running tool {tool}: {result.stderr}\nCommand: {command}'
+            logger.warning('Security tool failed', extra={'security_tool': tool, 'returncode': result.returncode, 'stderr': result.stderr})
+            return f'Error running tool {tool}: {result.stderr}\nCommand: {format_command(command)}'
         
-        print(f'Tool {tool} completed successfully', file=sys.stderr)
-        return f'Tool {tool} completed successfully. Output:\n{result.stdout}'
+        logger.info('Security tool completed', extra={'security_tool': tool, 'output_bytes': sink.size})
+        return render_process_output(f'Tool {tool} completed successfully. Output:\n{result.stdout}', sink, tool)
     
+    except (ToolNotAllowedError, ToolNotFoundError) as e:
+        logger.warning('Security tool rejected', extra={'security_tool': tool, 'error': str(e)})
+        return f'Error: {str(e)}'
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
+    finally:
+        sink.close()
 
 
 @mcp.tool()
 async def burp_health_check() -> str:
-    """Check if Burp Suite is installed and accessible"""
+    """Report whether Burp Suite is installed, running and answering on its port"""
     try:
-        result = subprocess.run('which burpsuite', shell=True, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            return 'Burp Suite is not installed or not in PATH.'
-        
-        burp_path = result.stdout.strip()
-        return f'Burp Suite is installed at: {burp_path}'
+        status = await burp_process.status()
+        status['installed'] = {name: shutil.which(name) for name in ('burpsuite', 'burpsuite-community')}
+        status['control_channel'] = {'connected': burp.connected, 'last_error': burp.last_error}
+        return json.dumps(status, indent=2)
     
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
+def configured_ports(config: dict, burp_port: int = None, standby: bool = True) -> dict:
+    """Ports the enabled transports and the managed Burp instances listen on, by setting name"""
+    ports = {'burp.port': burp_port or config['burp']['port']}
+    if standby:
+        ports['burp_process.standby_port'] = config['burp_process']['standby_port']
+    for name in TRANSPORTS:
+        if name != 'stdio' and config[name].get('enabled', False):
+            ports[f'{name}.port'] = config[name]['port']
+    return ports
+
+
+def port_conflicts(ports: dict) -> list:
+    """Messages for every port claimed by more than one setting"""
+    owners = {}
+    for name, port in ports.items():
+        owners.setdefault(port, []).append(name)
+    return [f'port {port} is used by {" and ".join(names)}' for port, names in owners.items() if len(names) > 1]
+
+
+def _contains_value(data, wanted) -> bool:
+    if isinstance(data, dict):
+        return any(_contains_value(value, wanted) for value in data.values())
+    if isinstance(data, list):
+        return any(_contains_value(value, wanted) for value in data)
+    return data == wanted or data == str(wanted)
+
+
+def check_standby_config(standby_config: str, active_config: str, port: int) -> str:
+    """Why standby_config cannot run the standby Burp on port, or None if it can"""
+    if not standby_config:
+        return (f'warm standby needs burp_process.standby_config, a Burp config file in which the MCP '
+                f'extension listens on standby_port {port}')
+    same_file = os.path.realpath(os.path.expanduser(standby_config)) == os.path.realpath(os.path.expanduser(active_config or ''))
+    if active_config and same_file:
+        return 'burp_process.standby_config must differ from the active instance\'s config'
+    try:
+        with open(os.path.expanduser(standby_config), encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError as e:
+        return f'cannot read burp_process.standby_config: {str(e)}'
+    except ValueError:
+        # Not JSON, so the port cannot be checked here
+        return None
+    if not _contains_value(data, port):
+        return f'burp_process.standby_config {standby_config} does not set the standby port {port}'
+    return None
+
+
+def build_burp_start_argv(version: str, config: str = None, headless: bool = False) -> list:
+    """Build the argv that launches Burp Suite"""
+    argv = ['burpsuite-community' if version == 'community' else 'burpsuite']
+    
+    if config:
+        argv.append(f'--config-file={config}')
+    
+    if headless:
+        argv.append('--headless')
+    
+    return argv
+
+
 @mcp.tool()
-async def burp_start(version: str = 'professional', config: str = None, headless: bool = False, port: int = 9876) -> str:
-    """Start Burp Suite with specified options"""
+@result_cache.invalidates('burp_options')
+async def burp_start(version: str = 'professional', config: str = None, headless: bool = False, port: int = 9876, standby: bool = None, wait: bool = False) -> str:
+    """Start Burp Suite with specified options. Set standby to also keep a warm spare instance, wait to return once Burp answers on its port."""
+    settings = server_config['burp_process']
+    argv = build_burp_start_argv(version, config, headless)
+    standby_argv = None
+    if standby is None:
+        standby = settings.get('warm_standby', False)
+    
+    conflicts = port_conflicts(configured_ports(server_config, burp_port=port, standby=standby))
+    if conflicts:
+        return f'Error: {"; ".join(conflicts)}'
+    if standby:
+        error = check_standby_config(settings.get('standby_config'), config, settings.get('standby_port'))
+        if error:
+            return f'Error: {error}'
+        standby_argv = build_burp_start_argv(version, os.path.expanduser(settings['standby_config']), headless)
+    
     try:
-        command = 'burpsuite'
-        
-        if version == 'community':
-            command = 'burpsuite-community'
-        
-        if config:
-            command += f' --config-file={config}'
-        
-        if headless:
-            command += ' --headless'
-        
+        instance = await burp_process.start(
+            argv, server_config['burp']['host'], port,
+            standby_argv=standby_argv, standby_port=settings.get('standby_port'),
+        )
+    except BurpAlreadyRunningError as e:
+        return f'Error: {str(e)}'
+    except OSError as e:
+        logger.error('Tool failed', extra={'error': str(e)})
+        return f'Failed to start Burp Suite: {str(e)}\nCommand: {" ".join(argv)}'
+    
+    save_error = None
+    try:
+        await config_store.update('burp', {'port': port})
+    except (ConfigError, OSError) as e:
+        # Burp is running already: use its port for this run and say it was not saved
+        logger.error('Burp port not saved', extra={'port': port, 'error': str(e)})
+        save_error = str(e)
         server_config['burp']['port'] = port
-        
-        subprocess.Popen(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        print(f'Burp Suite {version} started', file=sys.stderr)
-        return f'Burp Suite {version} started successfully with command: {command}\nMCP server running on http://localhost:{port}'
+        config_store.refresh()
+    await burp.reset()
+    if worker is not None:
+        await worker.publish_config(server_config, 'burp')
+    
+    logger.info('Burp Suite started', extra={'version': version, 'pid': instance.process.pid})
+    message = f'Burp Suite {version} started (pid {instance.process.pid}) with command: {" ".join(argv)}'
+    if save_error:
+        message += f'\nWarning: port {port} is used for this run but could not be saved to the configuration: {save_error}'
+    if standby_argv:
+        message += f'\nWarm standby starting on port {settings.get("standby_port")}'
+    if not wait:
+        return f'{message}\nWaiting for the MCP extension on http://{server_config["burp"]["host"]}:{port}, see burp_health_check'
+    if await burp_process.wait_ready():
+        return f'{message}\nMCP extension ready on http://{server_config["burp"]["host"]}:{port} after {instance.ready_at - instance.started_at:.1f}s'
+    return f'{message}\nBurp is {instance.state}: port {port} did not open within {settings.get("ready_timeout")}s'
+
+
+@mcp.tool()
+@result_cache.invalidates('burp_options')
+async def burp_stop() -> str:
+    """Stop the Burp Suite instances started by burp_start"""
+    try:
+        stopped = await burp_process.stop()
+        await burp.reset()
+        if not stopped:
+            return 'No Burp Suite instance was started by this server'
+        logger.info('Burp Suite stopped', extra={'instances': stopped})
+        return f'Stopped {stopped} Burp Suite instance(s)'
     
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
-        return f'Failed to start Burp Suite: {str(e)}\nCommand: {command}'
+        logger.error('Tool failed', extra={'error': str(e)})
+        return f'Error: {str(e)}'
 
 
 @mcp.tool()
-async def burp_scan(target: str, config: str = None, output: str = None, scope: list = None, scan_type: str = 'passive') -> str:
-    """Run a vulnerability scan with Burp Suite"""
+async def burp_scan(target: str, config: str = None, output: str = None, scope: list = None, scan_type: str = 'passive', timeout: int = None, stream: bool = False, ctx: Context = None) -> str:
+    """Run a vulnerability scan with Burp Suite. Set stream to receive output as progress notifications."""
     if not target:
         return 'Error: Target URL is required'
     
+    sink = tool_outputs.sink()
     try:
-        command = f'burpsuite --headless --target={target} --scan-type={scan_type}'
-        
-        if config:
-            command += f' --config-file={config}'
-        
-        if output:
-            command += f' --report-output={output}'
+        command = burp_scan_command(target, config, output, scope, scan_type)
         
-        if scope:
-            scope_str = ','.join(scope)
-            command += f' --scope-include={scope_str}'
-        
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        if stream:
+            result = await run_streaming(command, ctx, timeout=timeout, sink=sink)
+        else:
+            result = await run_command(command, timeout=timeout, sink=sink)
         
         if result.returncode != 0:
-            print(f'Burp Suite scan failed: {result.stderr}', file=sys.stderr)
-            return f'Burp Suite scan failed: {result.stderr}\nCommand: {command}'
+            logger.warning('Burp Suite scan failed', extra={'returncode': result.returncode, 'stderr': result.stderr})
+            return f'Burp Suite scan failed: {result.stderr}\nCommand: {format_command(command)}'
         
-        print(f'Burp Suite scan completed', file=sys.stderr)
-        return f'Burp Suite scan completed successfully. Output:\n{result.stdout}'
+        logger.info('Burp Suite scan completed', extra={'output_bytes': sink.size})
+        return render_process_output(f'Burp Suite scan completed successfully. Output:\n{result.stdout}', sink, 'burp_scan')
     
+    except ToolNotFoundError as e:
+        return f'Error: {str(e)}'
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
+    finally:
+        sink.close()
+
+
+@mcp.tool()
+async def start_security_tool_job(tool: str, arguments: list = None, target: str = None, timeout: int = None) -> str:
+    """Start run_security_tool as a background job and return its job ID immediately. Arguments are passed without a shell, as for run_security_tool."""
+    if not tool:
+        return 'Error: Tool name is required'
+    
+    try:
+        command = security_tool_command(tool, arguments, target)
+    except (ToolNotAllowedError, ToolNotFoundError, ValueError) as e:
+        return f'Error: {str(e)}'
+    
+    job = jobs.submit('run_security_tool', command, timeout=timeout)
+    logger.info('Job started', extra={'job_id': job.id, 'security_tool': tool})
+    return json.dumps(job.to_dict(), indent=2)
+
+
+@mcp.tool()
+async def start_burp_scan_job(target: str, config: str = None, output: str = None, scope: list = None, scan_type: str = 'passive', timeout: int = None) -> str:
+    """Start burp_scan as a background job and return its job ID immediately"""
+    if not target:
+        return 'Error: Target URL is required'
+    
+    try:
+        command = burp_scan_command(target, config, output, scope, scan_type)
+    except ToolNotFoundError as e:
+        return f'Error: {str(e)}'
+    
+    job = jobs.submit('burp_scan', command, timeout=timeout)
+    logger.info('Job started', extra={'job_id': job.id, 'security_tool': 'burp_scan', 'target': target})
+    return json.dumps(job.to_dict(), indent=2)
+
+
+@mcp.tool()
+async def job_status(job_id: str = None) -> str:
+    """Shows the status of a background job, or of all known jobs if job_id is omitted"""
+    if not job_id:
+        return json.dumps(await jobs.list_all(), indent=2)
+    
+    job = await jobs.lookup(job_id)
+    if job is None:
+        return f'Error: Unknown job {job_id}'
+    
+    return json.dumps(job.to_dict(), indent=2)
+
+
+@mcp.tool()
+async def job_output(job_id: str, offset: int = 0, limit: int = 100) -> str:
+    """Returns output lines of a background job starting at line offset"""
+    job = await jobs.lookup(job_id)
+    if job is None:
+        return f'Error: Unknown job {job_id}'
+    
+    start = max(offset, job.output.dropped_lines)
+    lines = job.output.slice(start, limit)
+    return json.dumps({
+        'id': job.id,
+        'status': job.status,
+        'offset': start,
+        'next_offset': start + len(lines),
+        'total_lines': job.output.total_lines,
+        'dropped_lines': job.output.dropped_lines,
+        'output': ''.join(lines),
+    }, indent=2)
+
+
+@mcp.tool()
+async def job_cancel(job_id: str) -> str:
+    """Cancels a queued or running background job"""
+    job = await jobs.request_cancel(job_id)
+    if job is None:
+        return f'Error: Unknown job {job_id}'
+    
+    if job.finished:
+        return f'Job {job_id} already finished with status {job.status}'
+    
+    logger.info('Job cancelled', extra={'job_id': job_id})
+    return f'Job {job_id} cancellation requested'
 
 
 @mcp.tool()
 async def burp_get_config() -> str:
     """Get Burp Suite MCP server configuration"""
-    return json.dumps(server_config['burp'], indent=2)
+    if worker is not None:
+        await worker.sync_config(server_config, on_config_change)
+    return json.dumps(config_store.snapshot()['burp'], indent=2)
 
 
 @mcp.tool()
+@result_cache.invalidates('burp_options')
 async def burp_set_config(enabled: bool = None, port: int = None, host: str = None, allowConfigEdit: bool = None) -> str:
     """Set Burp Suite MCP server configuration"""
+    changes = {}
     if enabled is not None:
-        server_config['burp']['enabled'] = enabled
+        changes['enabled'] = enabled
     if port is not None:
-        server_config['burp']['port'] = port
+        changes['port'] = port
     if host is not None:
-        server_config['burp']['host'] = host
+        changes['host'] = host
     if allowConfigEdit is not None:
-        server_config['burp']['allowConfigEdit'] = allowConfigEdit
+        changes['allowConfigEdit'] = allowConfigEdit
+    
+    try:
+        settings = await config_store.update('burp', changes)
+    except (ConfigError, OSError) as e:
+        logger.error('Tool failed', extra={'error': str(e)})
+        return f'Error: configuration could not be saved: {str(e)}'
+    
+    # Reconnect the control channel with the new settings on next use
+    await burp.reset()
+    if worker is not None:
+        await worker.publish_config(server_config, 'burp')
+    
+    logger.info('Burp config updated')
+    return f'Burp Suite MCP server configuration updated:\n{json.dumps(settings, indent=2)}'
+
+
+async def store_response(method: str, url: str, status: int, headers: dict, body: BoundedBody):
+    """Save a response for diff_responses and return its ID, or None if it was not stored"""
+    if not server_config['responses'].get('enabled', False):
+        return None
+    try:
+        return await responses.put(method, url, status, headers, body)
+    except Exception as e:
+        logger.warning('Failed to store response', extra={'error': str(e)})
+        return None
+
+
+def build_http_output(status: int, headers: dict, body: BoundedBody, mode: str = 'pretty', compression: str = None, response_id: str = None, **extra) -> dict:
+    """Assemble the JSON result shared by the HTTP request tools"""
+    output = {'status': status, **extra, 'headers': headers}
+    if response_id is not None:
+        output['response_id'] = response_id
+    if mode == 'compact':
+        content_type = next((value for name, value in headers.items() if name.lower() == 'content-type'), None)
+        output.update(compact_body(
+            body_store, server_config['tool_output'], body.data, body.charset, body.truncated, content_type, compression
+        ))
+    else:
+        output['body'] = body.text()
+    output['body_bytes_total'] = body.total_bytes
+    output['truncated'] = body.truncated
+    output['charset'] = body.charset
+    if body.sha256 is not None:
+        output['body_sha256'] = body.sha256
+    return output
+
+
+def check_output_options(output_mode: str, compression: str):
+    """Return an error message for unsupported output options, or None"""
+    if output_mode not in OUTPUT_MODES:
+        return f'Error: output_mode must be one of: {", ".join(OUTPUT_MODES)}'
+    if compression is not None and compression not in COMPRESSIONS:
+        return f'Error: compression must be one of: {", ".join(COMPRESSIONS)}'
+    return None
+
+
+def render_http_output(output: dict, mode: str):
+    """Serialise an HTTP tool result, attaching a link to a body stored by reference"""
+    text = dumps(output, mode)
+    if 'body_uri' not in output:
+        return text
     
-    print(f'Burp config updated', file=sys.stderr)
-    return f'Burp Suite MCP server configuration updated:\n{json.dumps(server_config["burp"], indent=2)}'
+    blob = body_store.get(output['body_uri'][len(BODY_URI_PREFIX):])
+    link = ResourceLink(
+        type='resource_link',
+        uri=output['body_uri'],
+        name='response body',
+        mimeType=blob.stored_mime_type if blob else None,
+        size=output['body_stored_bytes'],
+    )
+    return CallToolResult(content=[TextContent(type='text', text=text), link], structuredContent={'result': text})
+
+
+@mcp.resource(BODY_URI_PREFIX + '{body_id}', mime_type='application/octet-stream')
+async def http_body(body_id: str) -> bytes:
+    """Response body returned by reference by an HTTP request tool in compact mode"""
+    blob = body_store.get(body_id)
+    if blob is None:
+        raise ValueError(f'Unknown or expired body {body_id}')
+    return blob.data
 
 
 @mcp.tool()
-async def send_http1_request(method: str = 'GET', url: str = None, headers: dict = None, body: str = '') -> str:
+async def send_http1_request(method: str = 'GET', url: str = None, headers: dict = None, body: str = '', max_body_bytes: int = None, hash_body: bool = False, output_mode: str = None, compression: str = None) -> str:
     """Issues an HTTP/1.1 request and returns response. Use this to test web applications."""
     if not url:
         return 'Error: URL is required'
     
+    output_mode = output_mode or server_config['tool_output']['mode']
+    error = check_output_options(output_mode, compression)
+    if error:
+        return error
+    
     try:
-        import aiohttp
+        session = await http_pool.get_session()
+        max_body_bytes = max_body_bytes or server_config['http_client']['max_body_bytes']
         
-        async with aiohttp.ClientSession() as session:
+        async with rate_limiter.slot(url, (aiohttp.ClientConnectionError, asyncio.TimeoutError)) as slot:
             async with session.request(method, url, headers=headers, data=body) as response:
-                response_text = await response.text()
-                response_headers = dict(response.headers)
-                
-                output = {
-                    'status': response.status,
-                    'headers': response_headers,
-                    'body': response_text[:5000] if len(response_text) > 5000 else response_text,
-                }
-                
-                if len(response_text) > 5000:
-                    output['body'] += '... (truncated)'
-                
-                print(f'HTTP/1.1 request completed: {response.status}', file=sys.stderr)
-                return json.dumps(output, indent=2)
-    
-    except Exception as e:
-        print(f'Error sending HTTP request: {str(e)}', file=sys.stderr)
+                slot.observe(response.status, response.headers)
+                response_body = await read_bounded_body(
+                    response.content.iter_chunked(READ_CHUNK_SIZE), max_body_bytes, response.headers, hash_body
+                )
+        
+        response_headers = dict(response.headers)
+        response_id = await store_response(method, url, response.status, response_headers, response_body)
+        output = build_http_output(
+            response.status, response_headers, response_body, mode=output_mode, compression=compression,
+            response_id=response_id
+        )
+        
+        logger.info('HTTP/1.1 request completed', extra={'status': response.status, 'rate_limit_wait': round(slot.waited, 3)})
+        return render_http_output(output, output_mode)
+    
+    except RateLimitTimeoutError as e:
+        logger.warning('HTTP request rate limited', extra={'url': url, 'error': str(e)})
+        return f'Error: {str(e)}'
+    except Exception as e:
+        logger.warning('Error sending HTTP request', extra={'error': str(e)})
         return f'Error sending HTTP request: {str(e)}'
 
 
 @mcp.tool()
-async def send_http2_request(method: str = 'GET', url: str = None, pseudo_headers: dict = None, headers: dict = None, body: str = '') -> str:
+async def send_http2_request(method: str = 'GET', url: str = None, pseudo_headers: dict = None, headers: dict = None, body: str = '', max_body_bytes: int = None, hash_body: bool = False, output_mode: str = None, compression: str = None) -> str:
     """Issues an HTTP/2 request and returns response. Do NOT pass headers to body parameter."""
     if not url:
         return 'Error: URL is required'
     
+    output_mode = output_mode or server_config['tool_output']['mode']
+    error = check_output_options(output_mode, compression)
+    if error:
+        return error
+    
     try:
-        import aiohttp
-        
-        async with aiohttp.ClientSession() as session:
-            merged_headers = {}
-            if pseudo_headers:
-                merged_headers.update(pseudo_headers)
-            if headers:
-                merged_headers.update(headers)
-            
-            async with session.request(method, url, headers=merged_headers, data=body) as response:
-                response_text = await response.text()
-                response_headers = dict(response.headers)
-                
-                output = {
-                    'status': response.status,
-                    'pseudo_headers': pseudo_headers,
-                    'headers': response_headers,
-                    'body': response_text[:5000] if len(response_text) > 5000 else response_text,
-                }
-                
-                if len(response_text) > 5000:
-                    output['body'] += '... (truncated)'
-                
-                print(f'HTTP/2 request completed: {response.status}', file=sys.stderr)
-                return json.dumps(output, indent=2)
-    
-    except Exception as e:
-        print(f'Error sending HTTP/2 request: {str(e)}', file=sys.stderr)
+        method, request_url, request_headers, effective_pseudo_headers = build_http2_request(method, url, pseudo_headers, headers)
+        client = await http_pool.get_http2_client()
+        max_body_bytes = max_body_bytes or server_config['http_client']['max_body_bytes']
+        
+        async with rate_limiter.slot(request_url, httpx.TransportError) as slot:
+            async with client.stream(method, request_url, headers=request_headers, content=body or None) as response:
+                slot.observe(response.status_code, response.headers)
+                response_body = await read_bounded_body(
+                    response.aiter_bytes(READ_CHUNK_SIZE), max_body_bytes, response.headers, hash_body
+                )
+        
+        response_headers = dict(response.headers)
+        response_id = await store_response(method, request_url, response.status_code, response_headers, response_body)
+        output = build_http_output(
+            response.status_code, response_headers, response_body,
+            mode=output_mode, compression=compression, response_id=response_id,
+            http_version=response.http_version, pseudo_headers=effective_pseudo_headers
+        )
+        
+        logger.info('HTTP/2 request completed', extra={
+            'status': response.status_code, 'http_version': response.http_version, 'rate_limit_wait': round(slot.waited, 3)
+        })
+        return render_http_output(output, output_mode)
+    
+    except RateLimitTimeoutError as e:
+        logger.warning('HTTP/2 request rate limited', extra={'url': request_url, 'error': str(e)})
+        return f'Error: {str(e)}'
+    except Exception as e:
+        logger.warning('Error sending HTTP/2 request', extra={'error': str(e)})
         return f'Error sending HTTP/2 request: {str(e)}'
 
 
+@mcp.tool()
+async def diff_responses(id_a: str, id_b: str, ignore_headers: list = None, max_changes: int = 50) -> str:
+    """Compares two responses returned by the HTTP request tools by their response_id: status, headers and changed body lines"""
+    if not server_config['responses'].get('enabled', False):
+        return 'Error: responses are not stored; set responses.enabled in the configuration to use diff_responses'
+    try:
+        diff = await responses.diff(id_a, id_b, ignore_headers or (), max_changes)
+        return dumps(diff, server_config['tool_output']['mode'])
+    except UnknownResponseError as e:
+        return f'Error: {e}'
+    except Exception as e:
+        logger.error('Tool failed', extra={'error': str(e)})
+        return f'Error: {str(e)}'
+
+
 @mcp.tool()
 async def url_encode(content: str) -> str:
     """URL encodes input string"""
     try:
         encoded = urllib.parse.quote(content)
-        print(f'URL encoded: {content[:50]}...', file=sys.stderr)
+        logger.info('URL encoded', extra={'chars': len(content)})
         return encoded
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -268,10 +1117,10 @@ async def url_decode(content: str) -> str:
     """URL decodes input string"""
     try:
         decoded = urllib.parse.unquote(content)
-        print(f'URL decoded: {content[:50]}...', file=sys.stderr)
+        logger.info('URL decoded', extra={'chars': len(content)})
         return decoded
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -280,10 +1129,10 @@ async def base64_encode(content: str) -> str:
     """Base64 encodes input string"""
     try:
         encoded = base64.b64encode(content.encode()).decode()
-        print(f'Base64 encoded: {content[:50]}...', file=sys.stderr)
+        logger.info('Base64 encoded', extra={'chars': len(content)})
         return encoded
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -292,10 +1141,28 @@ async def base64_decode(content: str) -> str:
     """Base64 decodes input string"""
     try:
         decoded = base64.b64decode(content).decode()
-        print(f'Base64 decoded: {content[:50]}...', file=sys.stderr)
+        logger.info('Base64 decoded', extra={'chars': len(content)})
         return decoded
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
+        return f'Error: {str(e)}'
+
+
+@mcp.tool()
+async def batch_transform(inputs: list[str], transforms: list[str]) -> str:
+    """Applies a chain of transforms (url/base64/hex encode and decode) to a list of strings"""
+    try:
+        results = await asyncio.to_thread(run_chain, inputs, transforms)
+        failed = sum(1 for _, error in results if error is not None)
+        logger.info('Batch transform completed', extra={'transforms': transforms, 'items': len(inputs), 'failed': failed})
+        return json.dumps({
+            'results': [{'value': value} if error is None else {'error': error} for value, error in results],
+            'failed': failed,
+        }, indent=2)
+    except TransformError as e:
+        return f'Error: {str(e)}'
+    except Exception as e:
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -304,10 +1171,10 @@ async def generate_random_string(length: int = 16, characterSet: str = 'abcdefgh
     """Generates a random string of specified length and character set"""
     try:
         random_string = ''.join(random.choice(characterSet) for _ in range(length))
-        print(f'Generated random string: {length} chars', file=sys.stderr)
+        logger.info('Generated random string', extra={'length': length})
         return random_string
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -318,21 +1185,21 @@ async def create_repeater_tab(request: str, tabName: str = 'MCP Request') -> str
         return 'Error: Request content is required'
     
     try:
-        result = subprocess.run(
-            ['burpsuite', '--repeater', '--request', request, '--tab-name', tabName],
-            capture_output=True,
-            text=True
+        result = await burp_command(
+            'create_repeater_tab',
+            {'tabName': tabName, 'content': request, **burp_request_target(request)},
+            ['burpsuite', '--repeater', '--request', request, '--tab-name', tabName]
         )
         
         if result.returncode != 0:
-            print(f'Failed to create Repeater tab: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to create Repeater tab', extra={'stderr': result.stderr})
             return f'Failed to create Repeater tab: {result.stderr}'
         
-        print(f'Repeater tab created: {tabName}', file=sys.stderr)
+        logger.info('Repeater tab created', extra={'tab': tabName})
         return f'Repeater tab "{tabName}" created successfully with request:\n{request[:500]}...'
     
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -343,21 +1210,21 @@ async def send_to_intruder(request: str, tabName: str = 'MCP Intruder') -> str:
         return 'Error: Request content is required'
     
     try:
-        result = subprocess.run(
-            ['burpsuite', '--intruder', '--request', request, '--tab-name', tabName],
-            capture_output=True,
-            text=True
+        result = await burp_command(
+            'send_to_intruder',
+            {'tabName': tabName, 'content': request, **burp_request_target(request)},
+            ['burpsuite', '--intruder', '--request', request, '--tab-name', tabName]
         )
         
         if result.returncode != 0:
-            print(f'Failed to send to Intruder: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to send to Intruder', extra={'stderr': result.stderr})
             return f'Failed to send to Intruder: {result.stderr}'
         
-        print(f'Sent to Intruder: {tabName}', file=sys.stderr)
+        logger.info('Sent to Intruder', extra={'tab': tabName})
         return f'Request sent to Intruder tab "{tabName}" successfully:\n{request[:500]}...'
     
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -365,22 +1232,22 @@ async def send_to_intruder(request: str, tabName: str = 'MCP Intruder') -> str:
 async def set_proxy_intercept_state(intercepting: bool) -> str:
     """Enables or disables Burp Proxy Intercept"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--proxy-intercept', 'enable' if intercepting else 'disable'],
-            capture_output=True,
-            text=True
+        result = await burp_command(
+            'set_proxy_intercept_state',
+            {'intercepting': intercepting},
+            ['burpsuite', '--proxy-intercept', 'enable' if intercepting else 'disable']
         )
         
         if result.returncode != 0:
-            print(f'Failed to set proxy intercept: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to set proxy intercept', extra={'stderr': result.stderr})
             return f'Failed to set proxy intercept state: {result.stderr}'
         
         state = 'enabled' if intercepting else 'disabled'
-        print(f'Proxy intercept {state}', file=sys.stderr)
+        logger.info('Proxy intercept changed', extra={'state': state})
         return f'Proxy intercept has been {state}'
     
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -388,104 +1255,96 @@ async def set_proxy_intercept_state(intercepting: bool) -> str:
 async def set_task_execution_engine_state(running: bool) -> str:
     """Sets state of Burp's task execution engine (paused or unpaused)"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--task-engine', 'resume' if running else 'pause'],
-            capture_output=True,
-            text=True
+        result = await burp_command(
+            'set_task_execution_engine_state',
+            {'running': running},
+            ['burpsuite', '--task-engine', 'resume' if running else 'pause']
         )
         
         if result.returncode != 0:
-            print(f'Failed to set task engine state: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to set task engine state', extra={'stderr': result.stderr})
             return f'Failed to set task execution engine state: {result.stderr}'
         
         state = 'running' if running else 'paused'
-        print(f'Task engine {state}', file=sys.stderr)
+        logger.info('Task engine state changed', extra={'state': state})
         return f'Task execution engine is now {state}'
     
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
 @mcp.tool()
+@result_cache.cached(tags=('burp_options', 'project_options'))
 async def output_project_options() -> str:
     """Outputs current project-level configuration in JSON format"""
+    sink = tool_outputs.sink()
     try:
-        result = subprocess.run(
-            ['burpsuite', '--export-project-options', '-'],
-            capture_output=True,
-            text=True
-        )
+        result = await burp_command('output_project_options', {}, ['burpsuite', '--export-project-options', '-'], sink=sink)
         
         if result.returncode != 0:
-            print(f'Failed to export project options: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to export project options', extra={'stderr': result.stderr})
             return f'Failed to export project options: {result.stderr}'
         
-        return result.stdout
+        return render_process_output(result.stdout, sink, 'output_project_options')
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
+    finally:
+        sink.close()
 
 
 @mcp.tool()
+@result_cache.cached(tags=('burp_options', 'user_options'))
 async def output_user_options() -> str:
     """Outputs current user-level configuration in JSON format"""
+    sink = tool_outputs.sink()
     try:
-        result = subprocess.run(
-            ['burpsuite', '--export-user-options', '-'],
-            capture_output=True,
-            text=True
-        )
+        result = await burp_command('output_user_options', {}, ['burpsuite', '--export-user-options', '-'], sink=sink)
         
         if result.returncode != 0:
-            print(f'Failed to export user options: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to export user options', extra={'stderr': result.stderr})
             return f'Failed to export user options: {result.stderr}'
         
-        return result.stdout
+        return render_process_output(result.stdout, sink, 'output_user_options')
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
+    finally:
+        sink.close()
 
 
 @mcp.tool()
+@result_cache.invalidates('project_options')
 async def set_project_options(json: str) -> str:
     """Sets project-level configuration in JSON format"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--import-project-options', '-'],
-            input=json,
-            capture_output=True,
-            text=True
-        )
+        result = await burp_command('set_project_options', {'json': json}, ['burpsuite', '--import-project-options', '-'], input=json)
         
         if result.returncode != 0:
-            print(f'Failed to set project options: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to set project options', extra={'stderr': result.stderr})
             return f'Failed to set project options: {result.stderr}'
         
         return "Project configuration has been applied"
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
 @mcp.tool()
+@result_cache.invalidates('user_options')
 async def set_user_options(json: str) -> str:
     """Sets user-level configuration in JSON format"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--import-user-options', '-'],
-            input=json,
-            capture_output=True,
-            text=True
-        )
+        result = await burp_command('set_user_options', {'json': json}, ['burpsuite', '--import-user-options', '-'], input=json)
         
         if result.returncode != 0:
-            print(f'Failed to set user options: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to set user options', extra={'stderr': result.stderr})
             return f'Failed to set user options: {result.stderr}'
         
         return "User configuration has been applied"
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -493,119 +1352,163 @@ async def set_user_options(json: str) -> str:
 async def get_scanner_issues(count: int = 10, offset: int = 0) -> str:
     """Displays information about issues identified by scanner"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--list-scanner-issues', f'--count={count}', f'--offset={offset}'],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print(f'Failed to get scanner issues: {result.stderr}', file=sys.stderr)
-            return f'Failed to get scanner issues: {result.stderr}'
-        
-        return result.stdout
+        issues = await refresh_scanner_issues()
+        page = issues.raw_issues[offset:offset + count]
+        if not page:
+            return 'Reached end of items'
+        return '\n\n'.join(page)
+    except HistorySyncError as e:
+        logger.warning(str(e))
+        return str(e)
+    except Exception as e:
+        logger.error('Tool failed', extra={'error': str(e)})
+        return f'Error: {str(e)}'
+
+
+@mcp.tool()
+async def poll_scanner_issues(cursor: str = None, limit: int = 50, refresh: bool = False) -> str:
+    """Returns scanner issues grouped by type, host and path that are new or changed since the cursor. Covers the issues of all scans."""
+    try:
+        since = decode_issue_cursor(cursor)
+        issues = await refresh_scanner_issues(force=refresh)
+        groups, total = issue_cache.changed_since(issues, since, limit)
+        last_seq = groups[-1].seq if groups else since
+        return json.dumps({
+            'items': [group.to_dict() for group in groups],
+            'remaining': total - len(groups),
+            'total_groups': len(issues.groups),
+            'next_cursor': encode_issue_cursor(last_seq),
+        }, indent=2)
+    except ValueError as e:
+        return f'Error: {str(e)}'
+    except HistorySyncError as e:
+        logger.warning(str(e))
+        return str(e)
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
 @mcp.tool()
 async def get_proxy_http_history(count: int = 10, offset: int = 0) -> str:
     """Displays items within of proxy HTTP history"""
+    sink = tool_outputs.sink()
     try:
-        result = subprocess.run(
+        result = await burp_command(
+            'get_proxy_http_history',
+            {'count': count, 'offset': offset},
             ['burpsuite', '--list-proxy-history', f'--count={count}', f'--offset={offset}'],
-            capture_output=True,
-            text=True
+            sink=sink
         )
         
         if result.returncode != 0:
-            print(f'Failed to get proxy HTTP history: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to get proxy HTTP history', extra={'stderr': result.stderr})
             return f'Failed to get proxy HTTP history: {result.stderr}'
         
-        return result.stdout
+        return render_process_output(result.stdout, sink, 'get_proxy_http_history')
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
+    finally:
+        sink.close()
 
 
 @mcp.tool()
 async def get_proxy_http_history_regex(regex: str, count: int = 10, offset: int = 0) -> str:
     """Displays items matching a specified regex within of proxy HTTP history"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--list-proxy-history', f'--regex={regex}', f'--count={count}', f'--offset={offset}'],
-            capture_output=True,
-            text=True
+        await sync_history('http')
+        rows = await history.query_http(regex=regex, limit=count, offset=offset)
+        return format_history_page(rows)
+    except Exception as e:
+        logger.warning('Failed to get proxy HTTP history regex', extra={'error': str(e)})
+        return f'Failed to get proxy HTTP history regex: {str(e)}'
+
+
+@mcp.tool()
+async def search_proxy_http_history(regex: str = None, host: str = None, method: str = None, status: int = None, content_type: str = None, path_prefix: str = None, cursor: str = None, limit: int = 10) -> str:
+    """Searches proxy HTTP history by regex and indexed fields with cursor-based pagination"""
+    try:
+        await sync_history('http')
+        rows = await history.query_http(
+            regex=regex, host=host, method=method, status=status, content_type=content_type,
+            path_prefix=path_prefix, after=decode_cursor('http', cursor), limit=limit
         )
-        
-        if result.returncode != 0:
-            print(f'Failed to get proxy HTTP history regex: {result.stderr}', file=sys.stderr)
-            return f'Failed to get proxy HTTP history regex: {result.stderr}'
-        
-        return result.stdout
+        items = [{key: row[key] for key in ('id', 'host', 'method', 'path', 'status', 'content_type', 'request', 'response')} for row in rows]
+        return json.dumps({
+            'items': items,
+            'next_cursor': encode_cursor('http', rows[-1]['id']) if rows else cursor,
+        }, indent=2)
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
-        return f'Error: {str(e)}'
+        logger.warning('Failed to search proxy HTTP history', extra={'error': str(e)})
+        return f'Failed to search proxy HTTP history: {str(e)}'
 
 
 @mcp.tool()
 async def get_proxy_websocket_history(count: int = 10, offset: int = 0) -> str:
     """Displays items within of proxy WebSocket history"""
+    sink = tool_outputs.sink()
     try:
-        result = subprocess.run(
+        result = await burp_command(
+            'get_proxy_websocket_history',
+            {'count': count, 'offset': offset},
             ['burpsuite', '--list-websocket-history', f'--count={count}', f'--offset={offset}'],
-            capture_output=True,
-            text=True
+            sink=sink
         )
         
         if result.returncode != 0:
-            print(f'Failed to get proxy WebSocket history: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to get proxy WebSocket history', extra={'stderr': result.stderr})
             return f'Failed to get proxy WebSocket history: {result.stderr}'
         
-        return result.stdout
+        return render_process_output(result.stdout, sink, 'get_proxy_websocket_history')
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
+    finally:
+        sink.close()
 
 
 @mcp.tool()
 async def get_proxy_websocket_history_regex(regex: str, count: int = 10, offset: int = 0) -> str:
     """Displays items matching a specified regex within of proxy WebSocket history"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--list-websocket-history', f'--regex={regex}', f'--count={count}', f'--offset={offset}'],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print(f'Failed to get proxy WebSocket history regex: {result.stderr}', file=sys.stderr)
-            return f'Failed to get proxy WebSocket history regex: {result.stderr}'
-        
-        return result.stdout
+        await sync_history('websocket')
+        rows = await history.query_websocket(regex=regex, limit=count, offset=offset)
+        return format_history_page(rows)
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
-        return f'Error: {str(e)}'
+        logger.warning('Failed to get proxy WebSocket history regex', extra={'error': str(e)})
+        return f'Failed to get proxy WebSocket history regex: {str(e)}'
+
+
+@mcp.tool()
+async def search_proxy_websocket_history(regex: str = None, direction: str = None, cursor: str = None, limit: int = 10) -> str:
+    """Searches proxy WebSocket history by regex and direction with cursor-based pagination"""
+    try:
+        await sync_history('websocket')
+        rows = await history.query_websocket(regex=regex, direction=direction, after=decode_cursor('websocket', cursor), limit=limit)
+        items = [{key: row[key] for key in ('id', 'direction', 'payload')} for row in rows]
+        return json.dumps({
+            'items': items,
+            'next_cursor': encode_cursor('websocket', rows[-1]['id']) if rows else cursor,
+        }, indent=2)
+    except Exception as e:
+        logger.warning('Failed to search proxy WebSocket history', extra={'error': str(e)})
+        return f'Failed to search proxy WebSocket history: {str(e)}'
 
 
 @mcp.tool()
 async def get_active_editor_contents() -> str:
     """Outputs contents of user's active message editor"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--get-active-editor-contents'],
-            capture_output=True,
-            text=True
-        )
+        result = await burp_command('get_active_editor_contents', {}, ['burpsuite', '--get-active-editor-contents'])
         
         if result.returncode != 0:
-            print(f'Failed to get active editor contents: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to get active editor contents', extra={'stderr': result.stderr})
             return f'Failed to get active editor contents: {result.stderr}'
         
         return result.stdout if result.stdout else "<No active editor>"
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -613,20 +1516,15 @@ async def get_active_editor_contents() -> str:
 async def set_active_editor_contents(text: str) -> str:
     """Sets content of user's active message editor"""
     try:
-        result = subprocess.run(
-            ['burpsuite', '--set-active-editor-contents'],
-            input=text,
-            capture_output=True,
-            text=True
-        )
+        result = await burp_command('set_active_editor_contents', {'text': text}, ['burpsuite', '--set-active-editor-contents'], input=text)
         
         if result.returncode != 0:
-            print(f'Failed to set active editor contents: {result.stderr}', file=sys.stderr)
+            logger.warning('Failed to set active editor contents', extra={'stderr': result.stderr})
             return f'Failed to set active editor contents: {result.stderr}'
         
         return "Editor text has been set"
     except Exception as e:
-        print(f'Error: {str(e)}', file=sys.stderr)
+        logger.error('Tool failed', extra={'error': str(e)})
         return f'Error: {str(e)}'
 
 
@@ -678,9 +1576,90 @@ Burp Suite工作流程：
     return prompt
 
 
+def worker_command(worker_id: int) -> list:
+    """Command line that starts one worker process"""
+    argv = [sys.executable, os.path.abspath(__file__), '--worker-id', str(worker_id)]
+    if config_store.path is not None:
+        argv += ['--config', config_store.path]
+    for name in TRANSPORTS:
+        if name != 'stdio' and server_config[name].get('enabled', False):
+            argv += ['--transport', name]
+    return argv
+
+
+async def run_worker(worker_id: int):
+    """Serve the network transports as one worker of several"""
+    global worker
+    worker = workers.Worker(server_config['workers'], worker_id)
+    # Streamable HTTP sessions would be tied to one process; stateless
+    # requests can be answered by whichever worker accepts the connection
+    mcp.settings.stateless_http = True
+    server_config['stdio']['enabled'] = False
+    jobs.store = worker.store
+    issue_cache.store = worker.store
+    result_cache.store = worker.store
+    await worker.store.forget_worker()
+    await worker.sync_config(server_config, on_config_change)
+    
+    sockets = worker.bind_sockets(server_config)
+    follower = asyncio.create_task(worker.follow_config(server_config, on_config_change))
+    try:
+        await TransportRunner(mcp, server_config, wrap_app=worker.wrap_app(mcp), resources=shared_resources).run(sockets=sockets)
+    finally:
+        follower.cancel()
+
+
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Kali MCP server')
+    parser.add_argument(
+        '--transport', action='append', choices=TRANSPORTS,
+        help='Transport to serve, may be repeated (default: those enabled in server_config)'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help='Serve the network transports from N worker processes (default: workers.count in server_config)'
+    )
+    parser.add_argument(
+        '--config', default=None,
+        help='Configuration file to load and save settings in (default: $KALI_MCP_CONFIG or ~/.config/kali-mcp/config.json)'
+    )
+    parser.add_argument('--worker-id', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--profile-startup', action='store_true',
+        help='Report import time per module and time to the first tools/list, then exit'
+    )
+    args = parser.parse_args()
+    if args.profile_startup:
+        import startup_profile
+        startup_profile.main()
+        sys.exit(0)
+    try:
+        config_store.load(args.config)
+    except ConfigError as e:
+        parser.error(str(e))
+    # Command line options apply to this run only and are not saved
+    if args.transport:
+        for name in TRANSPORTS:
+            server_config[name]['enabled'] = name in args.transport
+    if args.workers is not None:
+        server_config['workers']['count'] = args.workers
+    config_store.refresh()
+    conflicts = port_conflicts(configured_ports(server_config))
+    if conflicts:
+        parser.error(f'Conflicting ports in the configuration: {"; ".join(conflicts)}')
+    
     try:
-        mcp.run()
+        if args.worker_id is not None:
+            asyncio.run(run_worker(args.worker_id))
+        elif server_config['workers']['count'] > 0 and workers.supported():
+            asyncio.run(workers.WorkerSupervisor(server_config['workers'], worker_command).run())
+        else:
+            if server_config['workers']['count'] > 0:
+                logger.warning('SO_REUSEPORT is not available, serving from a single process')
+            asyncio.run(TransportRunner(mcp, server_config, resources=shared_resources).run())
     except KeyboardInterrupt:
-        print('\nServer stopped', file=sys.stderr)
-        sys.exit(0)
\ No newline at end of file
+        pass
+    logger.info('Server stopped')
+    sys.exit(0)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""In-process metrics with Prometheus text exposition.
+
+Metrics records per tool call counts, errors, latency, in-flight calls and
+response sizes by wrapping every ``@mcp.tool()`` registration, per tool
+subprocess wall and CPU time reported by ProcessRunner, and the event loop
+lag measured by a background probe.  ``render()`` produces the Prometheus
+text format served on ``/metrics``.
+"""
+
+import asyncio
+import contextvars
+import functools
+import math
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:
+    # Windows: no child CPU accounting
+    resource = None
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+DEFAULT_LAG_INTERVAL = 0.5
+
+# Name and call ID of the tool call running in the current task, inherited
+# by tasks it creates so subprocess time and log records are attributed to
+# the calling tool
+current_tool = contextvars.ContextVar('current_tool', default='')
+current_call_id = contextvars.ContextVar('current_call_id', default='')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, _format_labels(self.labels, labels), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        self.values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.values = {}
+
+    def observe(self, *labels, value):
+        counts, total = self.values.get(labels, (None, 0.0))
+        if counts is None:
+            counts = [0] * len(self.buckets)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        self.values[labels] = (counts, total + value)
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (f'{self.name}_bucket', _format_labels(self.labels + ('le',), labels + (_format_value(bound),)),
+                       cumulative)
+            yield f'{self.name}_sum', _format_labels(self.labels, labels), total
+            yield f'{self.name}_count', _format_labels(self.labels, labels), cumulative
+
+
+class Metrics:
+    """Registry of the server's metrics"""
+
+    def __init__(self, prefix='kali_mcp'):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self.registry = []
+        self.tool_calls = self.counter('tool_calls_total', 'Tool calls', ['tool'])
+        self.tool_errors = self.counter('tool_errors_total', 'Tool calls that raised or returned an error', ['tool'])
+        self.tool_duration = self.histogram('tool_duration_seconds', 'Tool call latency', ['tool'])
+        self.tool_in_flight = self.gauge('tool_in_flight', 'Tool calls currently running', ['tool'])
+        self.tool_response_bytes = self.counter('tool_response_bytes_total', 'UTF-8 bytes returned by tools', ['tool'])
+        self.process_duration = self.histogram('subprocess_duration_seconds', 'Subprocess wall time', ['tool'])
+        self.process_cpu = self.counter('subprocess_cpu_seconds_total', 'Subprocess user plus system CPU time', ['tool'])
+        self.loop_lag = self.gauge('event_loop_lag_seconds', 'Event loop lag measured by the last probe')
+        self.loop_lag_max = self.gauge('event_loop_lag_max_seconds', 'Largest event loop lag seen since start')
+        self._children_cpu = self._read_children_cpu()
+        self._lag_task = None
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(f'{self.prefix}_{name}', help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge(f'{self.prefix}_{name}', help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(f'{self.prefix}_{name}', help, labels, buckets))
+
+    def _register(self, metric):
+        self.registry.append(metric)
+        return metric
+
+    def wrap_tool(self, fn, name=None):
+        """Wrap an async tool function so every call is recorded"""
+        name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            token = current_tool.set(name)
+            call_token = current_call_id.set(uuid.uuid4().hex[:12])
+            self.tool_calls.inc(name)
+            self.tool_in_flight.inc(name)
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                self.tool_errors.inc(name)
+                raise
+            else:
+                if isinstance(result, str):
+                    if result.startswith(('Error', 'Failed')):
+                        self.tool_errors.inc(name)
+                    self.tool_response_bytes.inc(name, amount=len(result.encode('utf-8', errors='replace')))
+                return result
+            finally:
+                self.tool_duration.observe(name, value=time.perf_counter() - started)
+                self.tool_in_flight.dec(name)
+                current_call_id.reset(call_token)
+                current_tool.reset(token)
+
+        return wrapper
+
+    def instrument(self, mcp):
+        """Make mcp.tool() wrap every tool it registers from now on"""
+        register = mcp.tool
+
+        def tool(*args, **kwargs):
+            decorator = register(*args, **kwargs)
+
+            def wrap(fn):
+                return decorator(self.wrap_tool(fn, kwargs.get('name') or (args[0] if args else None)))
+
+            return wrap
+
+        mcp.tool = tool
+
+    @staticmethod
+    def _read_children_cpu():
+        if resource is None:
+            return 0.0
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def observe_process(self, wall_seconds):
+        """Record a reaped subprocess for the tool running in this context
+
+        CPU time comes from the RUSAGE_CHILDREN delta since the previous reap,
+        so with overlapping processes it is attributed approximately while
+        the total stays exact.
+        """
+        tool = current_tool.get() or 'none'
+        if resource is not None:
+            cpu = self._read_children_cpu()
+            self.process_cpu.inc(tool, amount=max(cpu - self._children_cpu, 0.0))
+            self._children_cpu = cpu
+        self.process_duration.observe(tool, value=wall_seconds)
+
+    def start_lag_monitor(self, interval=DEFAULT_LAG_INTERVAL):
+        """Probe event loop lag from a background task in the running loop"""
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._probe_lag(interval))
+
+    async def stop_lag_monitor(self):
+        task, self._lag_task = self._lag_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _probe_lag(self, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.loop_lag.set(value=lag)
+            if lag > self.loop_lag_max.values.get((), 0.0):
+                self.loop_lag_max.set(value=lag)
+
+    def in_flight(self):
+        return {tool: count for (tool,), count in self.tool_in_flight.values.items() if count}
+
+    def render(self):
+        lines = []
+        for metric in self.registry:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
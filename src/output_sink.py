@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Bounded capture of tool output with spill-to-disk.
+
+An OutputSink keeps the first ``memory_bytes`` of a stream in memory.  Once
+the stream grows past that, everything (the head included) is written to a
+temporary file and only the head stays in memory as a preview, so a tool
+that exports hundreds of megabytes holds the same amount of memory as one
+that prints a line.  Data for the file is collected in a buffer of
+``FLUSH_BYTES`` and written from a worker thread, so spilling a large
+output never blocks the event loop on disk I/O.
+
+SpilledOutputs keeps the spilled files a tool has returned and serves them
+in pages of ``page_bytes`` as ``tool-output://{id}/{page}`` resources.
+Files expire after ``ttl`` seconds or when ``max_outputs`` or
+``max_disk_bytes`` is exceeded, oldest first, and are removed at exit.
+"""
+
+import asyncio
+import codecs
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+DEFAULT_MEMORY_BYTES = 64 * 1024
+DEFAULT_PAGE_BYTES = 64 * 1024
+DEFAULT_MAX_OUTPUTS = 64
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+DEFAULT_TTL = 3600
+# Spilled data is buffered up to this size before a threaded write
+FLUSH_BYTES = 1024 * 1024
+OUTPUT_URI_PREFIX = 'tool-output://'
+# Longest UTF-8 continuation run, used to keep pages on character boundaries
+MAX_CONTINUATION_BYTES = 3
+
+
+class UnknownOutputError(Exception):
+    """Raised for an output ID that does not exist or has expired"""
+
+
+def decode_head(data):
+    """Decode bytes that may end in the middle of a UTF-8 sequence"""
+    return codecs.getincrementaldecoder('utf-8')('replace').decode(data, final=False)
+
+
+def _is_continuation(byte):
+    return 0x80 <= byte <= 0xBF
+
+
+class OutputSink:
+    """Keeps the head of a stream in memory and the whole stream on disk past that"""
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, directory=None):
+        self.memory_bytes = memory_bytes
+        self.directory = directory
+        self.size = 0
+        self.path = None
+        self.published = False
+        self._head = bytearray()
+        self._pending = bytearray()
+        self._overflowed = False
+        self._file = None
+        self._closed = False
+        # A write thread abandoned by a cancelled caller may still be running at close()
+        self._file_lock = threading.Lock()
+
+    @property
+    def spilled(self):
+        return self._overflowed
+
+    async def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8', errors='replace')
+        self.size += len(data)
+        if not self._overflowed and len(self._head) + len(data) <= self.memory_bytes:
+            self._head += data
+            return
+        if not self._overflowed:
+            self._overflowed = True
+            self._pending += self._head
+            # Keep only what the preview shows
+            room = self.memory_bytes - len(self._head)
+            self._head += data[:room]
+        self._pending += data
+        if len(self._pending) >= FLUSH_BYTES:
+            await self._flush()
+
+    async def _flush(self):
+        data, self._pending = bytes(self._pending), bytearray()
+        await asyncio.to_thread(self._write_file, data)
+
+    def _write_file(self, data):
+        with self._file_lock:
+            if self._closed:
+                return
+            if self._file is None:
+                fd, self.path = tempfile.mkstemp(prefix='output-', dir=self.directory)
+                self._file = os.fdopen(fd, 'wb')
+            self._file.write(data)
+
+    def text(self):
+        """The whole output if it fit in memory, otherwise the head"""
+        if not self.spilled:
+            return self._head.decode('utf-8', errors='replace')
+        return decode_head(bytes(self._head))
+
+    async def finish(self):
+        """Write out buffered data and close the spill file, keeping it on disk"""
+        if self._pending:
+            await self._flush()
+        await asyncio.to_thread(self._close_file)
+
+    def _close_file(self):
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def close(self):
+        """Release the sink; the spill file is deleted unless it was published"""
+        self._pending = bytearray()
+        with self._file_lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.path is not None and not self.published:
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+                self.path = None
+
+
+@dataclass
+class SpilledOutput:
+    id: str
+    path: str
+    size: int
+    label: str
+    created: float
+    page_bytes: int
+
+    @property
+    def pages(self):
+        return max((self.size + self.page_bytes - 1) // self.page_bytes, 1)
+
+    def uri(self, page=0):
+        return f'{OUTPUT_URI_PREFIX}{self.id}/{page}'
+
+
+class SpilledOutputs:
+    """Spilled tool outputs kept on disk and served in pages"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._outputs = OrderedDict()
+        self._lock = threading.Lock()
+        self._directory = None
+
+    def directory(self):
+        configured = self.settings.get('dir')
+        if configured:
+            path = os.path.expanduser(configured)
+            os.makedirs(path, exist_ok=True)
+            return path
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix='kali-mcp-output-')
+        return self._directory
+
+    def sink(self):
+        return OutputSink(self.settings.get('memory_bytes', DEFAULT_MEMORY_BYTES), self.directory())
+
+    def publish(self, sink, label):
+        """Take ownership of a finished, spilled sink's file and return its SpilledOutput"""
+        sink.published = True
+        output = SpilledOutput(
+            id=uuid.uuid4().hex[:12],
+            path=sink.path,
+            size=sink.size,
+            label=label,
+            created=time.time(),
+            page_bytes=self.settings.get('page_bytes', DEFAULT_PAGE_BYTES),
+        )
+        with self._lock:
+            self._outputs[output.id] = output
+            self._evict()
+        return output
+
+    def get(self, output_id):
+        with self._lock:
+            self._evict()
+            output = self._outputs.get(output_id)
+        if output is None:
+            raise UnknownOutputError(f'Unknown or expired output {output_id}')
+        return output
+
+    def read_page(self, output_id, page):
+        """Text of one page, widened or narrowed so no character is split"""
+        output = self.get(output_id)
+        if page < 0 or page >= output.pages:
+            raise ValueError(f'Page {page} out of range, output {output_id} has {output.pages} pages')
+        start = page * output.page_bytes
+        with open(output.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(output.page_bytes + MAX_CONTINUATION_BYTES)
+        # A character split by the boundary belongs to the page it starts on
+        begin = 0
+        if start > 0:
+            while begin < MAX_CONTINUATION_BYTES and begin < len(data) and _is_continuation(data[begin]):
+                begin += 1
+        end = min(output.page_bytes, len(data))
+        while end < len(data) and end < output.page_bytes + MAX_CONTINUATION_BYTES and _is_continuation(data[end]):
+            end += 1
+        return data[begin:end].decode('utf-8', errors='replace')
+
+    def stats(self):
+        with self._lock:
+            return {'outputs': len(self._outputs), 'disk_bytes': sum(output.size for output in self._outputs.values())}
+
+    def close(self):
+        with self._lock:
+            for output in self._outputs.values():
+                self._remove(output)
+            self._outputs.clear()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def _evict(self):
+        ttl = self.settings.get('ttl', DEFAULT_TTL)
+        max_outputs = self.settings.get('max_outputs', DEFAULT_MAX_OUTPUTS)
+        max_disk_bytes = self.settings.get('max_disk_bytes', DEFAULT_MAX_DISK_BYTES)
+        now = time.time()
+        disk_bytes = sum(output.size for output in self._outputs.values())
+        while self._outputs:
+            oldest = next(iter(self._outputs.values()))
+            expired = now - oldest.created > ttl
+            # The newest output is kept even if it alone exceeds the disk budget
+            over = len(self._outputs) > max_outputs or (disk_bytes > max_disk_bytes and len(self._outputs) > 1)
+            if not expired and not over:
+                break
+            self._outputs.popitem(last=False)
+            disk_bytes -= oldest.size
+            self._remove(oldest)
+
+    @staticmethod
+    def _remove(output):
+        try:
+            os.unlink(output.path)
+        except FileNotFoundError:
+            pass
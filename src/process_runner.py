@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Async subprocess execution shared by all MCP tools.
+
+Every tool that shells out goes through ``ProcessRunner.run`` so that the
+FastMCP event loop is never blocked by a child process.  The runner limits
+how many children may run at once, enforces per-call timeouts and kills the
+child (and its process group) when the awaiting task is cancelled, e.g.
+because the MCP client disconnected.
+
+Passing an OutputSink as ``sink`` bounds how much of stdout is held in
+memory: stdout is read in chunks into the sink, which spills to disk past
+its limit, and ``ProcessResult.stdout`` is the sink's preview.
+
+``fast_spawn`` launches an argv whose first element is an absolute path
+without a new session and without closing inherited descriptors, which
+lets CPython use posix_spawn instead of fork+exec.  The child then has no
+process group of its own, so a kill reaches only the child itself.
+"""
+
+import asyncio
+import itertools
+import os
+import signal
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 600
+DEFAULT_STREAM_BUFFER_BYTES = 256 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+MAX_LINE_BYTES = 64 * 1024
+
+
+class ProcessTimeoutError(Exception):
+    """Raised when a child process exceeds its timeout"""
+
+    def __init__(self, argv, timeout):
+        self.argv = argv
+        self.timeout = timeout
+        super().__init__(f'Command timed out after {timeout}s: {" ".join(argv)}')
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a finished child process"""
+    argv: list
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+class OutputRing:
+    """Bounded buffer that keeps only the most recent lines of output"""
+
+    def __init__(self, max_bytes=DEFAULT_STREAM_BUFFER_BYTES):
+        self.max_bytes = max_bytes
+        self.total_lines = 0
+        self.dropped_lines = 0
+        self._lines = deque()
+        self._size = 0
+
+    def append(self, line):
+        self._lines.append(line)
+        self._size += len(line)
+        self.total_lines += 1
+        while self._size > self.max_bytes and len(self._lines) > 1:
+            self._size -= len(self._lines.popleft())
+            self.dropped_lines += 1
+
+    @classmethod
+    def from_lines(cls, lines, dropped_lines=0):
+        """Rebuild a ring holding exactly lines, e.g. from a stored snapshot"""
+        ring = cls(max_bytes=float('inf'))
+        for line in lines:
+            ring.append(line)
+        ring.total_lines += dropped_lines
+        ring.dropped_lines = dropped_lines
+        return ring
+
+    def slice(self, offset=0, limit=None):
+        """Return retained lines starting at absolute line number offset
+
+        Lines that have already been dropped from the ring are skipped, so
+        the first returned line may be later than offset.
+        """
+        start = max(offset - self.dropped_lines, 0)
+        stop = len(self._lines) if limit is None else start + max(limit, 0)
+        return list(itertools.islice(self._lines, start, stop))
+
+    def text(self):
+        body = ''.join(self._lines)
+        if self.dropped_lines:
+            return f'... ({self.dropped_lines} earlier lines omitted)\n{body}'
+        return body
+
+
+async def _feed(writer, input):
+    try:
+        writer.write(input.encode())
+        await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _drain(reader):
+    if reader is None:
+        return
+    while await reader.read(READ_CHUNK_SIZE):
+        pass
+
+
+async def iter_lines(stream):
+    """Yield decoded lines from a StreamReader, splitting over-long lines"""
+    pending = b''
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        start = 0
+        while True:
+            newline = pending.find(b'\n', start)
+            if newline == -1:
+                break
+            yield pending[start:newline + 1].decode(errors='replace')
+            start = newline + 1
+        pending = pending[start:]
+        if len(pending) >= MAX_LINE_BYTES:
+            yield pending.decode(errors='replace')
+            pending = b''
+    if pending:
+        yield pending.decode(errors='replace')
+
+
+class ProcessRunner:
+    """Runs child processes with asyncio, a concurrency limit and timeouts"""
+
+    def __init__(self, settings, metrics=None):
+        self.settings = settings
+        self.metrics = metrics
+        self._semaphore = None
+        self._semaphore_size = None
+
+    def _get_semaphore(self):
+        size = int(self.settings.get('max_concurrency') or DEFAULT_MAX_CONCURRENCY)
+        if self._semaphore is None or size != self._semaphore_size:
+            # Resized limits only apply to calls made after the change
+            self._semaphore = asyncio.Semaphore(size)
+            self._semaphore_size = size
+        return self._semaphore
+
+    async def run(self, argv, input=None, timeout=None, sink=None, fast_spawn=False):
+        """Run argv to completion and return a ProcessResult
+
+        With a sink, stdout goes into the sink instead of one bytes object.
+        """
+        if timeout is None:
+            timeout = self.settings.get('timeout', DEFAULT_TIMEOUT)
+
+        async with self._get_semaphore():
+            process = await self._spawn(argv, input is not None, fast_spawn)
+            started = time.monotonic()
+            try:
+                if sink is None:
+                    communicate = process.communicate(input.encode() if input is not None else None)
+                else:
+                    communicate = self._communicate_into(process, input, sink)
+                stdout, stderr = await asyncio.wait_for(communicate, timeout=timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise ProcessTimeoutError(argv, timeout)
+            except asyncio.CancelledError:
+                await self._kill(process)
+                raise
+            finally:
+                self._observe(started)
+
+        return ProcessResult(
+            argv=list(argv),
+            returncode=process.returncode,
+            stdout=stdout.decode(errors='replace') if sink is None else sink.text(),
+            stderr=stderr.decode(errors='replace'),
+        )
+
+    async def _communicate_into(self, process, input, sink):
+        """communicate() that writes stdout chunks to sink, returning (None, stderr)"""
+        async def pump():
+            while True:
+                chunk = await process.stdout.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await sink.write(chunk)
+
+        tasks = [pump(), process.stderr.read()]
+        if input is not None:
+            tasks.append(_feed(process.stdin, input))
+        results = await asyncio.gather(*tasks)
+        await process.wait()
+        await sink.finish()
+        return None, results[1]
+
+    async def stream(self, argv, on_line=None, input=None, timeout=None, sink=None, fast_spawn=False):
+        """Run argv reading output line by line into bounded ring buffers
+
+        on_line(stream_name, line) is awaited for every line of stdout and
+        stderr as it arrives.  Only the tail of each stream is kept, so memory
+        stays bounded however much the child prints; a sink additionally
+        receives all of stdout.
+        """
+        if timeout is None:
+            timeout = self.settings.get('timeout', DEFAULT_TIMEOUT)
+        ring_bytes = self.settings.get('stream_buffer_bytes', DEFAULT_STREAM_BUFFER_BYTES)
+        rings = {'stdout': OutputRing(ring_bytes), 'stderr': OutputRing(ring_bytes)}
+
+        async def pump(name, reader):
+            async for line in iter_lines(reader):
+                rings[name].append(line)
+                if sink is not None and name == 'stdout':
+                    await sink.write(line)
+                if on_line is not None:
+                    await on_line(name, line)
+
+        async with self._get_semaphore():
+            process = await self._spawn(argv, input is not None, fast_spawn)
+            tasks = [pump('stdout', process.stdout), pump('stderr', process.stderr)]
+            if input is not None:
+                tasks.append(_feed(process.stdin, input))
+            pumps = asyncio.gather(*tasks)
+            # Mark the outcome retrieved; on cancellation it is only a CancelledError
+            pumps.add_done_callback(lambda future: future.cancelled() or future.exception())
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(pumps, timeout=timeout)
+                await process.wait()
+                if sink is not None:
+                    await sink.finish()
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise ProcessTimeoutError(argv, timeout)
+            except BaseException:
+                await self._kill(process)
+                raise
+            finally:
+                self._observe(started)
+
+        return ProcessResult(
+            argv=list(argv),
+            returncode=process.returncode,
+            stdout=rings['stdout'].text(),
+            stderr=rings['stderr'].text(),
+        )
+
+    @staticmethod
+    def shell_argv(command):
+        """Wrap a command line so it is interpreted by the platform shell"""
+        if sys.platform == 'win32':
+            return ['cmd.exe', '/c', command]
+        return ['/bin/sh', '-c', command]
+
+    async def run_shell(self, command, input=None, timeout=None, sink=None):
+        """Run a shell command line through /bin/sh without blocking the loop"""
+        return await self.run(self.shell_argv(command), input=input, timeout=timeout, sink=sink)
+
+    async def stream_shell(self, command, on_line=None, input=None, timeout=None, sink=None):
+        """Stream a shell command line, see stream()"""
+        return await self.stream(self.shell_argv(command), on_line=on_line, input=input, timeout=timeout, sink=sink)
+
+    async def _spawn(self, argv, with_stdin, fast_spawn=False):
+        kwargs = {}
+        if fast_spawn and os.path.isabs(argv[0]):
+            # The conditions under which subprocess uses posix_spawn
+            kwargs['close_fds'] = False
+        elif hasattr(os, 'killpg'):
+            # Own process group so a kill also reaches grandchildren of the shell
+            kwargs['start_new_session'] = True
+
+        return await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE if with_stdin else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **kwargs
+        )
+
+    def _observe(self, started):
+        if self.metrics is not None:
+            self.metrics.observe_process(time.monotonic() - started)
+
+    async def _kill(self, process):
+        if process.returncode is not None:
+            return
+
+        try:
+            if hasattr(os, 'killpg') and os.getpgid(process.pid) == process.pid:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+        # Shield the reap so a second cancellation cannot leave a zombie behind.
+        # wait() only returns once the pipes reach EOF, which needs someone to
+        # read what the child left in them after its readers were cancelled.
+        await asyncio.shield(asyncio.gather(process.wait(), _drain(process.stdout), _drain(process.stderr)))
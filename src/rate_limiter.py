@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Per-origin pacing for the outbound HTTP request tools.
+
+Every request made by ``send_http1_request`` and ``send_http2_request``
+first takes a slot from the RateLimiter for its origin
+(``scheme://host:port``).  A slot needs a free place under the origin's
+``max_concurrency`` and a token from a bucket that refills at ``rate``
+tokens per second up to ``burst``.  Tokens are reserved in arrival order,
+so waiting callers are released one by one at the refill rate rather than
+all retrying at once.  A caller that cannot get its slot within
+``queue_timeout`` seconds fails with RateLimitTimeoutError; when the token
+alone is further away than that, it fails at once without waiting.
+
+The rate adapts to the target: a 429 or 503 response, or a connection
+that is reset or refused, multiplies the origin's rate by
+``backoff_factor`` (down to ``min_rate``) and honours ``Retry-After``.
+Every successful response adds ``recovery_step`` of the configured rate
+back.  Per-origin overrides of rate, burst and max_concurrency go in
+``origins``.
+"""
+
+import asyncio
+import email.utils
+import time
+import urllib.parse
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_QUEUE_TIMEOUT = 30
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_RECOVERY_STEP = 0.05
+DEFAULT_MAX_RETRY_AFTER = 60
+DEFAULT_MAX_ORIGINS = 1024
+BACKOFF_STATUSES = (429, 503)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class RateLimitTimeoutError(Exception):
+    """Raised when a request could not get a slot for its origin in time"""
+
+
+def origin_of(url):
+    """scheme://host:port of url, with the default port filled in"""
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    port = parts.port or DEFAULT_PORTS.get(scheme)
+    return f'{scheme}://{(parts.hostname or "").lower()}:{port}'
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delay or HTTP date), None if unusable"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(when.timestamp() - (now if now is not None else time.time()), 0.0)
+
+
+@dataclass
+class OriginState:
+    origin: str
+    tokens: float
+    updated: float
+    semaphore: asyncio.Semaphore
+    max_concurrency: int
+    # Fraction of the configured rate currently in use, lowered on backoff
+    factor: float = 1.0
+    in_flight: int = 0
+    waiting: int = 0
+    backoffs: int = 0
+
+    @property
+    def idle(self):
+        return self.in_flight == 0 and self.waiting == 0
+
+
+class Slot:
+    """A granted request slot; report the response with observe()"""
+
+    def __init__(self, limiter, state, connection_errors):
+        self.limiter = limiter
+        self.state = state
+        self.connection_errors = connection_errors
+        self.waited = 0.0
+
+    def observe(self, status, headers=None):
+        if self.state is not None:
+            self.limiter._observe(self.state, status, headers or {})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.state is None:
+            return
+        if exc is not None and self.connection_errors and isinstance(exc, self.connection_errors):
+            self.limiter._back_off(self.state, 'connection')
+        self.limiter._release(self.state)
+
+
+class RateLimiter:
+    """Token bucket and concurrency cap per origin, with adaptive backoff"""
+
+    def __init__(self, settings, metrics=None):
+        self.settings = settings
+        self._origins = OrderedDict()
+        self._loop = None
+        self._wait = None
+        self._timeouts = None
+        self._backoffs = None
+        self._rate = None
+        self._in_flight = None
+        if metrics is not None:
+            self._wait = metrics.histogram('http_rate_limit_wait_seconds', 'Time outbound requests waited for a slot', ['origin'])
+            self._timeouts = metrics.counter('http_rate_limit_timeouts_total', 'Outbound requests that gave up waiting for a slot', ['origin'])
+            self._backoffs = metrics.counter('http_rate_limit_backoffs_total', 'Rate reductions after throttling or connection failures', ['origin', 'reason'])
+            self._rate = metrics.gauge('http_rate_limit_rate', 'Current requests per second allowed for an origin', ['origin'])
+            self._in_flight = metrics.gauge('http_rate_limit_in_flight', 'Outbound requests in flight per origin', ['origin'])
+
+    def _limits(self, origin):
+        limits = {
+            'rate': self.settings.get('rate', DEFAULT_RATE),
+            'burst': self.settings.get('burst', DEFAULT_BURST),
+            'max_concurrency': self.settings.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+        }
+        overrides = self.settings.get('origins') or {}
+        limits.update(overrides.get(origin) or {})
+        return limits
+
+    def _state(self, origin, now):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Semaphores cannot be shared between event loops
+            self._origins.clear()
+            self._loop = loop
+
+        limits = self._limits(origin)
+        state = self._origins.get(origin)
+        if state is None:
+            state = OriginState(
+                origin=origin,
+                tokens=float(limits['burst']),
+                updated=now,
+                semaphore=asyncio.Semaphore(limits['max_concurrency']),
+                max_concurrency=limits['max_concurrency'],
+            )
+            self._origins[origin] = state
+            self._evict()
+        elif state.max_concurrency != limits['max_concurrency'] and state.idle:
+            # Resized limits apply once the origin has no requests in flight
+            state.semaphore = asyncio.Semaphore(limits['max_concurrency'])
+            state.max_concurrency = limits['max_concurrency']
+        self._origins.move_to_end(origin)
+        return state
+
+    def _evict(self):
+        max_origins = self.settings.get('max_origins', DEFAULT_MAX_ORIGINS)
+        if len(self._origins) <= max_origins:
+            return
+        for origin in [origin for origin, state in self._origins.items() if state.idle]:
+            if len(self._origins) <= max_origins:
+                break
+            del self._origins[origin]
+
+    def _current_rate(self, state):
+        return max(self._limits(state.origin)['rate'] * state.factor, self.settings.get('min_rate', DEFAULT_MIN_RATE))
+
+    def _reserve(self, state, now):
+        """Take a token, returning how long to wait until it is available"""
+        limits = self._limits(state.origin)
+        rate = self._current_rate(state)
+        if now > state.updated:
+            state.tokens = min(state.tokens + (now - state.updated) * rate, float(limits['burst']))
+            state.updated = now
+        state.tokens -= 1
+        # updated lies in the future while a Retry-After is being honoured
+        return max(state.updated - now, 0.0) + max(-state.tokens, 0.0) / rate
+
+    def slot(self, url, connection_errors=()):
+        """Wait for a request slot for url's origin, for use as ``async with``
+
+        Exceptions of a type in connection_errors raised inside the block
+        count as connection failures and slow the origin down.
+        """
+        if not self.settings.get('enabled', True):
+            return Slot(self, None, connection_errors)
+        return _SlotRequest(self, origin_of(url), connection_errors)
+
+    async def _acquire(self, origin, connection_errors):
+        timeout = self.settings.get('queue_timeout', DEFAULT_QUEUE_TIMEOUT)
+        started = time.monotonic()
+        deadline = started + timeout
+        state = self._state(origin, started)
+        state.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(state.semaphore.acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self._timed_out(state, f'{origin} has {state.max_concurrency} requests in flight')
+
+            now = time.monotonic()
+            delay = self._reserve(state, now)
+            if now + delay > deadline:
+                state.tokens += 1
+                state.semaphore.release()
+                self._timed_out(state, f'{origin} is limited to {self._current_rate(state):.2f} requests/s')
+            if delay > 0:
+                try:
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    state.tokens += 1
+                    state.semaphore.release()
+                    raise
+        finally:
+            state.waiting -= 1
+
+        state.in_flight += 1
+        self._set_in_flight(state)
+        slot = Slot(self, state, connection_errors)
+        slot.waited = time.monotonic() - started
+        if self._wait is not None:
+            self._wait.observe(origin, value=slot.waited)
+        return slot
+
+    def _timed_out(self, state, reason):
+        if self._timeouts is not None:
+            self._timeouts.inc(state.origin)
+        timeout = self.settings.get('queue_timeout', DEFAULT_QUEUE_TIMEOUT)
+        raise RateLimitTimeoutError(f'No request slot within {timeout}s: {reason}')
+
+    def _release(self, state):
+        state.in_flight -= 1
+        state.semaphore.release()
+        self._set_in_flight(state)
+
+    def _observe(self, state, status, headers):
+        if status in BACKOFF_STATUSES:
+            self._back_off(state, str(status), parse_retry_after(headers.get('Retry-After')))
+        elif state.factor < 1.0:
+            state.factor = min(state.factor + self.settings.get('recovery_step', DEFAULT_RECOVERY_STEP), 1.0)
+            self._set_rate(state)
+
+    def _back_off(self, state, reason, retry_after=None):
+        state.factor *= self.settings.get('backoff_factor', DEFAULT_BACKOFF_FACTOR)
+        state.backoffs += 1
+        now = time.monotonic()
+        # Drop the burst allowance so the lower rate takes effect immediately
+        state.tokens = min(state.tokens, 0.0)
+        if retry_after is not None:
+            retry_after = min(retry_after, self.settings.get('max_retry_after', DEFAULT_MAX_RETRY_AFTER))
+            state.updated = max(state.updated, now + retry_after)
+        if self._backoffs is not None:
+            self._backoffs.inc(state.origin, reason)
+        self._set_rate(state)
+
+    def _set_rate(self, state):
+        if self._rate is not None:
+            self._rate.set(state.origin, value=round(self._current_rate(state), 3))
+
+    def _set_in_flight(self, state):
+        if self._in_flight is not None:
+            self._in_flight.set(state.origin, value=state.in_flight)
+
+    def stats(self):
+        return {
+            state.origin: {
+                'rate': round(self._current_rate(state), 3),
+                'in_flight': state.in_flight,
+                'waiting': state.waiting,
+                'backoffs': state.backoffs,
+            }
+            for state in self._origins.values()
+        }
+
+
+class _SlotRequest:
+    """Pending slot returned by RateLimiter.slot(), acquired on entry"""
+
+    def __init__(self, limiter, origin, connection_errors):
+        self.limiter = limiter
+        self.origin = origin
+        self.connection_errors = connection_errors
+        self._slot = None
+
+    async def __aenter__(self):
+        self._slot = await self.limiter._acquire(self.origin, self.connection_errors)
+        return self._slot
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._slot.__aexit__(exc_type, exc, tb)
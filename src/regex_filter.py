@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Regex filtering of history data with a literal prefilter and a time budget.
+
+``compile_filter`` keeps an LRU of compiled patterns together with the
+literal substrings every match must contain, so rows lacking one of them
+are rejected with a plain ``in`` test before the regex engine runs.
+
+Python's ``re`` holds the GIL for the whole of a search and cannot be
+interrupted, so a pattern with catastrophic backtracking would stall every
+thread of the server.  RegexSandbox therefore runs REGEXP queries in a
+small pool of child processes that open the history database read-only;
+a query that exceeds its budget has its child killed and replaced.
+"""
+
+import asyncio
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+from functools import lru_cache
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_PROCESSES = 2
+CACHE_SIZE = 256
+MIN_LITERAL = 3
+MAX_LITERALS = 3
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class RegexTimeoutError(Exception):
+    """Raised when a regex query exceeds its time budget"""
+
+
+def _literal_runs(items, runs):
+    """Collect runs of consecutive literals from the parsed items that always match"""
+    current = []
+    for op, av in items:
+        name = str(op)
+        if name == 'LITERAL':
+            current.append(chr(av))
+            continue
+        runs.append(''.join(current))
+        current = []
+        if name == 'SUBPATTERN':
+            _, add_flags, _, group = av
+            if not add_flags & re.IGNORECASE:
+                _literal_runs(group, runs)
+        elif name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT') and av[0] >= 1:
+            _literal_runs(av[2], runs)
+    runs.append(''.join(current))
+    return runs
+
+
+def required_literals(pattern):
+    """Longest substrings that any match of pattern must contain"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return ()
+    if parsed.state.flags & re.IGNORECASE:
+        return ()
+    runs = {run for run in _literal_runs(parsed, []) if len(run) >= MIN_LITERAL}
+    return tuple(sorted(runs, key=len, reverse=True)[:MAX_LITERALS])
+
+
+class RegexFilter:
+    """Compiled pattern plus its literal prefilter"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.literals = required_literals(pattern)
+
+    def search(self, value):
+        if value is None:
+            return False
+        for literal in self.literals:
+            if literal not in value:
+                return False
+        return self.regex.search(value) is not None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_filter(pattern):
+    """Return the cached RegexFilter for pattern, raising re.error if invalid"""
+    return RegexFilter(pattern)
+
+
+def regexp(pattern, value):
+    """SQLite REGEXP implementation"""
+    return compile_filter(pattern).search(value)
+
+
+def serve():
+    """Child process loop answering one JSON query per stdin line"""
+    connections = {}
+    for line in sys.stdin.buffer:
+        request = json.loads(line)
+        try:
+            conn = connections.get(request['db'])
+            if conn is None:
+                uri = pathlib.Path(request['db']).as_uri() + '?mode=ro'
+                conn = sqlite3.connect(uri, uri=True)
+                conn.create_function('regexp', 2, regexp, deterministic=True)
+                conn.row_factory = sqlite3.Row
+                connections[request['db']] = conn
+            reply = {'rows': [dict(row) for row in conn.execute(request['sql'], request['params'])]}
+        except Exception as e:
+            reply = {'error': str(e)}
+        sys.stdout.write(json.dumps(reply) + '\n')
+        sys.stdout.flush()
+
+
+class RegexSandbox:
+    """Pool of child processes running REGEXP queries under a time budget"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._idle = []
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(int(self.settings.get('regex_processes', DEFAULT_PROCESSES)))
+        return self._semaphore
+
+    async def _spawn(self):
+        return await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=STREAM_LIMIT,
+        )
+
+    @staticmethod
+    async def _kill(child):
+        if child.returncode is None:
+            child.kill()
+        await child.wait()
+
+    @staticmethod
+    async def _request(child, payload):
+        child.stdin.write(payload)
+        await child.stdin.drain()
+        line = await child.stdout.readline()
+        if not line:
+            raise RuntimeError('Regex worker exited unexpectedly')
+        return json.loads(line)
+
+    async def query(self, db_path, sql, params):
+        """Run sql against the database at db_path and return its rows as dicts"""
+        timeout = self.settings.get('regex_timeout', DEFAULT_TIMEOUT)
+        payload = (json.dumps({'db': db_path, 'sql': sql, 'params': list(params)}) + '\n').encode()
+        async with self._get_semaphore():
+            child = self._idle.pop() if self._idle else await self._spawn()
+            try:
+                reply = await asyncio.wait_for(self._request(child, payload), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(child)
+                raise RegexTimeoutError(f'Regex evaluation exceeded its {timeout}s budget') from None
+            except BaseException:
+                # The child may be mid-query; it cannot be reused
+                await asyncio.shield(self._kill(child))
+                raise
+            self._idle.append(child)
+
+        if 'error' in reply:
+            raise sqlite3.OperationalError(reply['error'])
+        return reply['rows']
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for child in idle:
+            await self._kill(child)
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Content-addressed store of HTTP responses returned by the request tools.
+
+Every response gets a short ID.  Its status, URL and headers go into a
+SQLite index; the retained body bytes are written once under their SHA-256
+in ``blobs/``, so fetching the same page repeatedly stores one copy of
+the body.  ``diff`` compares two stored responses without returning either
+in full: status, a header delta and the changed body lines.  Large bodies
+are memory-mapped and their common prefix and suffix skipped byte-wise,
+so only the region that differs is decoded and line-diffed.
+
+Bodies of pentest traffic can hold credentials and personal data, so the
+store is off unless ``responses.enabled`` is set, its directory is only
+accessible to the server's user, and records are evicted oldest first once
+they are older than ``max_age`` seconds, number more than
+``max_responses`` or their bodies take more than ``max_disk_bytes``.
+"""
+
+import asyncio
+import contextlib
+import difflib
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+
+DEFAULT_DIR = '~/.cache/kali-mcp/responses'
+DEFAULT_MAX_RESPONSES = 10000
+DEFAULT_MAX_AGE = 24 * 3600
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_MMAP_BYTES = 1024 * 1024
+DEFAULT_MAX_CHANGES = 50
+MAX_LINE_CHARS = 500
+COMPARE_CHUNK = 64 * 1024
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    method TEXT,
+    url TEXT,
+    status INTEGER,
+    headers TEXT NOT NULL,
+    charset TEXT,
+    truncated INTEGER NOT NULL,
+    body_sha256 TEXT NOT NULL,
+    body_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at);
+CREATE INDEX IF NOT EXISTS responses_body ON responses (body_sha256);
+'''
+
+
+class UnknownResponseError(KeyError):
+    """Raised for a response ID that was never stored or has been evicted"""
+
+    def __str__(self):
+        return f'Unknown response {self.args[0]}'
+
+
+def _common_prefix(a, b):
+    """Length of the common prefix of two bytes-like objects"""
+    limit = min(len(a), len(b))
+    offset = 0
+    while offset < limit:
+        end = min(offset + COMPARE_CHUNK, limit)
+        chunk_a, chunk_b = a[offset:end], b[offset:end]
+        if chunk_a != chunk_b:
+            return offset + len(os.path.commonprefix([chunk_a, chunk_b]))
+        offset = end
+    return limit
+
+
+def _common_suffix(a, b, limit):
+    """Length of the common suffix of a and b, at most limit bytes"""
+    length = 0
+    while length < limit:
+        step = min(COMPARE_CHUNK, limit - length)
+        chunk_a = a[len(a) - length - step:len(a) - length]
+        chunk_b = b[len(b) - length - step:len(b) - length]
+        if chunk_a != chunk_b:
+            return length + len(os.path.commonprefix([chunk_a[::-1], chunk_b[::-1]]))
+        length += step
+    return limit
+
+
+def _count_lines(data, end):
+    return sum(data[offset:min(offset + COMPARE_CHUNK, end)].count(b'\n') for offset in range(0, end, COMPARE_CHUNK))
+
+
+def _clip(line):
+    return line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS] + '...'
+
+
+def _is_text(text):
+    return not any(ord(char) < 32 and char not in '\t\r\n' for char in text)
+
+
+def diff_headers(headers_a, headers_b, ignore=()):
+    """Added, removed and changed headers, compared case-insensitively"""
+    ignore = {name.lower() for name in ignore}
+    a = {name.lower(): value for name, value in headers_a.items() if name.lower() not in ignore}
+    b = {name.lower(): value for name, value in headers_b.items() if name.lower() not in ignore}
+    delta = {
+        'added': {name: b[name] for name in b.keys() - a.keys()},
+        'removed': {name: a[name] for name in a.keys() - b.keys()},
+        'changed': {name: [a[name], b[name]] for name in a.keys() & b.keys() if a[name] != b[name]},
+    }
+    return {key: value for key, value in delta.items() if value}
+
+
+def diff_bodies(a, b, charset_a, charset_b, max_changes=DEFAULT_MAX_CHANGES):
+    """Changed line ranges between two bodies given as bytes-like objects"""
+    prefix = _common_prefix(a, b)
+    if prefix == len(a) == len(b):
+        return {'identical': True}
+
+    # Only the region between the common prefix and suffix lines is decoded
+    start = a.rfind(b'\n', 0, prefix) + 1
+    suffix = _common_suffix(a, b, min(len(a), len(b)) - start)
+    end_a, end_b = len(a) - suffix, len(b) - suffix
+    if suffix:
+        newline = a.find(b'\n', end_a, len(a))
+        end_a, end_b = (len(a), len(b)) if newline < 0 else (newline + 1, end_b + newline + 1 - end_a)
+
+    text_a = bytes(a[start:end_a]).decode(charset_a or 'utf-8', errors='replace')
+    text_b = bytes(b[start:end_b]).decode(charset_b or 'utf-8', errors='replace')
+    if not (_is_text(text_a) and _is_text(text_b)):
+        return {'identical': False, 'binary': True, 'first_difference': prefix}
+
+    first_line = _count_lines(a, start) + 1
+    lines_a, lines_b = text_a.splitlines(), text_b.splitlines()
+    changes = []
+    matcher = difflib.SequenceMatcher(None, lines_a, lines_b, autojunk=False)
+    for op, a1, a2, b1, b2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        changes.append({
+            'op': op,
+            'line_a': first_line + a1,
+            'line_b': first_line + b1,
+            'a': [_clip(line) for line in lines_a[a1:a2]],
+            'b': [_clip(line) for line in lines_b[b1:b2]],
+        })
+    return {
+        'identical': False,
+        'first_difference': prefix,
+        'changes': changes[:max_changes],
+        'changes_omitted': max(len(changes) - max_changes, 0),
+    }
+
+
+class ResponseStore:
+    """SQLite index of responses with deduplicated body blobs on disk"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return os.path.expanduser(self.settings.get('dir', DEFAULT_DIR))
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.directory, 'blobs', sha256[:2], sha256)
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, 'responses.sqlite3'), check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(self._connect(), *args)
+        return await asyncio.to_thread(locked)
+
+    async def put(self, method, url, status, headers, body):
+        """Store a response with its BoundedBody and return the new response ID"""
+        response_id = uuid.uuid4().hex[:12]
+        await self._run(self._insert, response_id, method, url, status, headers, body)
+        return response_id
+
+    def _write_blob(self, sha256, data):
+        path = self._blob_path(sha256)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp)
+            raise
+
+    def _insert(self, conn, response_id, method, url, status, headers, body):
+        sha256 = hashlib.sha256(body.data).hexdigest()
+        self._write_blob(sha256, body.data)
+        with conn:
+            conn.execute(
+                'INSERT INTO responses (id, created_at, method, url, status, headers, charset, truncated, body_sha256, body_bytes) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (response_id, time.time(), method, url, status, json.dumps(headers), body.charset,
+                 int(body.truncated), sha256, len(body.data))
+            )
+        self._evict(conn)
+
+    def _evict(self, conn):
+        max_age = self.settings.get('max_age', DEFAULT_MAX_AGE)
+        rows = conn.execute(
+            'SELECT id, body_sha256 FROM responses WHERE created_at < ?', (time.time() - max_age,)
+        ).fetchall()
+        self._delete(conn, rows)
+
+        max_responses = self.settings.get('max_responses', DEFAULT_MAX_RESPONSES)
+        excess = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0] - max_responses
+        if excess > 0:
+            rows = conn.execute('SELECT id, body_sha256 FROM responses ORDER BY created_at LIMIT ?', (excess,)).fetchall()
+            self._delete(conn, rows)
+
+        max_disk_bytes = self.settings.get('max_disk_bytes', DEFAULT_MAX_DISK_BYTES)
+        blobs = {sha256: [count, size] for sha256, count, size in conn.execute(
+            'SELECT body_sha256, COUNT(*), MAX(body_bytes) FROM responses GROUP BY body_sha256'
+        )}
+        disk_bytes = sum(size for _, size in blobs.values())
+        if disk_bytes <= max_disk_bytes:
+            return
+        rows = []
+        # The newest response is kept even if its body alone exceeds the budget
+        for row in conn.execute('SELECT id, body_sha256 FROM responses ORDER BY created_at').fetchall()[:-1]:
+            if disk_bytes <= max_disk_bytes:
+                break
+            rows.append(row)
+            blob = blobs[row['body_sha256']]
+            blob[0] -= 1
+            if blob[0] == 0:
+                disk_bytes -= blob[1]
+        self._delete(conn, rows)
+
+    def _delete(self, conn, rows):
+        """Delete response rows and the bodies no other response refers to"""
+        if not rows:
+            return
+        with conn:
+            conn.executemany('DELETE FROM responses WHERE id = ?', [(row['id'],) for row in rows])
+        for sha256 in {row['body_sha256'] for row in rows}:
+            if conn.execute('SELECT 1 FROM responses WHERE body_sha256 = ? LIMIT 1', (sha256,)).fetchone() is None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._blob_path(sha256))
+
+    @staticmethod
+    def _load(conn, response_id):
+        row = conn.execute('SELECT * FROM responses WHERE id = ?', (response_id,)).fetchone()
+        if row is None:
+            raise UnknownResponseError(response_id)
+        record = dict(row)
+        record['headers'] = json.loads(record['headers'])
+        record['truncated'] = bool(record['truncated'])
+        return record
+
+    @contextlib.contextmanager
+    def open_body(self, sha256, size):
+        """Yield a body's bytes, memory-mapped when it is large"""
+        if size == 0:
+            yield b''
+            return
+        with open(self._blob_path(sha256), 'rb') as f:
+            if size < self.settings.get('mmap_bytes', DEFAULT_MMAP_BYTES):
+                yield f.read()
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    async def get(self, response_id):
+        """Return the stored record of a response without its body"""
+        return await self._run(self._load, response_id)
+
+    async def diff(self, id_a, id_b, ignore_headers=(), max_changes=DEFAULT_MAX_CHANGES):
+        """Compact structural diff of two stored responses"""
+        def compare(conn):
+            a, b = self._load(conn, id_a), self._load(conn, id_b)
+            result = {
+                'a': {key: a[key] for key in ('id', 'method', 'url', 'status', 'body_bytes', 'truncated')},
+                'b': {key: b[key] for key in ('id', 'method', 'url', 'status', 'body_bytes', 'truncated')},
+                'status_changed': a['status'] != b['status'],
+                'headers': diff_headers(a['headers'], b['headers'], ignore_headers),
+            }
+            if a['body_sha256'] == b['body_sha256']:
+                result['body'] = {'identical': True}
+            else:
+                with self.open_body(a['body_sha256'], a['body_bytes']) as body_a, \
+                        self.open_body(b['body_sha256'], b['body_bytes']) as body_b:
+                    result['body'] = diff_bodies(body_a, body_b, a['charset'], b['charset'], max_changes)
+            return result
+        return await self._run(compare)
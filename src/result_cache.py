@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Result cache for idempotent read-only tools.
+
+Tools opt in with ``@result_cache.cached(tags=...)`` below ``@mcp.tool()``
+and are then answered from memory for a per-tool TTL.  Tools that change
+what a cached tool reports declare the same tags with
+``@result_cache.invalidates(...)``, which drops those entries once the
+setter has run.  Entries live in a size-bounded LRU; concurrent misses for
+the same key share one call, and error results (``Error``/``Failed``
+prefixes, as counted by Metrics) are never stored.  Neither are results
+other than plain text, i.e. those linking a ``tool-output://`` page whose
+file may be evicted while the entry would still be served.
+
+With a SharedState store (multi-worker mode) every invalidation made by
+``invalidates`` is also recorded there, as a version per tag, and each
+cached call first drops the local entries whose tags another worker has
+invalidated since, so no worker serves a result another worker's setter
+has made stale.
+"""
+
+import asyncio
+import functools
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_TTL = 60
+# SharedState namespace holding one invalidation version per tag
+STORE_NAMESPACE = 'result_cache'
+
+
+@dataclass
+class CacheEntry:
+    value: object
+    expires_at: float
+    tags: tuple
+
+
+class ResultCache:
+    """Per-tool TTL cache with LRU eviction and tag based invalidation"""
+
+    def __init__(self, settings, metrics=None, store=None):
+        self.settings = settings
+        self.store = store
+        self._shared_versions = {}
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._generations = {}
+        self.hits = {}
+        self.misses = {}
+        self._hit_counter = None
+        self._miss_counter = None
+        if metrics is not None:
+            self._hit_counter = metrics.counter('result_cache_hits_total', 'Tool calls answered from the result cache', ['tool'])
+            self._miss_counter = metrics.counter('result_cache_misses_total', 'Cacheable tool calls that ran the tool', ['tool'])
+
+    def _ttl(self, name, default):
+        return self.settings.get('ttl', {}).get(name, default)
+
+    def _count(self, counts, counter, name):
+        counts[name] = counts.get(name, 0) + 1
+        if counter is not None:
+            counter.inc(name)
+
+    def _generation(self, tags):
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _store(self, key, value, ttl, tags):
+        self._entries[key] = CacheEntry(value, time.monotonic() + ttl, tags)
+        self._entries.move_to_end(key)
+        max_entries = self.settings.get('max_entries', DEFAULT_MAX_ENTRIES)
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+    def cached(self, ttl=DEFAULT_TTL, tags=()):
+        """Decorator caching an async tool's results by its arguments"""
+        tags = tuple(tags)
+
+        def decorator(fn):
+            name = fn.__name__
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not self.settings.get('enabled', True):
+                    return await fn(*args, **kwargs)
+                if self.store is not None:
+                    await self._sync()
+
+                key = (name, json.dumps([args, kwargs], sort_keys=True, default=str))
+                while True:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.expires_at > time.monotonic():
+                        self._entries.move_to_end(key)
+                        self._count(self.hits, self._hit_counter, name)
+                        return entry.value
+                    pending = self._pending.get(key)
+                    if pending is None:
+                        break
+                    try:
+                        result = await asyncio.shield(pending)
+                    except asyncio.CancelledError:
+                        # The call we joined was cancelled, not us: run it ourselves
+                        if pending.cancelled():
+                            continue
+                        raise
+                    self._count(self.hits, self._hit_counter, name)
+                    return result
+
+                self._count(self.misses, self._miss_counter, name)
+                generation = self._generation(tags)
+                future = asyncio.get_running_loop().create_future()
+                self._pending[key] = future
+                try:
+                    result = await fn(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    future.set_exception(e)
+                    # Mark the exception retrieved in case nobody joined the call
+                    future.exception()
+                    raise
+                else:
+                    future.set_result(result)
+                    # Only plain text is stored: other results link spilled
+                    # outputs, which can be evicted before the entry expires
+                    storable = isinstance(result, str) and not result.startswith(('Error', 'Failed'))
+                    # Skip storing if a setter ran while the tool was executing
+                    if storable and generation == self._generation(tags):
+                        self._store(key, result, self._ttl(name, ttl), tags)
+                    return result
+                finally:
+                    del self._pending[key]
+
+            return wrapper
+
+        return decorator
+
+    def invalidates(self, *tags):
+        """Decorator dropping entries with any of tags after the tool runs"""
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.invalidate(*tags)
+                    if self.store is not None:
+                        await self._publish(tags)
+
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        stale = [key for key, entry in self._entries.items() if set(entry.tags) & set(tags)]
+        for key in stale:
+            del self._entries[key]
+
+    async def _publish(self, tags):
+        """Record an invalidation of tags for the other workers"""
+        for tag in tags:
+            # Already applied here, so our own version must not invalidate again
+            self._shared_versions[tag] = await self.store.put(STORE_NAMESPACE, tag, time.time())
+
+    async def _sync(self):
+        """Apply the invalidations other workers recorded since the last call"""
+        versions = await self.store.versions(STORE_NAMESPACE)
+        changed = [tag for tag, version in versions.items() if self._shared_versions.get(tag) != version]
+        self._shared_versions = versions
+        if changed:
+            self.invalidate(*changed)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+        }
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""State shared between the worker processes of one server.
+
+In multi-worker mode (see ``workers.py``) each worker is a separate
+process, so anything a client may look up from a different worker than
+the one that created it lives in a local SQLite file: configuration
+sections, background job snapshots and cancel requests, cache snapshots
+and the owner of every SSE session.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from job_manager import FINISHED_STATES
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    worker INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    dropped_lines INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_lines (
+    job_id TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    PRIMARY KEY (job_id, line_no)
+);
+
+CREATE TABLE IF NOT EXISTS sse_sessions (
+    session_id TEXT PRIMARY KEY,
+    worker INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+'''
+
+
+class SharedState:
+    """SQLite backed key/value, job and session tables shared by all workers"""
+
+    def __init__(self, path, worker_id):
+        self.path = path
+        self.worker_id = worker_id
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(self._connect(), *args)
+        return await asyncio.to_thread(locked)
+
+    # Key/value sections
+
+    async def get(self, namespace, key):
+        """Return (value, version) or (None, 0)"""
+        def select(conn):
+            row = conn.execute('SELECT value, version FROM kv WHERE namespace = ? AND key = ?', (namespace, key)).fetchone()
+            return (json.loads(row[0]), row[1]) if row else (None, 0)
+        return await self._run(select)
+
+    async def put(self, namespace, key, value):
+        """Store value and return its new version"""
+        def upsert(conn):
+            with conn:
+                conn.execute(
+                    'INSERT INTO kv (namespace, key, value, version, updated_at) VALUES (?, ?, ?, 1, ?) '
+                    'ON CONFLICT (namespace, key) DO UPDATE SET '
+                    'value = excluded.value, version = kv.version + 1, updated_at = excluded.updated_at',
+                    (namespace, key, json.dumps(value), time.time())
+                )
+            return conn.execute('SELECT version FROM kv WHERE namespace = ? AND key = ?', (namespace, key)).fetchone()[0]
+        return await self._run(upsert)
+
+    async def versions(self, namespace):
+        def select(conn):
+            return dict(conn.execute('SELECT key, version FROM kv WHERE namespace = ?', (namespace,)))
+        return await self._run(select)
+
+    # Background jobs
+
+    async def publish_job(self, job_dict, lines, first_line, dropped_lines):
+        """Save a job's state, append its output lines numbered from first_line and drop lines before dropped_lines"""
+        job_id = job_dict['id']
+        def upsert(conn):
+            with conn:
+                conn.execute(
+                    'INSERT INTO jobs (id, worker, data, dropped_lines, updated_at) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET data = excluded.data, '
+                    'dropped_lines = excluded.dropped_lines, updated_at = excluded.updated_at',
+                    (job_id, self.worker_id, json.dumps(job_dict), dropped_lines, time.time())
+                )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO job_lines (job_id, line_no, line) VALUES (?, ?, ?)',
+                    [(job_id, first_line + index, line) for index, line in enumerate(lines)]
+                )
+                conn.execute('DELETE FROM job_lines WHERE job_id = ? AND line_no < ?', (job_id, dropped_lines))
+        await self._run(upsert)
+
+    async def load_job(self, job_id):
+        """Return (job dict, lines, dropped_lines, worker) or None"""
+        def select(conn):
+            row = conn.execute('SELECT data, dropped_lines, worker FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            lines = [line for (line,) in conn.execute(
+                'SELECT line FROM job_lines WHERE job_id = ? AND line_no >= ? ORDER BY line_no', (job_id, row[1])
+            )]
+            return json.loads(row[0]), lines, row[1], row[2]
+        return await self._run(select)
+
+    async def list_jobs(self):
+        def select(conn):
+            return [json.loads(row[0]) for row in conn.execute('SELECT data FROM jobs ORDER BY updated_at')]
+        return await self._run(select)
+
+    async def delete_jobs(self, job_ids):
+        def delete(conn):
+            with conn:
+                conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in job_ids])
+                conn.executemany('DELETE FROM job_lines WHERE job_id = ?', [(job_id,) for job_id in job_ids])
+        await self._run(delete)
+
+    async def request_cancel(self, job_id):
+        def update(conn):
+            with conn:
+                return conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,)).rowcount
+        return await self._run(update) > 0
+
+    async def cancel_requested(self, job_id):
+        def select(conn):
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return bool(row and row[0])
+        return await self._run(select)
+
+    # SSE session ownership
+
+    async def claim_session(self, session_id):
+        def insert(conn):
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO sse_sessions (session_id, worker, created_at) VALUES (?, ?, ?)',
+                    (session_id, self.worker_id, time.time())
+                )
+        await self._run(insert)
+
+    async def release_session(self, session_id):
+        def delete(conn):
+            with conn:
+                conn.execute('DELETE FROM sse_sessions WHERE session_id = ? AND worker = ?', (session_id, self.worker_id))
+        await self._run(delete)
+
+    async def session_owner(self, session_id):
+        def select(conn):
+            row = conn.execute('SELECT worker FROM sse_sessions WHERE session_id = ?', (session_id,)).fetchone()
+            return row[0] if row else None
+        return await self._run(select)
+
+    async def forget_worker(self):
+        """Clean up after a previous process that ran with this worker ID
+
+        Its SSE sessions are gone and its unfinished jobs died with it.
+        """
+        def cleanup(conn, finished_states):
+            with conn:
+                conn.execute('DELETE FROM sse_sessions WHERE worker = ?', (self.worker_id,))
+                rows = conn.execute('SELECT id, data FROM jobs WHERE worker = ?', (self.worker_id,)).fetchall()
+                for job_id, data in rows:
+                    job = json.loads(data)
+                    if job['status'] not in finished_states:
+                        job.update(status='failed', error='Worker exited while the job was running', finished_at=time.time())
+                        conn.execute('UPDATE jobs SET data = ? WHERE id = ?', (json.dumps(job), job_id))
+        await self._run(cleanup, FINISHED_STATES)
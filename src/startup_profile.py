@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Startup time report for ``--profile-startup``.
+
+Imports the server module in a fresh interpreter started with
+``-X importtime`` and then answers ``tools/list`` once.  The report shows
+time spent importing and registering tools, the first tools/list, the
+slowest modules and packages, and which lazy dependencies were imported
+anyway.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+
+SERVER_MODULE = 'mcp_server_fastmcp'
+
+PROBE = f'''
+import asyncio, json, sys, time
+started = time.perf_counter()
+import {SERVER_MODULE} as server
+imported = time.perf_counter()
+tools = asyncio.run(server.mcp.list_tools())
+listed = time.perf_counter()
+import lazy_imports
+print(json.dumps({{
+    'import_seconds': imported - started,
+    'list_tools_seconds': listed - imported,
+    'tools': len(tools),
+    'lazy_modules': lazy_imports.status(),
+    'in_sys_modules': [name for name in lazy_imports.status() if name in sys.modules],
+}}))
+'''
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr):
+    """Parse the ``import time:`` lines written by ``python -X importtime``"""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        timings.append(ImportTiming(module.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def run_profile(src_dir):
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=src_dir, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONPATH': src_dir},
+    )
+    total = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(f'Startup probe failed:\n{process.stderr[-2000:]}')
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['process_seconds'] = total
+    result['imports'] = parse_importtime(process.stderr)
+    return result
+
+
+def format_report(profile, top=25):
+    imports = profile['imports']
+    lines = [
+        f'Startup profile ({sys.executable})',
+        f'  process start to exit:        {profile["process_seconds"] * 1000:8.1f} ms',
+        f'  imports and tool registration:{profile["import_seconds"] * 1000:8.1f} ms',
+        f'  first tools/list:             {profile["list_tools_seconds"] * 1000:8.1f} ms ({profile["tools"]} tools)',
+    ]
+    server = next((timing for timing in imports if timing.module == SERVER_MODULE), None)
+    if server is not None:
+        lines.append(f'  server module body:           {server.self_us / 1000:8.1f} ms')
+
+    lines += ['', f'Slowest modules (top {top} by cumulative time):', f'  {"cumulative":>10}  {"self":>8}  module']
+    for timing in sorted(imports, key=lambda timing: timing.cumulative_us, reverse=True)[:top]:
+        lines.append(f'  {timing.cumulative_us / 1000:8.1f}ms  {timing.self_us / 1000:6.1f}ms  {timing.module}')
+
+    packages = defaultdict(int)
+    for timing in imports:
+        packages[timing.module.split('.')[0]] += timing.self_us
+    lines += ['', 'Self time by top-level package:']
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f'  {self_us / 1000:8.1f}ms  {package}')
+
+    lines += ['', 'Lazy dependencies:']
+    for name, seconds in sorted(profile['lazy_modules'].items()):
+        if seconds is not None:
+            state = f'imported through the accessor ({seconds * 1000:.1f} ms)'
+        elif name in profile['in_sys_modules']:
+            state = 'imported at startup by another package'
+        else:
+            state = 'deferred'
+        lines.append(f'  {name:<12} {state}')
+    return '\n'.join(lines)
+
+
+def main(top=25):
+    print(format_report(run_profile(os.path.dirname(os.path.abspath(__file__))), top))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Compact, binary-safe representation of tool results.
+
+In ``compact`` mode results are serialised without indentation and
+response bodies keep their exact bytes: a body that decodes cleanly as
+text is returned as text, anything else as base64.  Bodies larger than
+``inline_bytes`` are not returned inline at all but kept in a BlobStore,
+optionally gzip or zstd compressed, and handed to the client as a
+resource URI it can read when it needs the content.
+"""
+
+import base64
+import codecs
+import gzip
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from lazy_imports import zstandard
+
+
+OUTPUT_MODES = ('pretty', 'compact')
+COMPRESSIONS = ('gzip', 'zstd')
+DEFAULT_INLINE_BYTES = 4096
+DEFAULT_STORE_BYTES = 64 * 1024 * 1024
+BODY_URI_PREFIX = 'http-body://'
+
+# Control characters other than tab, CR and LF mark a body as binary
+BINARY_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
+def dumps(value, mode='pretty'):
+    if mode == 'compact':
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    return json.dumps(value, indent=2)
+
+
+def encode_body(data, charset, truncated=False):
+    """Return (body, encoding) with encoding 'text' when data is clean text, else 'base64'"""
+    try:
+        text = codecs.getincrementaldecoder(charset)(errors='strict').decode(data, final=not truncated)
+    except (UnicodeDecodeError, LookupError):
+        text = None
+    if text is not None and not BINARY_RE.search(text):
+        return text, 'text'
+    return base64.b64encode(data).decode('ascii'), 'base64'
+
+
+def compress(data, method):
+    if method == 'gzip':
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if method == 'zstd':
+        try:
+            compressor = zstandard.ZstdCompressor()
+        except ImportError:
+            raise ValueError('zstd compression requires the zstandard package') from None
+        return compressor.compress(data)
+    raise ValueError(f'Unknown compression {method}, expected one of: {", ".join(COMPRESSIONS)}')
+
+
+COMPRESSED_MIME_TYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+
+@dataclass
+class Blob:
+    data: bytes
+    mime_type: str
+    compression: str = None
+
+    @property
+    def stored_mime_type(self):
+        return COMPRESSED_MIME_TYPES.get(self.compression, self.mime_type)
+
+
+class BlobStore:
+    """Size-bounded LRU of bodies handed out by reference"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._blobs = OrderedDict()
+        self._size = 0
+
+    def put(self, data, mime_type, compression=None):
+        """Store data and return its URI; identical content shares one entry"""
+        blob_id = hashlib.sha256(data).hexdigest()[:32]
+        if blob_id not in self._blobs:
+            self._blobs[blob_id] = Blob(data, mime_type, compression)
+            self._size += len(data)
+        self._blobs.move_to_end(blob_id)
+
+        max_bytes = self.settings.get('store_bytes', DEFAULT_STORE_BYTES)
+        while self._size > max_bytes and len(self._blobs) > 1:
+            _, evicted = self._blobs.popitem(last=False)
+            self._size -= len(evicted.data)
+        return BODY_URI_PREFIX + blob_id
+
+    def get(self, blob_id):
+        blob = self._blobs.get(blob_id)
+        if blob is not None:
+            self._blobs.move_to_end(blob_id)
+        return blob
+
+
+def compact_body(store, settings, data, charset, truncated, content_type=None, compression=None):
+    """Body fields of a compact result: inline when small, otherwise a stored reference"""
+    if len(data) <= settings.get('inline_bytes', DEFAULT_INLINE_BYTES):
+        body, encoding = encode_body(data, charset, truncated)
+        return {'body': body, 'body_encoding': encoding}
+
+    stored = compress(data, compression) if compression else data
+    uri = store.put(stored, content_type or 'application/octet-stream', compression)
+    return {
+        'body_uri': uri,
+        'body_bytes': len(data),
+        'body_stored_bytes': len(stored),
+        'body_compression': compression,
+    }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Batch encoding transforms.
+
+Each transform maps a list of byte strings to a list of results in one
+pass, so a chain like url_decode -> base64_decode -> hex_encode over a few
+thousand values runs in one tool call.  Where the encoding allows it the
+values are joined and converted with a single ``binascii`` call and the
+result is sliced back apart; anything the fast path rejects is redone per
+item so one bad value only fails its own entry.
+"""
+
+import binascii
+import urllib.parse
+from itertools import accumulate
+
+
+class TransformError(Exception):
+    """Raised for an unknown transform name"""
+
+
+def _split(buffer, sizes):
+    offsets = [0, *accumulate(sizes)]
+    return [buffer[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def _each(fn, values):
+    """Apply fn per item, returning (results, {position: error})"""
+    results, errors = [], {}
+    for position, value in enumerate(values):
+        try:
+            results.append(fn(value))
+        except Exception as e:
+            results.append(None)
+            errors[position] = e
+    return results, errors
+
+
+def url_encode(values):
+    return _each(lambda value: urllib.parse.quote_from_bytes(value).encode('ascii'), values)
+
+
+def url_decode(values):
+    return _each(urllib.parse.unquote_to_bytes, values)
+
+
+def base64_encode(values):
+    # Inputs whose lengths are multiples of 3 encode without padding, so all
+    # but the last can share one buffer
+    sizes = list(map(len, values[:-1]))
+    if values and not any(size % 3 for size in sizes):
+        encoded = binascii.b2a_base64(b''.join(values), newline=False)
+        sizes = [size // 3 * 4 for size in sizes]
+        return _split(encoded, sizes + [len(encoded) - sum(sizes)]), {}
+    return _each(lambda value: binascii.b2a_base64(value, newline=False), values)
+
+
+def base64_decode(values):
+    sizes = list(map(len, values[:-1]))
+    if values and not any(size % 4 for size in sizes):
+        joined = b''.join(values)
+        # Padding may only appear at the very end of the joined buffer
+        if b'=' not in joined[:sum(sizes)]:
+            try:
+                decoded = binascii.a2b_base64(joined, strict_mode=True)
+            except binascii.Error:
+                pass
+            else:
+                sizes = [size // 4 * 3 for size in sizes]
+                return _split(decoded, sizes + [len(decoded) - sum(sizes)]), {}
+    return _each(binascii.a2b_base64, values)
+
+
+def hex_encode(values):
+    return _split(binascii.hexlify(b''.join(values)), [len(value) * 2 for value in values]), {}
+
+
+def hex_decode(values):
+    sizes = list(map(len, values))
+    if not any(size % 2 for size in sizes):
+        try:
+            decoded = binascii.unhexlify(b''.join(values))
+        except binascii.Error:
+            pass
+        else:
+            return _split(decoded, [size // 2 for size in sizes]), {}
+    return _each(binascii.unhexlify, values)
+
+
+TRANSFORMS = {
+    'url_encode': url_encode,
+    'url_decode': url_decode,
+    'base64_encode': base64_encode,
+    'base64_decode': base64_decode,
+    'hex_encode': hex_encode,
+    'hex_decode': hex_decode,
+}
+
+
+def run_chain(inputs, chain):
+    """Apply the transforms in chain to every input
+
+    Returns one (value, error) pair per input, in input order.  Values are
+    decoded as UTF-8 at the end; an item that fails a step keeps the error
+    of that step and is not passed to later steps.
+    """
+    unknown = [name for name in chain if name not in TRANSFORMS]
+    if unknown:
+        raise TransformError(f'Unknown transform: {", ".join(unknown)}. Available: {", ".join(TRANSFORMS)}')
+
+    values = [item.encode('utf-8') for item in inputs]
+    live = range(len(values))
+    errors = {}
+    for name in chain:
+        if not values:
+            break
+        results, failed = TRANSFORMS[name](values)
+        if failed:
+            for position, error in failed.items():
+                errors[live[position]] = f'{name}: {error}'
+            keep = [position for position in range(len(results)) if position not in failed]
+            live = [live[position] for position in keep]
+            results = [results[position] for position in keep]
+        values = results
+
+    try:
+        decoded = [value.decode('utf-8') for value in values]
+    except UnicodeDecodeError:
+        decoded = []
+        for index, value in zip(live, values):
+            try:
+                decoded.append(value.decode('utf-8'))
+            except UnicodeDecodeError:
+                decoded.append(None)
+                errors[index] = 'Result is not valid UTF-8; add hex_encode or base64_encode to the chain'
+
+    if not errors:
+        return [(value, None) for value in decoded]
+    output = [(None, errors.get(index)) for index in range(len(inputs))]
+    for index, value in zip(live, decoded):
+        if value is not None:
+            output[index] = (value, None)
+    return output
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Serve one FastMCP server over several transports at once.
+
+TransportRunner starts every transport enabled in ``server_config`` in the
+current event loop: stdio, SSE (``sse``), streamable HTTP (``http``) and
+WebSocket (``websocket``).  They all dispatch to the same FastMCP instance,
+so tools, connection pools, jobs and caches are shared.  SIGINT/SIGTERM,
+or the stdio client going away, stop the listeners, give open connections
+``shutdown_timeout`` seconds to finish and then close the shared resources.
+Those are opened once per process by the ``resources`` context manager,
+not per MCP session as a FastMCP lifespan would be.
+"""
+
+import asyncio
+import contextlib
+import signal
+import socket
+
+from lazy_imports import uvicorn
+from log_pipeline import get_logger
+
+
+TRANSPORTS = ('stdio', 'sse', 'http', 'websocket')
+DEFAULT_SHUTDOWN_TIMEOUT = 5
+DEFAULT_BACKLOG = 2048
+
+logger = get_logger('transports')
+
+
+def bind_socket(host, port, reuse_port=False, backlog=DEFAULT_BACKLOG):
+    """Bind a listening TCP socket, raising OSError if the address is taken"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.create_server((host, port), family=family, backlog=backlog, reuse_port=reuse_port)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _uvicorn_server(app, settings, log_level):
+    class Server(uvicorn.Server):
+        # Signals are handled once by the runner for all transports
+
+        @contextlib.contextmanager
+        def capture_signals(self):
+            yield
+
+        def install_signal_handlers(self):
+            pass
+
+    config = uvicorn.Config(
+        app,
+        log_config=None,
+        log_level=log_level,
+        access_log=False,
+        lifespan='on',
+        timeout_graceful_shutdown=settings.get('shutdown_timeout', DEFAULT_SHUTDOWN_TIMEOUT),
+    )
+    return Server(config)
+
+
+class WebSocketTransport:
+    """ASGI endpoint that runs one MCP session per WebSocket connection"""
+
+    def __init__(self, mcp):
+        self.mcp = mcp
+
+    async def __call__(self, scope, receive, send):
+        from mcp.server.websocket import websocket_server
+
+        server = self.mcp._mcp_server
+        async with websocket_server(scope, receive, send, self.mcp.settings.transport_security) as (read, write):
+            await server.run(read, write, server.create_initialization_options())
+
+
+def websocket_app(mcp, path='/'):
+    """Starlette app serving MCP over WebSocket plus the server's custom routes"""
+    from starlette.applications import Starlette
+    from starlette.routing import WebSocketRoute
+
+    routes = [WebSocketRoute(path, WebSocketTransport(mcp))]
+    routes.extend(mcp._custom_starlette_routes)
+    return Starlette(routes=routes)
+
+
+class TransportRunner:
+    """Runs the enabled transports of a FastMCP server in one event loop"""
+
+    def __init__(self, mcp, config, wrap_app=None, resources=None):
+        self.mcp = mcp
+        self.config = config
+        self.settings = config.get('transports', {})
+        self.wrap_app = wrap_app
+        self.resources = resources
+        self.servers = {}
+        self._stop = None
+
+    def enabled(self):
+        return [name for name in TRANSPORTS if self.config.get(name, {}).get('enabled', False)]
+
+    def build_app(self, name):
+        section = self.config[name]
+        if name == 'sse':
+            app = self.mcp.sse_app()
+        elif name == 'http':
+            self.mcp.settings.streamable_http_path = section.get('path', '/mcp')
+            app = self.mcp.streamable_http_app()
+        else:
+            app = websocket_app(self.mcp, section.get('path', '/'))
+        return self.wrap_app(name, app) if self.wrap_app else app
+
+    def request_shutdown(self):
+        if self._stop is not None and not self._stop.is_set():
+            logger.info('Shutdown requested')
+            self._stop.set()
+
+    async def run(self, sockets=None):
+        """Serve until a signal arrives or the stdio client disconnects
+
+        sockets optionally maps a network transport name to a list of
+        already bound listening sockets, otherwise one is bound from
+        server_config.
+        """
+        async with self.resources() if self.resources else contextlib.nullcontext():
+            await self._serve(sockets)
+
+    async def _serve(self, sockets):
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(sig, self.request_shutdown)
+
+        tasks = {}
+        for name in self.enabled():
+            if name == 'stdio':
+                tasks[name] = asyncio.create_task(self._run_stdio())
+                continue
+
+            section = self.config[name]
+            try:
+                listeners = (sockets or {}).get(name) or [bind_socket(section['host'], section['port'])]
+            except OSError as e:
+                logger.error('Transport failed to start', extra={'transport': name, 'error': str(e)})
+                continue
+            server = _uvicorn_server(self.build_app(name), self.settings, self.settings.get('log_level', 'warning'))
+            self.servers[name] = server
+            tasks[name] = asyncio.create_task(server.serve(sockets=listeners))
+            address = listeners[0].getsockname()
+            if isinstance(address, tuple):
+                address = f'{address[0]}:{address[1]}'
+            logger.info('Transport listening', extra={'transport': name, 'address': address})
+
+        if not tasks:
+            logger.error('No transport could be started')
+            return
+
+        stop_task = asyncio.create_task(self._stop.wait())
+        try:
+            await asyncio.wait([stop_task, *tasks.values()], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_task.cancel()
+            for name, task in tasks.items():
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    logger.error('Transport stopped with an error', extra={'transport': name, 'error': repr(task.exception())})
+            await self._shutdown(tasks)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                with contextlib.suppress(NotImplementedError, RuntimeError):
+                    loop.remove_signal_handler(sig)
+
+    async def _run_stdio(self):
+        await self.mcp.run_stdio_async()
+        if self.settings.get('exit_on_stdio_eof', True):
+            logger.info('stdio client disconnected')
+            self.request_shutdown()
+        else:
+            # Keep serving the network transports after the stdio client leaves
+            await self._stop.wait()
+
+    async def _shutdown(self, tasks):
+        for server in self.servers.values():
+            server.should_exit = True
+
+        stdio = tasks.pop('stdio', None)
+        if stdio is not None and not stdio.done():
+            stdio.cancel()
+
+        timeout = self.settings.get('shutdown_timeout', DEFAULT_SHUTDOWN_TIMEOUT)
+        pending = [task for task in tasks.values() if not task.done()]
+        if pending:
+            _, still_running = await asyncio.wait(pending, timeout=timeout + 1)
+            for task in still_running:
+                task.cancel()
+        await asyncio.gather(*tasks.values(), *([stdio] if stdio else []), return_exceptions=True)
+        logger.info('All transports stopped')
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Multi-worker mode for the network transports.
+
+The supervisor starts ``workers.count`` copies of the server, each binding
+the SSE, streamable HTTP and WebSocket ports with SO_REUSEPORT so the
+kernel spreads new connections across them, and restarts workers that
+exit with a backoff.
+
+Requests that depend on where earlier ones landed are handled as follows:
+
+- SSE: the worker holding a client's event stream records the session in
+  the shared store.  A message POST that reaches another worker is
+  forwarded over the owner's private Unix socket.
+- Streamable HTTP runs stateless, so any worker can answer any request.
+- Jobs, the scanner issue cache and configuration sections written with
+  ``publish_config`` go through the SharedState store.
+"""
+
+import asyncio
+import contextlib
+import os
+import re
+import signal
+import socket
+import sys
+import time
+import urllib.parse
+
+from lazy_imports import httpx
+from log_pipeline import get_logger
+from shared_state import SharedState
+from transports import bind_socket
+
+
+DEFAULT_STATE_DIR = '~/.cache/kali-mcp/workers'
+DEFAULT_SYNC_INTERVAL = 1.0
+DEFAULT_RESTART_BACKOFF = 1.0
+MAX_RESTART_BACKOFF = 30
+STABLE_AFTER = 10
+NETWORK_TRANSPORTS = ('sse', 'http', 'websocket')
+SESSION_ID_RE = re.compile(rb'session_id=([0-9a-fA-F]+)')
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'upgrade'}
+
+logger = get_logger('workers')
+
+
+def supported():
+    return hasattr(socket, 'SO_REUSEPORT') and hasattr(socket, 'AF_UNIX')
+
+
+def state_dir(settings):
+    return os.path.expanduser(settings.get('state_dir', DEFAULT_STATE_DIR))
+
+
+class SessionAffinity:
+    """ASGI middleware that routes SSE message POSTs to the worker holding the stream"""
+
+    def __init__(self, app, store, sse_path, message_path, socket_path_for):
+        self.app = app
+        self.store = store
+        self.sse_path = sse_path
+        self.message_path = message_path
+        self.socket_path_for = socket_path_for
+        self.local = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            if scope['method'] == 'GET' and scope['path'] == self.sse_path:
+                return await self._stream(scope, receive, send)
+            if scope['method'] == 'POST' and scope['path'].startswith(self.message_path):
+                query = urllib.parse.parse_qs(scope.get('query_string', b'').decode())
+                session_id = query.get('session_id', [None])[0]
+                if session_id and session_id not in self.local:
+                    owner = await self.store.session_owner(session_id)
+                    if owner is not None and owner != self.store.worker_id:
+                        return await self._forward(owner, scope, receive, send)
+        await self.app(scope, receive, send)
+
+    async def _stream(self, scope, receive, send):
+        claimed = []
+
+        async def claim_endpoint(message):
+            # The first event of the stream announces the session's message URL
+            if not claimed and message['type'] == 'http.response.body':
+                match = SESSION_ID_RE.search(message.get('body', b''))
+                if match:
+                    session_id = match.group(1).decode()
+                    claimed.append(session_id)
+                    self.local.add(session_id)
+                    await self.store.claim_session(session_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, claim_endpoint)
+        finally:
+            for session_id in claimed:
+                self.local.discard(session_id)
+                with contextlib.suppress(Exception):
+                    await self.store.release_session(session_id)
+
+    async def _forward(self, owner, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        headers = [
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in scope['headers']
+            if name.decode('latin-1').lower() not in HOP_BY_HOP_HEADERS
+        ]
+        url = f'http://worker{scope["path"]}?{scope.get("query_string", b"").decode()}'
+        transport = httpx.AsyncHTTPTransport(uds=self.socket_path_for(owner))
+        try:
+            async with httpx.AsyncClient(transport=transport) as client:
+                response = await client.request(scope['method'], url, headers=headers, content=body)
+        except httpx.HTTPError as e:
+            logger.warning('Could not forward SSE message to its worker', extra={'worker': owner, 'error': str(e)})
+            await send({'type': 'http.response.start', 'status': 502, 'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Session owner unreachable'})
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [
+                (name.encode('latin-1'), value.encode('latin-1'))
+                for name, value in response.headers.multi_items()
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': response.content})
+
+
+class Worker:
+    """Per-process side of multi-worker mode"""
+
+    def __init__(self, settings, worker_id):
+        self.settings = settings
+        self.worker_id = worker_id
+        self.store = SharedState(os.path.join(state_dir(settings), 'state.sqlite3'), worker_id)
+        self._config_versions = {}
+
+    def socket_path(self, worker_id):
+        return os.path.join(state_dir(self.settings), f'worker-{worker_id}.sock')
+
+    def bind_sockets(self, config):
+        """Listening sockets for the enabled network transports, keyed by transport"""
+        sockets = {}
+        for name in NETWORK_TRANSPORTS:
+            section = config.get(name, {})
+            if section.get('enabled', False):
+                sockets[name] = [bind_socket(section['host'], section['port'], reuse_port=True)]
+
+        if 'sse' in sockets:
+            path = self.socket_path(self.worker_id)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+            private = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            private.bind(path)
+            private.listen()
+            sockets['sse'].append(private)
+        return sockets
+
+    def wrap_app(self, mcp):
+        def wrap(name, app):
+            if name != 'sse':
+                return app
+            return SessionAffinity(app, self.store, mcp.settings.sse_path, mcp.settings.message_path, self.socket_path)
+        return wrap
+
+    async def publish_config(self, config, key):
+        """Share a configuration section with the other workers"""
+        self._config_versions[key] = await self.store.put('config', key, config[key])
+
+    async def sync_config(self, config, on_change=None):
+        """Apply configuration sections changed by other workers"""
+        for key, version in (await self.store.versions('config')).items():
+            if self._config_versions.get(key) == version or key not in config:
+                continue
+            value, version = await self.store.get('config', key)
+            config[key].clear()
+            config[key].update(value)
+            self._config_versions[key] = version
+            if on_change is not None:
+                await on_change(key)
+
+    async def follow_config(self, config, on_change=None):
+        interval = self.settings.get('sync_interval', DEFAULT_SYNC_INTERVAL)
+        while True:
+            try:
+                await self.sync_config(config, on_change)
+            except Exception as e:
+                logger.warning('Configuration sync failed', extra={'error': str(e)})
+            await asyncio.sleep(interval)
+
+
+class WorkerSupervisor:
+    """Starts, restarts and stops the worker processes"""
+
+    def __init__(self, settings, command_for):
+        self.settings = settings
+        self.command_for = command_for
+        self.processes = {}
+        self._stop = None
+
+    def request_shutdown(self):
+        if self._stop is not None and not self._stop.is_set():
+            logger.info('Stopping workers')
+            self._stop.set()
+
+    def _reset_state(self):
+        directory = state_dir(self.settings)
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith('state.sqlite3') or name.endswith('.sock'):
+                os.unlink(os.path.join(directory, name))
+
+    async def run(self):
+        self._reset_state()
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(sig, self.request_shutdown)
+
+        count = int(self.settings.get('count', 1))
+        supervisors = [asyncio.create_task(self._supervise(worker_id)) for worker_id in range(count)]
+        await self._stop.wait()
+
+        for process in self.processes.values():
+            if process.returncode is None:
+                with contextlib.suppress(ProcessLookupError):
+                    process.send_signal(signal.SIGTERM)
+        timeout = self.settings.get('shutdown_timeout', 10)
+        await asyncio.wait(supervisors, timeout=timeout)
+        for process in self.processes.values():
+            if process.returncode is None:
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
+        await asyncio.gather(*supervisors, return_exceptions=True)
+        logger.info('All workers stopped')
+
+    async def _supervise(self, worker_id):
+        backoff = self.settings.get('restart_backoff', DEFAULT_RESTART_BACKOFF)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(
+                *self.command_for(worker_id), stdin=asyncio.subprocess.DEVNULL, stdout=sys.stderr
+            )
+            self.processes[worker_id] = process
+            logger.info('Worker started', extra={'worker': worker_id, 'pid': process.pid})
+            returncode = await process.wait()
+            if self._stop.is_set():
+                break
+
+            if time.monotonic() - started > STABLE_AFTER:
+                backoff = self.settings.get('restart_backoff', DEFAULT_RESTART_BACKOFF)
+            logger.warning('Worker exited, restarting', extra={'worker': worker_id, 'returncode': returncode, 'delay': backoff})
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stop.wait(), timeout=backoff)
+            backoff = min(backoff * 2, MAX_RESTART_BACKOFF)